@@ -1,78 +1,294 @@
+import asyncio
+import random
+import pandas as pd
+from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
 from dataloader.load_data import DataLoader
+from dataloader.checkpoints import CheckpointStore
 from typing import List, Dict, Any, Tuple, Optional
 from ai_moderator.chatbot import AIModerator
+from api.configs import AIConfigs, PipelineConfigs
+from utils.metrics import metrics
+
+# errors worth backing off and retrying; anything else fails the post immediately
+_RETRYABLE_ERRORS = (RateLimitError, InternalServerError, APITimeoutError, APIConnectionError)
+
+
+class _AdaptiveBackoff:
+    """
+    Backoff state shared by every in-flight request: a 429/5xx pauses all of them and
+    doubles the delay, successes halve it again until requests flow freely.
+    """
+
+    def __init__(self, base_seconds: float, max_seconds: float) -> None:
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.delay = 0.0
+        self._resume_at = 0.0
+
+    async def wait(self) -> None:
+        loop = asyncio.get_running_loop()
+        pause = self._resume_at - loop.time()
+        if pause > 0:
+            await asyncio.sleep(pause)
+
+    def failure(self) -> float:
+        """Records a failed request; returns the seconds until the shared pause ends."""
+
+        loop = asyncio.get_running_loop()
+        if loop.time() >= self._resume_at:
+            self.delay = min(self.max_seconds, max(self.base_seconds, self.delay * 2))
+            # jitter so paused requests do not all resume on the same tick
+            self._resume_at = loop.time() + self.delay * random.uniform(1, 1.5)
+        # else sent before the current pause: already backed off for it
+        return self._resume_at - loop.time()
+
+    def success(self) -> None:
+        self.delay = self.delay / 2 if self.delay > self.base_seconds else 0.0
 
 
 class PostAnalyzer:
+    STAGE = "analyze_posts"
+
     def find_new_posts(
         self, loader: DataLoader, post_limit: int
     ) -> List[Dict[str, Any]]:
-        """Retrieves the most recent posts that have not yet been analyzed."""
+        """
+        Retrieves up to `post_limit` posts that have not been classified yet: posts at or after
+        the stage watermark (the newest `post_limit` posts on the first run) plus pending ids,
+        oldest first so the watermark can advance without skipping anything.
+        """
 
         try:
-            q = f"""
-            WITH recent_posts AS (
-                SELECT
-                    id,
-                    title,
-                    author,
-                    flair,
-                    selftext,
-                    created_utc
-                FROM posts
-                ORDER BY created_utc DESC
-                LIMIT {post_limit}
+            # resolved up front so the planner sees a literal bound for the index range scan
+            since = CheckpointStore(loader).get_watermark(self.STAGE)
+            if since is None:
+                since = loader.query_table(
+                    """
+                    SELECT min(created_utc) AS since FROM (
+                        SELECT created_utc FROM posts ORDER BY created_utc DESC LIMIT %(limit)s
+                    ) AS newest;
+                    """,
+                    params={"limit": post_limit},
+                )["since"][0]
+
+            q = """
+            WITH candidates AS (
+                SELECT id FROM posts
+                WHERE created_utc >= %(since)s
+                UNION
+                SELECT item_id FROM pipeline_pending
+                WHERE stage = %(stage)s AND attempts < %(max_attempts)s
+            )
+            SELECT p.id, p.title, p.author, p.flair, p.selftext, p.created_utc
+            FROM candidates c
+            JOIN posts p ON p.id = c.id
+            WHERE NOT EXISTS (
+                SELECT 1 FROM posts_ai_analysis a
+                WHERE a.id = p.id AND a.category IS NOT NULL
             )
-            SELECT *
-            FROM recent_posts
-            WHERE id NOT IN (
-                SELECT id
-                FROM posts_ai_analysis
-                WHERE category IS NOT NULL
-                ORDER BY created_utc DESC
-                LIMIT {post_limit}
-            );
+            ORDER BY p.created_utc ASC
+            LIMIT %(limit)s;
             """
-            posts_df = loader.query_table(q)
+            params = {
+                "since": None if pd.isna(since) else since,
+                "stage": self.STAGE,
+                "limit": post_limit,
+                "max_attempts": PipelineConfigs.max_pending_attempts,
+            }
+            posts_df = loader.query_table(q, params=params)
             return posts_df.to_dict("records")
         except Exception as e:
             print(f"{self.__class__.__name__} - {self.find_new_posts.__name__}")
             print(f"[ERROR] occurred {e}")
-            return []
+            raise
+
+    def record_progress(
+        self, loader: DataLoader, posts: List[Dict[str, Any]], rows: List[Tuple[Any, ...]]
+    ) -> None:
+        """
+        Checkpoints a run over `posts` once `rows` are written: classified posts leave the
+        pending list, the rest join it, and the watermark moves to the newest post attempted.
+        """
+
+        if not posts:
+            return
+        classified = {row[0] for row in rows if row[5] is not None}
+        failed = [post["id"] for post in posts if post["id"] not in classified]
+
+        checkpoints = CheckpointStore(loader)
+        checkpoints.add_pending(self.STAGE, failed, error="not classified")
+        # also drops ids classified outside `rows`, e.g. by an earlier attempt of a resumed batch job
+        loader.execute(
+            """
+            DELETE FROM pipeline_pending q
+            WHERE q.stage = %(stage)s
+              AND EXISTS (
+                SELECT 1 FROM posts_ai_analysis a
+                WHERE a.id = q.item_id AND a.category IS NOT NULL
+              );
+            """,
+            {"stage": self.STAGE},
+        )
+        checkpoints.advance(
+            self.STAGE,
+            watermark=max(post["created_utc"] for post in posts),
+            rows_processed=len(classified),
+        )
+
+    def find_all_posts(self, loader: DataLoader) -> List[Dict[str, Any]]:
+        """Retrieves every post, e.g. to re-classify the whole table after a prompt change."""
+
+        q = """
+        SELECT id, title, author, flair, selftext, created_utc
+        FROM posts
+        ORDER BY created_utc DESC;
+        """
+        return loader.query_table(q).to_dict("records")
+
+    @staticmethod
+    def embedding_text(post: Dict[str, Any]) -> str:
+        """Text used to embed a post: its body, or flair + title for link/image posts."""
+        return post["selftext"] if post["selftext"] else post["flair"] + post["title"]
 
     def process_posts(
         self, moderator: AIModerator, posts: List[Dict[str, Any]]
     ) -> List[Tuple[str, str, str, str, str, Optional[str], Optional[str], Any]]:
         """
-        Performs ai analysis and creates embeddings for a new post and return a row-tuple for upsert.
+        Performs ai analysis and creates embeddings for new posts and returns row-tuples for upsert.
+        Posts are classified one by one; their embeddings are generated in batched requests.
         """
         res = []
+        analyses = {}
+        texts = {}
 
         for post in posts:
             try:
-                analysis = moderator.generate_sentiment(
+                analyses[post["id"]] = moderator.generate_sentiment(
                     flair=post["flair"],
                     title=post["title"],
                     selftext=post["selftext"],
                 )
-                text = post["selftext"] if post["selftext"] else post["flair"] + post["title"]
-                embeddings = moderator.generate_embeddings(text=text)
-                res.append(
-                    (
-                        post["id"],
-                        post["title"],
-                        post["author"],
-                        post["flair"],
-                        post["selftext"],
-                        analysis.get("category"),
-                        analysis.get("reasoning"),
-                        post["created_utc"],
-                        embeddings,
-                    )
-                )
+                texts[post["id"]] = self.embedding_text(post)
             except Exception as e:
                 # TODO log properly in side-outputs
                 print(f"{self.__class__.__name__} - {self.process_posts.__name__}")
                 print(f"[ERROR] occurred when processing post {post['id']}: {e}")
 
+        embeddings = moderator.generate_embeddings_batch(texts=texts)
+
+        for post in posts:
+            if post["id"] not in texts:
+                continue
+            analysis = analyses[post["id"]]
+            res.append(
+                (
+                    post["id"],
+                    post["title"],
+                    post["author"],
+                    post["flair"],
+                    post["selftext"],
+                    analysis.get("category"),
+                    analysis.get("reasoning"),
+                    post["created_utc"],
+                    embeddings.get(post["id"]),
+                )
+            )
+
         return res
+
+    async def _aclassify(
+        self,
+        moderator: AIModerator,
+        post: Dict[str, Any],
+        semaphore: asyncio.Semaphore,
+        backoff: _AdaptiveBackoff,
+        timeout: float,
+        max_attempts: int,
+    ) -> Dict[str, str]:
+        """Classifies one post, retrying rate limits, server errors and timeouts with backoff."""
+
+        async with semaphore:
+            for attempt in range(1, max_attempts + 1):
+                await backoff.wait()
+                try:
+                    analysis = await moderator.agenerate_sentiment(
+                        flair=post["flair"],
+                        title=post["title"],
+                        selftext=post["selftext"],
+                        timeout=timeout,
+                    )
+                    backoff.success()
+                    return analysis
+                except _RETRYABLE_ERRORS as e:
+                    pause = backoff.failure()
+                    metrics.incr("openai.retries")
+                    print(
+                        f"{self.__class__.__name__} - {self._aclassify.__name__}: post {post['id']} "
+                        f"attempt {attempt}/{max_attempts} failed, backing off {pause:.1f}s: {e}"
+                    )
+                except Exception as e:
+                    print(f"{self.__class__.__name__} - {self._aclassify.__name__}")
+                    print(f"[ERROR] generate sentiment failed for post {post['id']}: {e}")
+                    return {}
+
+        return {}
+
+    async def aprocess_posts(
+        self,
+        moderator: AIModerator,
+        posts: List[Dict[str, Any]],
+        concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+    ) -> List[Tuple[str, str, str, str, str, Optional[str], Optional[str], Any]]:
+        """
+        Async version of `process_posts`: classifies up to `concurrency` posts at a time with the
+        moderator's async client while the embeddings are batched on a worker thread. Returns the
+        same row-tuples as `process_posts`.
+        """
+
+        semaphore = asyncio.Semaphore(concurrency or AIConfigs.concurrency)
+        backoff = _AdaptiveBackoff(
+            base_seconds=AIConfigs.retry_backoff_seconds,
+            max_seconds=AIConfigs.max_backoff_seconds,
+        )
+
+        texts = {}
+        for post in posts:
+            try:
+                texts[post["id"]] = self.embedding_text(post)
+            except Exception as e:
+                print(f"{self.__class__.__name__} - {self.aprocess_posts.__name__}")
+                print(f"[ERROR] occurred when processing post {post['id']}: {e}")
+        posts = [post for post in posts if post["id"] in texts]
+
+        embeddings_task = asyncio.to_thread(moderator.generate_embeddings_batch, texts)
+        analyses_task = asyncio.gather(
+            *(
+                self._aclassify(
+                    moderator=moderator,
+                    post=post,
+                    semaphore=semaphore,
+                    backoff=backoff,
+                    timeout=timeout or AIConfigs.request_timeout_seconds,
+                    max_attempts=max_attempts or AIConfigs.max_attempts,
+                )
+                for post in posts
+            )
+        )
+        embeddings, analyses = await asyncio.gather(embeddings_task, analyses_task)
+
+        return [
+            (
+                post["id"],
+                post["title"],
+                post["author"],
+                post["flair"],
+                post["selftext"],
+                analysis.get("category"),
+                analysis.get("reasoning"),
+                post["created_utc"],
+                embeddings.get(post["id"]),
+            )
+            for post, analysis in zip(posts, analyses)
+        ]
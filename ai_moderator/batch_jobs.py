@@ -0,0 +1,323 @@
+import json
+import time
+import uuid
+from pathlib import Path
+from openai import OpenAI
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from ai_moderator.chatbot import AIModerator
+from ai_moderator.analyze_posts import PostAnalyzer
+from api.configs import AIConfigs
+
+# normalized job states returned by BatchBackend.status
+IN_PROGRESS, COMPLETED, FAILED = "in_progress", "completed", "failed"
+
+
+class BatchBackend:
+    """
+    A batch-job service: takes a JSONL file of chat completion requests (OpenAI batch format),
+    runs it asynchronously and hands back one result line per request.
+    """
+
+    def submit(self, request_path: str) -> str:
+        """Submits a request file and returns the job id."""
+        raise NotImplementedError
+
+    def status(self, job_id: str) -> str:
+        """Returns IN_PROGRESS, COMPLETED or FAILED."""
+        raise NotImplementedError
+
+    def results(self, job_id: str) -> Iterator[Dict[str, Any]]:
+        """Streams the result lines (also of failed/expired jobs, for the items that finished)."""
+        raise NotImplementedError
+
+
+class OpenAIBatchBackend(BatchBackend):
+    def __init__(self, client: OpenAI, completion_window: str = "24h") -> None:
+        self.client = client
+        self.completion_window = completion_window
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(completion_window='{self.completion_window}')"
+
+    def submit(self, request_path: str) -> str:
+        with open(request_path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    def status(self, job_id: str) -> str:
+        status = self.client.batches.retrieve(job_id).status
+        if status == "completed":
+            return COMPLETED
+        if status in ("failed", "expired", "cancelled"):
+            return FAILED
+        return IN_PROGRESS
+
+    def results(self, job_id: str) -> Iterator[Dict[str, Any]]:
+        batch = self.client.batches.retrieve(job_id)
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            with self.client.files.with_streaming_response.content(file_id) as response:
+                for line in response.iter_lines():
+                    if line.strip():
+                        yield json.loads(line)
+
+
+class LocalBatchBackend(BatchBackend):
+    """
+    Runs request files in-process, one synchronous call per line, and writes results in the
+    OpenAI batch output format. Point `client` at a local stub to exercise batch mode offline.
+    """
+
+    def __init__(self, client: OpenAI, work_dir: str) -> None:
+        self.client = client
+        self.work_dir = Path(work_dir)
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(work_dir='{self.work_dir}')"
+
+    def _output_path(self, job_id: str) -> Path:
+        return self.work_dir / f"{job_id}.output.jsonl"
+
+    def submit(self, request_path: str) -> str:
+        job_id = f"local_batch_{uuid.uuid4().hex[:12]}"
+        with open(request_path) as requests, open(self._output_path(job_id), "w") as output:
+            for line in requests:
+                request = json.loads(line)
+                result = {"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": request["custom_id"]}
+                try:
+                    body = self.client.chat.completions.create(**request["body"]).model_dump()
+                    result.update(response={"status_code": 200, "body": body}, error=None)
+                except Exception as e:
+                    result.update(response=None, error={"message": str(e)})
+                output.write(json.dumps(result) + "\n")
+        return job_id
+
+    def status(self, job_id: str) -> str:
+        return COMPLETED if self._output_path(job_id).exists() else FAILED
+
+    def results(self, job_id: str) -> Iterator[Dict[str, Any]]:
+        with open(self._output_path(job_id)) as output:
+            for line in output:
+                yield json.loads(line)
+
+
+class BatchAnalysisJob:
+    """
+    Classifies posts through a batch backend instead of per-post calls.
+
+    Pending posts are serialized into a JSONL request file, submitted, polled until the job
+    finishes, and the results are streamed back in chunks of `chunk_size` rows (embeddings are
+    generated per chunk). Progress is checkpointed in `work_dir/state.json`: the submitted job,
+    the ids of its posts and those already written. A re-run after an interruption resumes
+    polling that job whatever posts it is given (as long as the chat model and prompt version
+    are unchanged), keeps the results for posts it was given that are not written yet, and
+    submits the rest, including posts a failed or expired job did not finish, as a new job.
+    """
+
+    def __init__(
+        self,
+        moderator: AIModerator,
+        backend: BatchBackend,
+        work_dir: str,
+        poll_seconds: float,
+        chunk_size: int,
+        max_rounds: int = 3,
+    ) -> None:
+        self.moderator = moderator
+        self.backend = backend
+        self.work_dir = Path(work_dir)
+        self.poll_seconds = poll_seconds
+        self.chunk_size = chunk_size
+        self.max_rounds = max_rounds
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self._state_path = self.work_dir / "state.json"
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(backend={self.backend!r}, work_dir='{self.work_dir}', "
+            f"poll_seconds={self.poll_seconds}, chunk_size={self.chunk_size})"
+        )
+
+    def _fresh_state(self) -> Dict[str, Any]:
+        return {
+            "chat_model": AIConfigs.chat_model,
+            "prompt_version": self.moderator.PROMPT_VERSION,
+            "job_id": None,
+            "job_post_ids": [],
+            "done_ids": [],
+        }
+
+    def _load_state(self) -> Dict[str, Any]:
+        """The state of a submitted job still to be collected, else a fresh one with nothing done."""
+
+        if self._state_path.exists():
+            state = json.loads(self._state_path.read_text())
+            # results of another model or prompt must not count as done
+            same_prompt = (state.get("chat_model"), state.get("prompt_version")) == (
+                AIConfigs.chat_model,
+                self.moderator.PROMPT_VERSION,
+            )
+            if state.get("job_id") and same_prompt:
+                return state
+            print("Discarding batch state of a finished job or an older model / prompt version.")
+        return self._fresh_state()
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        tmp_path = self._state_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(state))
+        tmp_path.replace(self._state_path)  # atomic, a crash never leaves a torn state file
+
+    def _write_requests(self, posts: List[Dict[str, Any]]) -> str:
+        request_path = self.work_dir / f"requests_{uuid.uuid4().hex[:12]}.jsonl"
+        with open(request_path, "w") as f:
+            for post in posts:
+                body = self.moderator.build_sentiment_request(
+                    flair=post["flair"], title=post["title"], selftext=post["selftext"]
+                )
+                f.write(
+                    json.dumps(
+                        {
+                            "custom_id": post["id"],
+                            "method": "POST",
+                            "url": "/v1/chat/completions",
+                            "body": body,
+                        }
+                    )
+                    + "\n"
+                )
+        return str(request_path)
+
+    def _wait(self, job_id: str) -> str:
+        while True:
+            status = self.backend.status(job_id)
+            if status != IN_PROGRESS:
+                return status
+            print(f"Batch job {job_id} in progress, checking again in {self.poll_seconds}s...")
+            time.sleep(self.poll_seconds)
+
+    @staticmethod
+    def _parse_result(result: Dict[str, Any]) -> Optional[Dict[str, str]]:
+        """Extracts the classification from a result line, None if the request failed."""
+
+        response = result.get("response") or {}
+        if result.get("error") or response.get("status_code") != 200:
+            return None
+        try:
+            content = response["body"]["choices"][0]["message"]["content"]
+            return dict(json.loads(content))
+        except Exception:
+            return None
+
+    def _build_rows(
+        self, posts: List[Tuple[Dict[str, Any], Dict[str, str]]]
+    ) -> List[Tuple[Any, ...]]:
+        embeddings = self.moderator.generate_embeddings_batch(
+            texts={post["id"]: PostAnalyzer.embedding_text(post) for post, _ in posts}
+        )
+        return [
+            (
+                post["id"],
+                post["title"],
+                post["author"],
+                post["flair"],
+                post["selftext"],
+                analysis.get("category"),
+                analysis.get("reasoning"),
+                post["created_utc"],
+                embeddings.get(post["id"]),
+            )
+            for post, analysis in posts
+        ]
+
+    def run(
+        self,
+        posts: List[Dict[str, Any]],
+        write_rows: Callable[[List[Tuple[Any, ...]]], None],
+    ) -> int:
+        """Classifies `posts` and passes row-tuple chunks to `write_rows`; returns rows written."""
+
+        state = self._load_state()
+        # done_ids only hold posts of the job being resumed, never skip those of a new job
+        done = set(state["done_ids"])
+        posts_by_id = {post["id"]: post for post in posts if post["id"] not in done}
+        written = 0
+        chunk = []
+
+        def flush() -> None:
+            nonlocal written, chunk
+            if not chunk:
+                return
+            write_rows(self._build_rows(chunk))
+            done.update(post["id"] for post, _ in chunk)
+            state["done_ids"] = sorted(done)
+            self._save_state(state)
+            written += len(chunk)
+            chunk = []
+
+        def add(post: Dict[str, Any], analysis: Dict[str, str]) -> None:
+            chunk.append((post, analysis))
+            if len(chunk) >= self.chunk_size:
+                flush()
+
+        # posts answered without a model call: nothing to classify, or already cached
+        for post_id, post in list(posts_by_id.items()):
+            if not post["selftext"] and not post["flair"]:
+                add(posts_by_id.pop(post_id), {})
+                continue
+            cached = self.moderator.cached_sentiment(
+                flair=post["flair"], title=post["title"], selftext=post["selftext"]
+            )
+            if cached:
+                add(posts_by_id.pop(post_id), cached)
+
+        for _ in range(self.max_rounds):
+            if state["job_id"] is None:
+                if not posts_by_id:
+                    break
+                done.clear()
+                state.update(done_ids=[], job_post_ids=sorted(posts_by_id))
+                state["request_path"] = self._write_requests(list(posts_by_id.values()))
+                state["job_id"] = self.backend.submit(state["request_path"])
+                self._save_state(state)
+                print(f"Submitted batch job {state['job_id']} with {len(posts_by_id)} posts.")
+            else:
+                outside = len(set(posts_by_id) - set(state["job_post_ids"]))
+                print(
+                    f"Resuming batch job {state['job_id']} ({len(state['job_post_ids'])} posts); "
+                    f"{outside} posts outside it follow in a new job."
+                )
+
+            status = self._wait(state["job_id"])
+            for result in self.backend.results(state["job_id"]):
+                post = posts_by_id.get(result.get("custom_id"))
+                if post is None:
+                    continue  # written already (earlier run or cache) or not asked for
+                analysis = self._parse_result(result)
+                if analysis is None:
+                    continue  # failed request, retried in the next round
+                self.moderator.store_sentiment(
+                    post["flair"], post["title"], post["selftext"], analysis
+                )
+                add(posts_by_id.pop(post["id"]), analysis)
+
+            flush()
+            print(f"Batch job {state['job_id']} {status}; {len(posts_by_id)} posts left.")
+            if state.get("request_path"):
+                Path(state.pop("request_path")).unlink(missing_ok=True)
+            state["job_id"] = None
+            self._save_state(state)
+
+        flush()
+        if posts_by_id:
+            print(f"[WARNING] {len(posts_by_id)} posts could not be classified in batch mode.")
+        # no job is left to resume
+        self._state_path.unlink(missing_ok=True)
+
+        return written
@@ -0,0 +1,126 @@
+import json
+import sqlite3
+import hashlib
+import threading
+import time
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class ResultCache:
+    """
+    Persistent, content-addressed cache for model results (classifications and embeddings).
+    Entries live in a local SQLite file keyed on a hash of (model, prompt version, normalized
+    text); once the stored payload grows past `max_bytes` the least recently used entries are
+    evicted. Safe to share between threads.
+    """
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS results(
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                is_vector INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS results_last_access_idx ON results(last_access);
+            """
+        )
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(path='{self.path}', max_bytes={self.max_bytes})"
+
+    @staticmethod
+    def make_key(model: str, prompt_version: str, *texts: Optional[str]) -> str:
+        """Hashes the model, prompt template version and whitespace-normalized input texts."""
+
+        normalized = "\x1f".join(" ".join((text or "").split()) for text in texts)
+        payload = "\x1e".join([model, str(prompt_version), normalized])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the cached result (dict or float32 array) or None, counting hits and misses."""
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, is_vector FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+
+        value, is_vector = row
+        if is_vector:
+            return np.frombuffer(value, dtype=np.float32)
+        return json.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        """Stores a JSON-serializable result; vectors (arrays, float lists) are packed as float32."""
+
+        is_vector = isinstance(value, (list, np.ndarray))
+        payload = (
+            np.asarray(value, dtype=np.float32).tobytes()
+            if is_vector
+            else json.dumps(value).encode("utf-8")
+        )
+
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT size FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results(key, value, is_vector, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, payload, int(is_vector), len(payload), time.time()),
+            )
+            self._size += len(payload) - (previous[0] if previous else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drops least recently used entries until the cache is back under 90% of max_bytes."""
+
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute("SELECT key, size FROM results ORDER BY last_access")
+        evicted = []
+        for key, size in rows:
+            if self._size <= target:
+                break
+            evicted.append((key,))
+            self._size -= size
+        self._conn.executemany("DELETE FROM results WHERE key = ?", evicted)
+        self.evictions += len(evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "size_bytes": self._size,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,44 +1,31 @@
+import base64
 import json
-from openai import OpenAI
-from typing import Optional, Dict
-import re
-import html
+import time
+import numpy as np
+from openai import OpenAI, AsyncOpenAI, BadRequestError
+from typing import Optional, Dict, List, Tuple
+from api.configs import AIConfigs
+from ai_moderator.cache import ResultCache
+from ai_moderator.text_normalizer import normalizer
+from utils.metrics import metrics
 
 class AIModerator:
-    def __init__(self, client: OpenAI):
+    # bump whenever _generate_prompt changes so cached classifications are not reused
+    PROMPT_VERSION = "1"
+
+    def __init__(
+        self,
+        client: OpenAI,
+        async_client: Optional[AsyncOpenAI] = None,
+        cache: Optional[ResultCache] = None,
+    ):
         self.client = client
+        self.async_client = async_client
+        self.cache = cache
     
     def clean_comment(self,text: str) -> str:
-        if not text:
-            return ""
-        
-        text = text.replace("\n", " ")
-
-        # Unescape HTML entities (e.g. &amp; -> &)
-        text = html.unescape(text)
-
-        # Remove URLs
-        text = re.sub(r'https?://\S+|www\.\S+', '', text)
-
-        # Remove emails (optional, in case you have them)
-        text = re.sub(r'\S+@\S+', '', text)
-
-        # Remove HTML tags (in case you have scraped content)
-        text = re.sub(r'<.*?>', '', text)
-
-        # Remove emojis and non-ASCII symbols (optional — depends on your needs)
-        text = re.sub(r'[^\x00-\x7F]+', '', text)
-
-        # Remove control characters (non-printable ASCII)
-        text = re.sub(r'[\x00-\x1F\x7F]', '', text)
-
-        # Normalize multiple spaces and line breaks into single space
-        text = re.sub(r'\s+', ' ', text)
-
-        # Strip leading/trailing spaces
-        text = text.strip()
-
-        return text
+        """Normalizes post/comment text before it is sent to the model (see TextNormalizer)."""
+        return normalizer.normalize(text)
 
     def _generate_prompt(self, flair: str, title: str, selftext: str) -> str:
         """Generates a prompt for categorizing a Reddit post into predefined categories
@@ -66,6 +53,67 @@ class AIModerator:
         )
         return prompt
 
+    def _sentiment_key(self, flair: Optional[str], title: str, selftext: Optional[str]) -> str:
+        return ResultCache.make_key(
+            AIConfigs.chat_model, self.PROMPT_VERSION, flair, title, selftext
+        )
+
+    def cached_sentiment(
+        self, flair: Optional[str], title: str, selftext: Optional[str]
+    ) -> Optional[Dict[str, str]]:
+        if self.cache is None:
+            return None
+        cached = self.cache.get(self._sentiment_key(flair, title, selftext))
+        metrics.incr("ai_cache.hits" if cached else "ai_cache.misses")
+        return cached
+
+    def store_sentiment(
+        self, flair: Optional[str], title: str, selftext: Optional[str], analysis: Dict[str, str]
+    ) -> Dict[str, str]:
+        """Caches a usable classification (failures are not cached so they get retried)."""
+        if self.cache is not None and analysis.get("category"):
+            self.cache.set(self._sentiment_key(flair, title, selftext), analysis)
+        return analysis
+
+    def _embedding_key(self, text: str) -> str:
+        return ResultCache.make_key(
+            AIConfigs.embedding_model, str(AIConfigs.embedding_dimensions or ""), text
+        )
+
+    def _create_embeddings(self, inputs: List[str]) -> List[np.ndarray]:
+        """
+        One embeddings request. Vectors are requested base64-encoded and decoded straight into
+        float32 arrays, skipping the list of Python floats the client would otherwise build.
+        """
+
+        kwargs = {}
+        if AIConfigs.embedding_dimensions:
+            kwargs["dimensions"] = AIConfigs.embedding_dimensions
+        response = self.client.embeddings.create(
+            input=inputs, model=AIConfigs.embedding_model, encoding_format="base64", **kwargs
+        )
+        vectors = [None] * len(inputs)
+        for item in response.data:
+            vectors[item.index] = np.frombuffer(base64.b64decode(item.embedding), dtype=np.float32)
+        return vectors
+
+    def build_sentiment_request(
+        self, flair: Optional[str], title: str, selftext: Optional[str]
+    ) -> Dict[str, object]:
+        """Chat completion request body used to classify a post (e.g. for batch-job files)."""
+
+        prompt = self._generate_prompt(flair=flair, title=title, selftext=selftext)
+        return {
+            "model": AIConfigs.chat_model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt,
+                }
+            ],
+        }
+
+    @metrics.timed("openai.generate_sentiment")
     def generate_sentiment(
         self, flair: Optional[str], title: str, selftext: Optional[str]
     ) -> Dict[str, str]:
@@ -76,6 +124,10 @@ class AIModerator:
         if not selftext and not flair:
             return {}
 
+        cached = self.cached_sentiment(flair=flair, title=title, selftext=selftext)
+        if cached:
+            return cached
+
         prompt = self._generate_prompt(flair=flair, title=title, selftext=selftext)
 
         try:
@@ -86,11 +138,11 @@ class AIModerator:
                         "content": prompt,
                     }
                 ],
-                model="gpt-4o-mini",
+                model=AIConfigs.chat_model,
             )
 
             response = response.choices[0].message.content
-            return dict(json.loads(response))
+            return self.store_sentiment(flair, title, selftext, dict(json.loads(response)))
 
         except Exception as e:
             print(
@@ -98,21 +150,156 @@ class AIModerator:
             )
             return {}
 
+    @metrics.timed("openai.generate_sentiment")
+    async def agenerate_sentiment(
+        self,
+        flair: Optional[str],
+        title: str,
+        selftext: Optional[str],
+        timeout: Optional[float] = None,
+    ) -> Dict[str, str]:
+        """
+        Async counterpart of `generate_sentiment` using `async_client`. API errors are raised
+        rather than swallowed so callers can back off and retry.
+        """
+
+        if not selftext and not flair:
+            return {}
+
+        cached = self.cached_sentiment(flair=flair, title=title, selftext=selftext)
+        if cached:
+            return cached
+
+        prompt = self._generate_prompt(flair=flair, title=title, selftext=selftext)
+        response = await self.async_client.chat.completions.create(
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt,
+                }
+            ],
+            model=AIConfigs.chat_model,
+            timeout=timeout,
+        )
+
+        response = response.choices[0].message.content
+        return self.store_sentiment(flair, title, selftext, dict(json.loads(response)))
+
+    @metrics.timed("openai.generate_embeddings")
     def generate_embeddings(self, text: str):
         """ Creates embeddings for 'selftext' of a post for performing similarity search 
             based on user queries.
         """
         try:
             text = self.clean_comment(text)
-            return (
-                self.client.embeddings.create(
-                    input=[text], model="text-embedding-3-small"
-                )
-                .data[0]
-                .embedding
-            )
+            if self.cache is not None:
+                cached = self.cache.get(self._embedding_key(text))
+                if cached is not None:
+                    return cached
+
+            embedding = self._create_embeddings([text])[0]
+            if self.cache is not None:
+                self.cache.set(self._embedding_key(text), embedding)
+            return embedding
         except Exception as e:
             print(text)
             print(
                 f"{self.generate_embeddings.__name__} [ERROR] - generating embedding failed: {e}"
             )
+
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Rough token count (~4 characters per token for English text)."""
+        return len(text) // 4 + 1
+
+    def _pack_batches(
+        self, items: List[Tuple[str, str]], max_items: int, max_tokens: int
+    ) -> List[List[Tuple[str, str]]]:
+        """Greedily packs (key, text) pairs into batches bounded by item count and token budget."""
+
+        batches, batch, batch_tokens = [], [], 0
+        for key, text in items:
+            tokens = self._estimate_tokens(text)
+            if batch and (len(batch) >= max_items or batch_tokens + tokens > max_tokens):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append((key, text))
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    @metrics.timed("openai.embeddings_request")
+    def _embed_batch(self, batch: List[Tuple[str, str]]) -> Dict[str, np.ndarray]:
+        """Sends one embeddings request and maps the returned vectors back to their keys."""
+
+        vectors = self._create_embeddings([text for _, text in batch])
+        return {key: vector for (key, _), vector in zip(batch, vectors) if vector is not None}
+
+    @metrics.timed("openai.generate_embeddings_batch")
+    def generate_embeddings_batch(
+        self, texts: Dict[str, str]
+    ) -> Dict[str, Optional[np.ndarray]]:
+        """
+        Creates embeddings for many texts (e.g. post id -> selftext) with as few requests as possible.
+        Texts are cleaned and packed into requests bounded by `AIConfigs.embedding_batch_size` and
+        `AIConfigs.embedding_batch_tokens`. Only failed sub-batches are retried: transient errors
+        (rate limits, 5xx, timeouts) retry the same batch with backoff, rejected inputs (400) split
+        the batch in half so a single bad text cannot sink its neighbours. Keys whose text is empty
+        after cleaning or that keep failing map to None. Identical texts are embedded once, and
+        texts found in the result cache are not sent at all.
+        """
+
+        # cleaned text -> keys sharing it (reposts, crossposts)
+        keys_by_text = {}
+        for key, cleaned in zip(texts, normalizer.normalize_many(texts.values())):
+            if cleaned:  # the API rejects empty inputs
+                keys_by_text.setdefault(cleaned, []).append(key)
+
+        vectors = {}
+        if self.cache is not None:
+            for text in keys_by_text:
+                cached = self.cache.get(self._embedding_key(text))
+                if cached is not None:
+                    vectors[text] = cached
+
+        batches = self._pack_batches(
+            [(text, text) for text in keys_by_text if text not in vectors],
+            max_items=AIConfigs.embedding_batch_size,
+            max_tokens=AIConfigs.embedding_batch_tokens,
+        )
+        pending = [(batch, 0) for batch in reversed(batches)]
+
+        while pending:
+            batch, attempt = pending.pop()
+            try:
+                embedded = self._embed_batch(batch)
+                vectors.update(embedded)
+                if self.cache is not None:
+                    for text, embedding in embedded.items():
+                        self.cache.set(self._embedding_key(text), embedding)
+            except BadRequestError as e:
+                if len(batch) > 1:
+                    half = len(batch) // 2
+                    pending.extend([(batch[half:], attempt), (batch[:half], attempt)])
+                else:
+                    print(
+                        f"{self.generate_embeddings_batch.__name__} [ERROR] - input for "
+                        f"{keys_by_text[batch[0][0]]} rejected: {e}"
+                    )
+            except Exception as e:
+                if attempt + 1 < AIConfigs.embedding_max_attempts:
+                    metrics.incr("openai.retries")
+                    time.sleep(AIConfigs.retry_backoff_seconds * 2**attempt)
+                    pending.append((batch, attempt + 1))
+                else:
+                    print(
+                        f"{self.generate_embeddings_batch.__name__} [ERROR] - embedding batch of "
+                        f"{len(batch)} failed after {attempt + 1} attempts: {e}"
+                    )
+
+        results = {key: None for key in texts}
+        for text, keys in keys_by_text.items():
+            for key in keys:
+                results[key] = vectors.get(text)
+        return results
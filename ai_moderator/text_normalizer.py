@@ -0,0 +1,74 @@
+import re
+import sys
+import html
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Union
+
+if TYPE_CHECKING:
+    import pandas  # annotations only; pandas stays a lazy dependency
+
+# Same patterns as the original clean_comment, compiled once
+_URL_RE = re.compile(r"https?://\S+|www\.\S+")
+_EMAIL_RE = re.compile(r"\S+@\S+")
+_TAG_RE = re.compile(r"<.*?>")
+# non-ASCII and control characters are both deleted, so one class covers both passes
+_NON_PRINTABLE_RE = re.compile(r"[^\x20-\x7E]+")
+
+
+class TextNormalizer:
+    """
+    Precompiled text cleanup for post and comment bodies.
+
+    Produces exactly the output of the original `clean_comment` pipeline (newlines to spaces,
+    HTML unescape, drop URLs, emails, tags, non-ASCII and control characters, collapse
+    whitespace) but each pass only runs when the text contains the character that pass
+    needs ('&', 'http'/'www.', '@', '<'), so typical strings take two or three cheap steps.
+    """
+
+    def normalize(self, text: Any) -> str:
+        if not text or not isinstance(text, str):
+            return ""
+
+        text = text.replace("\n", " ")
+        if "&" in text:
+            text = html.unescape(text)
+        if "http" in text or "www." in text:
+            text = _URL_RE.sub("", text)
+        if "@" in text:
+            text = _EMAIL_RE.sub("", text)
+        if "<" in text:
+            text = _TAG_RE.sub("", text)
+        if not (text.isascii() and text.isprintable()):
+            text = _NON_PRINTABLE_RE.sub("", text)
+
+        # what is left is printable ASCII, so split/join equals re.sub(r"\s+", " ") + strip
+        return " ".join(text.split())
+
+    def normalize_many(
+        self, texts: Union[Iterable[Any], "pandas.Series"]
+    ) -> Union[List[str], "pandas.Series"]:
+        """
+        Normalizes a whole list (or pandas Series) of texts; duplicates are only cleaned once.
+        Missing values (None/NaN) become empty strings. A Series comes back as a Series with
+        the same index.
+        """
+
+        seen: Dict[Any, str] = {}
+
+        def normalize_cached(text: Any) -> str:
+            if not isinstance(text, str):
+                return ""
+            cleaned = seen.get(text)
+            if cleaned is None:
+                cleaned = seen[text] = self.normalize(text)
+            return cleaned
+
+        # a Series can only exist if pandas was imported by the caller, no need to import it here
+        pd = sys.modules.get("pandas")
+        if pd is not None and isinstance(texts, pd.Series):
+            return pd.Series(
+                [normalize_cached(text) for text in texts], index=texts.index, dtype=object
+            )
+        return [normalize_cached(text) for text in texts]
+
+
+normalizer = TextNormalizer()
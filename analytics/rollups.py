@@ -0,0 +1,366 @@
+import pandas as pd
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Union
+from api.configs import AnalyticsConfigs
+from dataloader.checkpoints import CheckpointStore
+from dataloader.load_data import DataLoader
+from utils.metrics import metrics
+from utils.utilities import utc_day
+
+DateLike = Union[str, date, datetime, None]
+
+# keys (UTC days, post ids or authors) a write to a source table touches; ids NULL selects every key
+_POST_DAYS = """
+    SELECT DISTINCT (created_utc AT TIME ZONE 'UTC')::date::text AS key FROM posts
+    WHERE created_utc IS NOT NULL AND (%(ids)s::text[] IS NULL OR id = ANY(%(ids)s::text[]));
+"""
+_COMMENT_DAYS = """
+    SELECT DISTINCT (created_utc AT TIME ZONE 'UTC')::date::text AS key FROM comments
+    WHERE created_utc IS NOT NULL AND (%(ids)s::text[] IS NULL OR id = ANY(%(ids)s::text[]));
+"""
+_COMMENT_POSTS = """
+    SELECT DISTINCT post_id AS key FROM comments
+    WHERE %(ids)s::text[] IS NULL OR id = ANY(%(ids)s::text[]);
+"""
+_POST_AUTHORS = """
+    SELECT DISTINCT coalesce(author, '') AS key FROM posts
+    WHERE %(ids)s::text[] IS NULL OR id = ANY(%(ids)s::text[]);
+"""
+_COMMENT_AUTHORS = """
+    SELECT DISTINCT coalesce(author, '') AS key FROM comments
+    WHERE %(ids)s::text[] IS NULL OR id = ANY(%(ids)s::text[]);
+"""
+_ANALYSIS_DAYS = """
+    SELECT DISTINCT (created_utc AT TIME ZONE 'UTC')::date::text AS key FROM posts_ai_analysis
+    WHERE created_utc IS NOT NULL AND (%(ids)s::text[] IS NULL OR id = ANY(%(ids)s::text[]));
+"""
+
+# the UTC day ranges of %(keys)s, so the created_utc indexes serve the per-day scans
+_DAYS = """
+    days AS (
+        SELECT day,
+               day::timestamp AT TIME ZONE 'UTC' AS day_start,
+               (day + 1)::timestamp AT TIME ZONE 'UTC' AS day_end
+        FROM unnest(%(keys)s::date[]) AS day
+    )
+"""
+
+# rollup table -> the source tables feeding it (with the keys a write touches) and the SQL
+# recomputing its rows for %(keys)s; refreshed in this order, so rollup_authors can be summed
+# from the rollup_authors_daily rows just refreshed
+ROLLUPS: Dict[str, Dict[str, Any]] = {
+    "rollup_posts_daily": {
+        "sources": {"posts": _POST_DAYS},
+        "refresh": f"""
+            DELETE FROM rollup_posts_daily WHERE day = ANY(%(keys)s::date[]);
+            INSERT INTO rollup_posts_daily (day, subreddit, flair, posts, score_sum, num_comments_sum)
+            WITH {_DAYS}
+            SELECT d.day, coalesce(p.subreddit, ''), coalesce(p.flair, ''), count(*),
+                   coalesce(sum(p.score), 0), coalesce(sum(p.num_comments), 0)
+            FROM days d
+            JOIN posts p ON p.created_utc >= d.day_start AND p.created_utc < d.day_end
+            GROUP BY 1, 2, 3;
+        """,
+    },
+    "rollup_categories_daily": {
+        "sources": {"posts_ai_analysis": _ANALYSIS_DAYS},
+        "refresh": f"""
+            DELETE FROM rollup_categories_daily WHERE day = ANY(%(keys)s::date[]);
+            INSERT INTO rollup_categories_daily (day, category, posts)
+            WITH {_DAYS}
+            SELECT d.day, a.category, count(*)
+            FROM days d
+            JOIN posts_ai_analysis a
+              ON a.created_utc >= d.day_start AND a.created_utc < d.day_end
+            WHERE a.category IS NOT NULL
+            GROUP BY 1, 2;
+        """,
+    },
+    "rollup_authors_daily": {
+        "sources": {"posts": _POST_DAYS, "comments": _COMMENT_DAYS},
+        "refresh": f"""
+            DELETE FROM rollup_authors_daily WHERE day = ANY(%(keys)s::date[]);
+            INSERT INTO rollup_authors_daily (day, author, posts, post_score, comments, comment_score)
+            WITH {_DAYS},
+            post_stats AS (
+                SELECT d.day, coalesce(p.author, '') AS author, count(*) AS n,
+                       coalesce(sum(p.score), 0) AS score
+                FROM days d
+                JOIN posts p ON p.created_utc >= d.day_start AND p.created_utc < d.day_end
+                GROUP BY 1, 2
+            ),
+            comment_stats AS (
+                SELECT d.day, coalesce(c.author, '') AS author, count(*) AS n,
+                       coalesce(sum(c.score), 0) AS score
+                FROM days d
+                JOIN comments c ON c.created_utc >= d.day_start AND c.created_utc < d.day_end
+                GROUP BY 1, 2
+            )
+            SELECT coalesce(ps.day, cs.day), coalesce(ps.author, cs.author),
+                   coalesce(ps.n, 0), coalesce(ps.score, 0), coalesce(cs.n, 0), coalesce(cs.score, 0)
+            FROM post_stats ps
+            FULL JOIN comment_stats cs ON cs.day = ps.day AND cs.author = ps.author;
+        """,
+    },
+    "rollup_authors": {
+        "sources": {"posts": _POST_AUTHORS, "comments": _COMMENT_AUTHORS},
+        "refresh": """
+            DELETE FROM rollup_authors WHERE author = ANY(%(keys)s::text[]);
+            INSERT INTO rollup_authors
+                (author, posts, post_score, comments, comment_score, first_day, last_day)
+            SELECT author, sum(posts), sum(post_score), sum(comments), sum(comment_score),
+                   min(day), max(day)
+            FROM rollup_authors_daily
+            WHERE author = ANY(%(keys)s::text[])
+            GROUP BY author;
+        """,
+    },
+    "rollup_post_comments": {
+        "sources": {"comments": _COMMENT_POSTS},
+        "refresh": """
+            DELETE FROM rollup_post_comments WHERE post_id = ANY(%(keys)s::text[]);
+            INSERT INTO rollup_post_comments
+                (post_id, day, comments, comment_score, commenters, last_comment_utc)
+            SELECT p.id, (p.created_utc AT TIME ZONE 'UTC')::date, count(*),
+                   coalesce(sum(c.score), 0), count(DISTINCT c.author), max(c.created_utc)
+            FROM posts p
+            JOIN comments c ON c.post_id = p.id
+            WHERE p.id = ANY(%(keys)s::text[])
+            GROUP BY p.id, p.created_utc;
+        """,
+    },
+}
+
+
+class RollupManager:
+    """
+    Keeps the analytics rollup tables (see `ROLLUPS`) in step with `posts`, `comments` and
+    `posts_ai_analysis`. After a stage writes rows, `update` finds the keys they touch (UTC days,
+    post ids for per-post comment counts, authors for all-time totals) and recomputes the rollup rows of only those keys
+    from the source tables, so updated rows (new scores, comment counts, categories) are
+    reflected exactly and the cost follows the rows written, not the history. Keys whose refresh
+    failed are queued in `pipeline_pending` (stage `rollup:<table>`) and retried by the next update.
+    An upsert can move a row to another key (a post whose author was deleted, a new created_utc):
+    callers pass the `touched_keys` of the ids taken before the write as `previous_keys`, so the
+    rollup rows the old values counted towards are recomputed too.
+    """
+
+    def __init__(self, loader: DataLoader) -> None:
+        self.loader = loader
+        self.checkpoints = CheckpointStore(loader)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(loader={self.loader!r})"
+
+    def touched_keys(self, source_table: str, ids: Optional[Iterable[str]]) -> Dict[str, List[str]]:
+        """Rollup table -> keys touched by the rows `ids` of `source_table` (None: all rows)."""
+
+        ids = None if ids is None else list(ids)
+        keys = {}
+        for table, rollup in ROLLUPS.items():
+            if source_table in rollup["sources"]:
+                df = self.loader.query_table(rollup["sources"][source_table], params={"ids": ids})
+                keys[table] = df["key"].to_list()
+        return keys
+
+    def refresh(self, table: str, keys: Iterable[str]) -> int:
+        """
+        Recomputes the rows of `keys` in one rollup table, in batches of
+        `AnalyticsConfigs.refresh_batch_keys`. Returns the number of keys refreshed.
+        """
+
+        keys = sorted(set(keys))
+        for start in range(0, len(keys), AnalyticsConfigs.refresh_batch_keys):
+            batch = keys[start : start + AnalyticsConfigs.refresh_batch_keys]
+            with metrics.timer("rollups.refresh"):
+                # concurrent shards refresh the same days: one delete + insert at a time
+                self.loader.execute(
+                    f"SELECT pg_advisory_xact_lock(hashtext('{table}'));"
+                    + ROLLUPS[table]["refresh"],
+                    {"keys": batch},
+                )
+        metrics.incr("rollups.keys_refreshed", len(keys))
+        return len(keys)
+
+    def update(
+        self,
+        source_table: str,
+        ids: Iterable[str],
+        previous_keys: Optional[Dict[str, List[str]]] = None,
+    ) -> Dict[str, int]:
+        """
+        Refreshes every rollup fed by `source_table` for the rows `ids` just written there, the
+        `previous_keys` they had before the write, and keys left pending by earlier failures.
+        A failing rollup is reported and queued, not raised: the rows are written either way.
+        Returns keys refreshed per rollup.
+        """
+
+        refreshed = {}
+        for table, keys in self.touched_keys(source_table, ids).items():
+            keys = sorted(set(keys) | set((previous_keys or {}).get(table, [])))
+            stage = f"rollup:{table}"
+            pending = self.checkpoints.pending_ids(stage)
+            try:
+                refreshed[table] = self.refresh(table, keys + pending)
+                self.checkpoints.clear_pending(stage, pending)
+            except Exception as e:
+                print(
+                    f"{self.__class__.__name__} - {self.update.__name__}: refreshing {table} "
+                    f"failed, {len(keys)} keys queued: {e}"
+                )
+                self.checkpoints.add_pending(stage, keys, error=str(e))
+        return refreshed
+
+    def rebuild(self, tables: Optional[List[str]] = None) -> Dict[str, int]:
+        """Recomputes rollup tables (default: all) from the full source tables, e.g. to backfill."""
+
+        rebuilt = {}
+        for table in tables or list(ROLLUPS):
+            keys = set()
+            for source_table in ROLLUPS[table]["sources"]:
+                keys.update(self.touched_keys(source_table, None)[table])
+            self.loader.execute(f"TRUNCATE {table};")
+            rebuilt[table] = self.refresh(table, keys)
+            self.checkpoints.clear_pending(
+                f"rollup:{table}", self.checkpoints.pending_ids(f"rollup:{table}")
+            )
+        return rebuilt
+
+
+class CommunityAnalytics:
+    """
+    Dashboard queries answered from the rollup tables only, so they cost the same whatever the
+    size of `posts` and `comments`. Date bounds are inclusive UTC days (date, datetime or ISO
+    string); None leaves that side open.
+    """
+
+    AUTHOR_ORDER = ("posts", "comments", "post_score", "comment_score")
+
+    def __init__(self, loader: DataLoader) -> None:
+        self.loader = loader
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(loader={self.loader!r})"
+
+    def _query(self, query: str, start: DateLike, end: DateLike, **params: Any) -> pd.DataFrame:
+        with metrics.timer("rollups.query"):
+            return self.loader.query_table(
+                query, params={"start": utc_day(start), "end": utc_day(end), **params}
+            )
+
+    # bounds folded into constants by psycopg2, so the planner keeps the index range scan
+    _RANGE = """
+        (%(start)s::date IS NULL OR day >= %(start)s::date)
+        AND (%(end)s::date IS NULL OR day <= %(end)s::date)
+    """
+
+    def category_share(self, start: DateLike = None, end: DateLike = None) -> pd.DataFrame:
+        """Classified posts per day and category, with the category's share of the day."""
+
+        return self._query(
+            f"""
+            SELECT day, category, posts,
+                   posts::float / sum(posts) OVER (PARTITION BY day) AS share
+            FROM rollup_categories_daily
+            WHERE {self._RANGE}
+            ORDER BY day, posts DESC, category;
+            """,
+            start,
+            end,
+        )
+
+    def top_authors(
+        self,
+        start: DateLike = None,
+        end: DateLike = None,
+        limit: int = 10,
+        order_by: str = "posts",
+    ) -> pd.DataFrame:
+        """
+        Most active authors over the range, by posts, comments or the score they collected. A
+        bounded range sums the per-day rows it covers; all time reads the per-author totals.
+        """
+
+        if order_by not in self.AUTHOR_ORDER:
+            raise ValueError(f"order_by must be one of {self.AUTHOR_ORDER}, got '{order_by}'")
+        if start is None and end is None:
+            source, where = "rollup_authors", "TRUE"
+        else:
+            source, where = "rollup_authors_daily", self._RANGE
+        return self._query(
+            f"""
+            SELECT author, sum(posts)::bigint AS posts, sum(comments)::bigint AS comments,
+                   sum(post_score)::bigint AS post_score,
+                   sum(comment_score)::bigint AS comment_score
+            FROM {source}
+            WHERE {where} AND author NOT IN ('', '[deleted]')
+            GROUP BY author
+            ORDER BY {order_by} DESC, author
+            LIMIT %(limit)s;
+            """,
+            start,
+            end,
+            limit=limit,
+        )
+
+    def comment_volume(
+        self, start: DateLike = None, end: DateLike = None, limit: int = 20
+    ) -> pd.DataFrame:
+        """Posts created in the range with the most comments collected."""
+
+        return self._query(
+            f"""
+            SELECT r.post_id, r.day, p.title, r.comments, r.commenters, r.comment_score,
+                   r.last_comment_utc
+            FROM (
+                SELECT * FROM rollup_post_comments
+                WHERE {self._RANGE}
+                ORDER BY comments DESC, post_id
+                LIMIT %(limit)s
+            ) r
+            JOIN posts p ON p.id = r.post_id
+            ORDER BY r.comments DESC, r.post_id;
+            """,
+            start,
+            end,
+            limit=limit,
+        )
+
+    def score_by_flair(
+        self, start: DateLike = None, end: DateLike = None, subreddit: Optional[str] = None
+    ) -> pd.DataFrame:
+        """Posts, average score and average comment count per flair."""
+
+        return self._query(
+            f"""
+            SELECT flair, sum(posts)::bigint AS posts,
+                   sum(score_sum)::float / sum(posts) AS avg_score,
+                   sum(num_comments_sum)::float / sum(posts) AS avg_num_comments
+            FROM rollup_posts_daily
+            WHERE {self._RANGE} AND (%(subreddit)s::text IS NULL OR subreddit = %(subreddit)s)
+            GROUP BY flair
+            ORDER BY posts DESC, flair;
+            """,
+            start,
+            end,
+            subreddit=subreddit,
+        )
+
+    def posts_per_day(
+        self, start: DateLike = None, end: DateLike = None, subreddit: Optional[str] = None
+    ) -> pd.DataFrame:
+        """Posts, total score and Reddit-reported comments per day."""
+
+        return self._query(
+            f"""
+            SELECT day, sum(posts)::bigint AS posts, sum(score_sum)::bigint AS score,
+                   sum(num_comments_sum)::bigint AS num_comments
+            FROM rollup_posts_daily
+            WHERE {self._RANGE} AND (%(subreddit)s::text IS NULL OR subreddit = %(subreddit)s)
+            GROUP BY day
+            ORDER BY day;
+            """,
+            start,
+            end,
+            subreddit=subreddit,
+        )
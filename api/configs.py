@@ -3,6 +3,76 @@ class PostAPIConfigs:
     timeout = 10
     ratelimit_seconds = 60
     post_limit = 450 # most recent posts
+    stream_chunk_size = 100 # posts per streamed chunk (one Reddit listing page)
+    requests_per_window = 100 # Reddit OAuth quota per ratelimit_seconds
+    adaptive_ratelimit = True # pace requests on Reddit's x-ratelimit-* headers (False: fixed token bucket only)
+    comment_workers = 8 # submissions whose comment trees are fetched concurrently
+    incremental_comments = True # only re-crawl posts whose comment count moved
+    hot_window_hours = 24 # posts younger than this are always re-crawled
+    more_comments_limit = 32 # "load more comments" requests per submission, biggest branches first (None: all)
+    more_comments_threshold = 0 # skip "load more" branches hiding fewer comments than this
+    max_comment_depth = 100 # replies nested deeper than this are not collected (None: no limit)
+    subreddit_names = None # e.g. ["WorldofTanks", "WorldofTanksBlitz", "WorldofTanksConsole"]: sharded extraction
+    shard_processes = 4 # worker processes of a sharded extraction
+    credential_sets = 1 # Reddit apps in the env (CLIENT_ID, CLIENT_ID_2, ...), each with its own request budget
+
+class LoaderConfigs:
+    write_engine = "copy" # "copy" or "executemany"
+    copy_chunk_size = 50_000 # rows per COPY + merge round
+    pool_max_connections = 8
+    pool_health_check_seconds = 30 # ping connections idle for longer than this
+    stream_queue_size = 4 # chunks buffered between producer and writer in write_stream
+    fetch_size = 2_000 # rows per round trip for server-side cursors in stream_query/query_vectors
+    vector_copy_format = "binary" # "binary" or "text" COPY for tables with vector/halfvec columns
+    skip_unchanged_upserts = True # upserts leave rows whose non-key columns are identical untouched
+
+class PipelineConfigs:
+    max_parallel_stages = 4 # stages PipelineRunner may run at the same time
+    max_pending_attempts = 5 # pending ids are retried by work discovery until they fail this often
+    metrics_enabled = True # timers/counters around the hot paths, one run_metrics row per stage
+    metrics_json_path = None # also export each run's metrics to this JSON file
+
+class VectorIndexConfigs:
+    method = "auto" # "ivfflat", "hnsw", or "auto" (ivfflat below hnsw_min_rows, hnsw from there)
+    min_rows = 1_000 # below this an exact scan is fast enough and no ANN index is kept
+    hnsw_min_rows = 200_000
+    rebuild_drift = 0.5 # share of rows added/changed since the last build that triggers a rebuild
+    hnsw_m = 16
+    hnsw_ef_construction = 64
+    target_recall = 0.95 # recall@tune_k the query-time probes/ef_search are tuned for
+    tune_queries = 50 # sample embeddings used as queries when tuning
+    tune_k = 10
+
+class AnalyticsConfigs:
+    rollups_enabled = True # stages refresh the rollup tables for the rows they write
+    refresh_batch_keys = 500 # days / posts recomputed per rollup statement
+
+class SnapshotConfigs:
+    root_dir = "results/snapshot" # <root_dir>/<table>/day=YYYY-MM-DD/part-0.parquet
+    tables = ["posts", "comments", "posts_ai_analysis"] # exported/imported in this order (comments need their posts)
+    file_format = "parquet" # "parquet" (compressed, row-group statistics) or "arrow" (uncompressed IPC, zero-copy mmap)
+    compression = "zstd" # Parquet codec of the non-vector columns
+    row_group_rows = 100_000
+
+class AIConfigs:
+    chat_model = "gpt-4o-mini"
+    embedding_model = "text-embedding-3-small"
+    embedding_dimensions = None # shorter text-embedding-3 vectors, e.g. 512; must match the EMBEDDINGS column
+    embedding_batch_size = 256 # inputs per embeddings request (API max 2048)
+    embedding_batch_tokens = 100_000 # estimated tokens per embeddings request (API max 300k)
+    embedding_max_attempts = 3 # per sub-batch, for transient (429/5xx/timeout) failures
+    retry_backoff_seconds = 1.0
+    async_mode = True # classify posts concurrently with the async client
+    concurrency = 16 # in-flight chat requests in async mode
+    request_timeout_seconds = 30
+    max_attempts = 5 # per post, for 429/5xx/timeouts in async mode
+    max_backoff_seconds = 60
+    cache_enabled = True # reuse results for identical (model, prompt version, text)
+    cache_path = ".cache/ai_results.sqlite"
+    cache_max_bytes = 256 * 1024 * 1024 # LRU eviction past this payload size
+    batch_work_dir = ".cache/batch_jobs" # request files and resume state of batch jobs
+    batch_poll_seconds = 60
+    batch_chunk_size = 500 # rows written to posts_ai_analysis per chunk
 
 class SchemaConfigs:
     table_mapping = {
@@ -36,5 +106,43 @@ class SchemaConfigs:
             "reasoning",
             "created_utc",
             "embeddings",
+        ],
+        "comment_crawl_state":[
+            "post_id",
+            "num_comments",
+            "last_crawled_utc"
+        ],
+        "pipeline_checkpoints":[
+            "stage",
+            "watermark",
+            "last_run_utc",
+            "rows_processed"
+        ],
+        "pipeline_pending":[
+            "stage",
+            "item_id",
+            "attempts",
+            "last_error"
+        ],
+        "vector_index_state":[
+            "table_name",
+            "column_name",
+            "index_name",
+            "method",
+            "build_params",
+            "query_params",
+            "recall",
+            "baseline_rows",
+            "baseline_utc",
+            "built_utc"
+        ],
+        "run_metrics":[
+            "run_id",
+            "stage",
+            "status",
+            "started_utc",
+            "duration_seconds",
+            "rows_written",
+            "metrics"
         ]
     }   
\ No newline at end of file
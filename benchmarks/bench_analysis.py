@@ -0,0 +1,86 @@
+"""
+Sequential vs async post analysis (classification + embeddings) against the local OpenAI stub.
+
+Usage:
+    python -m benchmarks.bench_analysis --posts 200 --latency 0.2 --concurrency 16
+
+Both modes must return identical row tuples. The async run also injects a burst of 429s
+to exercise the adaptive backoff.
+"""
+import argparse
+import asyncio
+import time
+import numpy as np
+from openai import OpenAI, AsyncOpenAI
+from ai_moderator.analyze_posts import PostAnalyzer
+from ai_moderator.chatbot import AIModerator
+from api.configs import AIConfigs
+from benchmarks.stubs.openai_stub import OpenAIStubServer
+
+
+def make_posts(n: int):
+    return [
+        {
+            "id": f"post{i}",
+            "title": f"Is the tier {i % 10} grind worth it?",
+            "author": f"user_{i % 37}",
+            "flair": "Discussion",
+            "selftext": f"Post body number {i}, mostly complaining about arty.",
+            "created_utc": "2025-06-18 23:24:37+00",
+        }
+        for i in range(n)
+    ]
+
+
+def same_rows(a, b) -> bool:
+    """Compares row tuples field by field; the trailing float32 embeddings with np.array_equal."""
+
+    return len(a) == len(b) and all(
+        x[:-1] == y[:-1]
+        and ((x[-1] is None and y[-1] is None) or np.array_equal(x[-1], y[-1]))
+        for x, y in zip(a, b)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub latency per request (s)")
+    parser.add_argument("--concurrency", type=int, default=AIConfigs.concurrency)
+    parser.add_argument("--rate-limited", type=int, default=20, help="429s injected in the async run")
+    args = parser.parse_args()
+
+    posts = make_posts(args.posts)
+    analyzer = PostAnalyzer()
+    AIConfigs.retry_backoff_seconds = 0.1
+
+    with OpenAIStubServer(
+        latency_seconds=args.latency, transient_status=429, transient_path="/chat/completions"
+    ) as stub:
+        moderator = AIModerator(
+            client=OpenAI(api_key="stub", base_url=stub.base_url, max_retries=0),
+            async_client=AsyncOpenAI(api_key="stub", base_url=stub.base_url, max_retries=0),
+        )
+
+        t0 = time.perf_counter()
+        sequential = analyzer.process_posts(moderator=moderator, posts=posts)
+        sequential_seconds = time.perf_counter() - t0
+
+        stub.transient_failures = stub.requests + args.rate_limited
+        t0 = time.perf_counter()
+        concurrent = asyncio.run(
+            analyzer.aprocess_posts(moderator=moderator, posts=posts, concurrency=args.concurrency)
+        )
+        async_seconds = time.perf_counter() - t0
+
+    assert same_rows(concurrent, sequential), "async rows differ from sequential rows"
+
+    print(f"\n{args.posts} posts, {args.latency * 1000:.0f} ms stub latency")
+    print(f"{'mode':<26} {'seconds':>9} {'posts/s':>9}")
+    print(f"{'sequential':<26} {sequential_seconds:>9.2f} {args.posts / sequential_seconds:>9.1f}")
+    label = f"async x{args.concurrency} (+{args.rate_limited} 429s)"
+    print(f"{label:<26} {async_seconds:>9.2f} {args.posts / async_seconds:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
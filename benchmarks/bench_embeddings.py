@@ -0,0 +1,74 @@
+"""
+Per-post vs batched embedding generation against the local OpenAI stub.
+
+Usage:
+    python -m benchmarks.bench_embeddings --posts 500 --latency 0.05
+
+Also checks that every batched vector is mapped back to the right post and that a
+poisoned input only costs its own embedding, not its whole batch, and that transient
+server errors are retried.
+"""
+import argparse
+import time
+import numpy as np
+from openai import OpenAI
+from ai_moderator.chatbot import AIModerator
+from benchmarks.stubs.openai_stub import OpenAIStubServer, stub_embedding
+
+
+def make_texts(n: int):
+    return {f"post{i}": f"Post number {i} about the tier {i % 10} heavy tank grind" for i in range(n)}
+
+
+def same_vectors(a, b) -> bool:
+    """True if both dicts map the same keys to equal vectors (float32 arrays or None)."""
+
+    return a.keys() == b.keys() and all(
+        (a[key] is None and b[key] is None) or np.array_equal(a[key], b[key]) for key in a
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub latency per request (s)")
+    args = parser.parse_args()
+
+    texts = make_texts(args.posts)
+
+    with OpenAIStubServer(latency_seconds=args.latency) as stub:
+        moderator = AIModerator(client=OpenAI(api_key="stub", base_url=stub.base_url, max_retries=0))
+
+        t0 = time.perf_counter()
+        single = {key: moderator.generate_embeddings(text) for key, text in texts.items()}
+        single_seconds, single_requests = time.perf_counter() - t0, stub.requests
+
+        t0 = time.perf_counter()
+        batched = moderator.generate_embeddings_batch(texts)
+        batch_seconds, batch_requests = time.perf_counter() - t0, stub.requests - single_requests
+
+        expected = {key: stub_embedding(moderator.clean_comment(text)) for key, text in texts.items()}
+        assert same_vectors(batched, single) and same_vectors(batched, expected), (
+            "batched vectors do not match their inputs"
+        )
+
+        poisoned = dict(texts, poisoned="this one is __FAIL__")
+        before = stub.requests
+        retried = moderator.generate_embeddings_batch(poisoned)
+        assert retried["poisoned"] is None
+        assert same_vectors({key: retried[key] for key in texts}, batched), "healthy inputs were lost"
+        retry_requests = stub.requests - before
+
+        stub.transient_failures = stub.requests + 2
+        flaky = moderator.generate_embeddings_batch(texts)
+        assert same_vectors(flaky, batched), "transient failures were not retried"
+
+    print(f"\n{args.posts} posts, {args.latency * 1000:.0f} ms stub latency")
+    print(f"{'mode':<10} {'requests':>9} {'seconds':>9}")
+    print(f"{'per-post':<10} {single_requests:>9} {single_seconds:>9.2f}")
+    print(f"{'batched':<10} {batch_requests:>9} {batch_seconds:>9.2f}")
+    print(f"poisoned input isolated after {retry_requests} requests")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Import cost of the pipeline entry points, measured with `python -X importtime` in fresh
+interpreters, plus the wall time of `main.py --dry-run`.
+
+Usage:
+    python -m benchmarks.bench_import_time --repeat 5 --budget-ms 100
+
+Exits non-zero when an entry point's median import time exceeds `--budget-ms` or when importing
+it pulls in one of the heavy libraries that should only load once a stage actually runs, so
+it can gate CI against regressions of the lazy initialization in etl/context.py.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ENTRY_POINTS = ["main", "etl.ai_analysis", "etl.extract_load_posts", "etl.extract_load_comments"]
+HEAVY_MODULES = ["pandas", "numpy", "openai", "praw", "psycopg2", "dotenv"]
+
+
+def import_profile(module: str) -> Tuple[float, List[str]]:
+    """Cumulative import time of `module` in ms and the heavy modules it imported."""
+
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+
+    cumulative_us, imported = None, set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        imported.add(name)
+        if name == module:
+            cumulative_us = int(cumulative)
+    heavy = [name for name in HEAVY_MODULES if name in imported]
+    return (cumulative_us or 0) / 1000, heavy
+
+
+def dry_run_seconds() -> float:
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "main.py", "--dry-run"], check=True, capture_output=True)
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    failures = []
+    results: Dict[str, Tuple[float, List[str]]] = {}
+    for module in ENTRY_POINTS:
+        runs = [import_profile(module) for _ in range(args.repeat)]
+        median_ms = statistics.median(ms for ms, _ in runs)
+        heavy = runs[-1][1]
+        results[module] = (median_ms, heavy)
+        if median_ms > args.budget_ms:
+            failures.append(f"{module}: {median_ms:.1f} ms > {args.budget_ms:.0f} ms budget")
+        if heavy:
+            failures.append(f"{module}: imports {', '.join(heavy)} at import time")
+
+    print(f"{'entry point':<28} {'import ms':>10}  heavy modules")
+    for module, (median_ms, heavy) in results.items():
+        print(f"{module:<28} {median_ms:>10.1f}  {', '.join(heavy) or '-'}")
+    dry_runs = [dry_run_seconds() for _ in range(args.repeat)]
+    print(f"{'main.py --dry-run (wall)':<28} {statistics.median(dry_runs) * 1000:>10.1f}")
+
+    if failures:
+        print("\nREGRESSION:\n" + "\n".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
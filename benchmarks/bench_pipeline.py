@@ -0,0 +1,274 @@
+"""
+Offline end-to-end benchmark of the pipeline stages against local stand-ins: the fake Reddit API
+(benchmarks/stubs/reddit_stub.py) behind unmodified PRAW, the OpenAI stub and a local Postgres.
+
+Usage:
+    python -m benchmarks.bench_pipeline --posts 450 --depth 3 --fanout 3 \\
+        --reddit-latency 0.02 --openai-latency 0.05 --json results/bench_pipeline.json
+    python -m benchmarks.bench_pipeline --baseline results/bench_pipeline.json
+
+Stages run one after another in this process, through the same entry points as main.py. For each
+stage it reports rows written per second, p50/p99 latency of the stage's external calls (Reddit
+and OpenAI HTTP requests, DataLoader writes) and peak RSS. `--json` saves the results and
+`--baseline` prints the change against a saved run.
+
+Uses the same DB_* environment variables as the ETL jobs, but creates its tables in a scratch
+schema (`--schema`, dropped afterwards unless `--keep`), so existing data is never touched.
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from benchmarks.stubs.openai_stub import OpenAIStubServer
+from benchmarks.stubs.reddit_stub import RedditStubServer
+
+SCHEMA_SQL = Path(__file__).resolve().parent.parent / "data_model" / "schema.sql"
+STAGE_TABLES = {
+    "etl_posts": "posts",
+    "analyze_posts": "posts_ai_analysis",
+    "etl_comments": "comments",
+}
+
+
+class _RssSampler:
+    """Samples this process' resident set size in a background thread; `peak` is in bytes."""
+
+    def __init__(self, interval_seconds: float = 0.005) -> None:
+        self.interval_seconds = interval_seconds
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._page_size = os.sysconf("SC_PAGE_SIZE")
+
+    def _rss(self) -> int:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * self._page_size
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._rss())
+            self._stop.wait(self.interval_seconds)
+
+    def __enter__(self) -> "_RssSampler":
+        self.peak = self._rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._rss())
+
+
+class _CallTimer:
+    """Records the wall time of every call to the wrapped methods while it is installed."""
+
+    def __init__(self) -> None:
+        self.latencies: List[float] = []
+        self._lock = threading.Lock()
+
+    def _record(self, seconds: float) -> None:
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def _wrap(self, func: Callable) -> Callable:
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._record(time.perf_counter() - t0)
+
+        return timed
+
+    def _wrap_async(self, func: Callable) -> Callable:
+        async def timed(*args: Any, **kwargs: Any) -> Any:
+            t0 = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self._record(time.perf_counter() - t0)
+
+        return timed
+
+    @contextmanager
+    def installed(self) -> Iterator["_CallTimer"]:
+        """Times Reddit requests (requests), OpenAI requests (httpx) and DataLoader writes."""
+
+        import httpx
+        import requests
+        from dataloader.load_data import DataLoader
+
+        targets = [
+            (requests.Session, "send", self._wrap),
+            (httpx.Client, "send", self._wrap),
+            (httpx.AsyncClient, "send", self._wrap_async),
+            (DataLoader, "write_data", self._wrap),
+        ]
+        originals = [(owner, name, getattr(owner, name)) for owner, name, _ in targets]
+        for owner, name, wrap in targets:
+            setattr(owner, name, wrap(getattr(owner, name)))
+        try:
+            yield self
+        finally:
+            for owner, name, original in originals:
+                setattr(owner, name, original)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def prepare_environment(
+    args: argparse.Namespace, reddit: RedditStubServer, openai_stub: OpenAIStubServer, tmp: str
+) -> None:
+    """Points PRAW, the OpenAI client and libpq at the stand-ins and tunes configs for the run."""
+
+    os.environ.update(reddit.praw_config_env(tmp))
+    os.environ["OPENAI_BASE_URL"] = openai_stub.base_url
+    os.environ["API_KEY"] = "stub"
+    for name in ("CLIENT_ID", "CLIENT_SECRET", "REDDIT_USERNAME"):
+        os.environ.setdefault(name, "stub")
+    # every connection of the pipeline's DataLoader resolves tables in the scratch schema first
+    os.environ["PGOPTIONS"] = f"-c search_path={args.schema},public"
+
+    from api.configs import AIConfigs, PostAPIConfigs
+
+    PostAPIConfigs.subreddit_name = reddit.subreddits[0]
+    PostAPIConfigs.post_limit = args.posts
+    if not args.respect_rate_limit:
+        PostAPIConfigs.requests_per_window = 10**9
+    AIConfigs.cache_enabled = args.cache
+    AIConfigs.cache_path = os.path.join(tmp, "ai_results.sqlite")
+
+
+def run_stage(name: str, func: Callable[[], None], loader: Any) -> Dict[str, Any]:
+    table = STAGE_TABLES[name]
+    count = f"SELECT count(*) AS n FROM {table};"
+    rows_before = int(loader.query_table(count)["n"][0])
+
+    timer = _CallTimer()
+    with timer.installed(), _RssSampler() as rss:
+        t0 = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - t0
+
+    rows = int(loader.query_table(count)["n"][0]) - rows_before
+    return {
+        "stage": name,
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds else 0.0,
+        "calls": len(timer.latencies),
+        "p50_ms": _percentile(timer.latencies, 50) * 1000,
+        "p99_ms": _percentile(timer.latencies, 99) * 1000,
+        "peak_rss_mb": rss.peak / 2**20,
+    }
+
+
+def print_results(
+    results: List[Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]]
+) -> None:
+    header = (
+        f"{'stage':<14} {'rows':>7} {'seconds':>8} {'rows/s':>9} {'calls':>6} "
+        f"{'p50 ms':>8} {'p99 ms':>8} {'peak RSS MB':>12}"
+    )
+    if baseline:
+        header += f" {'rows/s vs base':>15}"
+    print(header)
+    for r in results:
+        line = (
+            f"{r['stage']:<14} {r['rows']:>7} {r['seconds']:>8.2f} {r['rows_per_second']:>9.1f} "
+            f"{r['calls']:>6} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['peak_rss_mb']:>12.0f}"
+        )
+        base = (baseline or {}).get(r["stage"])
+        if base and base["rows_per_second"]:
+            change = r["rows_per_second"] / base["rows_per_second"] - 1
+            line += f" {change:>+14.1%}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--posts", type=int, default=450, help="posts in the subreddit (and post_limit)")
+    parser.add_argument("--depth", type=int, default=3, help="comment tree depth")
+    parser.add_argument("--fanout", type=int, default=3, help="replies per comment")
+    parser.add_argument("--reddit-latency", type=float, default=0.02)
+    parser.add_argument("--openai-latency", type=float, default=0.05)
+    parser.add_argument(
+        "--stages", nargs="+", default=list(STAGE_TABLES), choices=list(STAGE_TABLES)
+    )
+    parser.add_argument("--schema", default="bench_pipeline")
+    parser.add_argument("--cache", action="store_true", help="keep the AI result cache enabled")
+    parser.add_argument(
+        "--respect-rate-limit", action="store_true", help="keep PostAPIConfigs' Reddit budget"
+    )
+    parser.add_argument("--keep", action="store_true", help="do not drop the scratch schema")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare against results saved with --json")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        baseline = {r["stage"]: r for r in json.loads(Path(args.baseline).read_text())["stages"]}
+
+    reddit = RedditStubServer(
+        posts_per_subreddit=args.posts,
+        comment_depth=args.depth,
+        comment_fanout=args.fanout,
+        latency_seconds=args.reddit_latency,
+    )
+    openai_stub = OpenAIStubServer(latency_seconds=args.openai_latency)
+
+    with tempfile.TemporaryDirectory() as tmp, reddit, openai_stub:
+        prepare_environment(args, reddit, openai_stub, tmp)
+
+        # imported after the environment is set up: the context reads it lazily on first use
+        from etl.context import context
+        from etl.ai_analysis import analyze_posts
+        from etl.extract_load_comments import etl_comments
+        from etl.extract_load_posts import etl_posts
+
+        funcs = {
+            "etl_posts": etl_posts,
+            "analyze_posts": analyze_posts,
+            "etl_comments": etl_comments,
+        }
+        loader = context.loader
+        loader.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE; CREATE SCHEMA {args.schema};")
+        loader.execute(SCHEMA_SQL.read_text())
+
+        results = []
+        try:
+            for name in args.stages:
+                results.append(run_stage(name, funcs[name], loader))
+        finally:
+            if not args.keep:
+                loader.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE;")
+            context.close()
+
+    print(
+        f"\n{args.posts} posts, {reddit.comments_per_post} comments/post, "
+        f"Reddit latency {args.reddit_latency}s, OpenAI latency {args.openai_latency}s"
+    )
+    print_results(results, baseline)
+    print(f"Reddit requests: {reddit.requests}; OpenAI requests: {openai_stub.requests}")
+
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.json).write_text(json.dumps({"args": vars(args), "stages": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
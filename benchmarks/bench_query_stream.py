@@ -0,0 +1,107 @@
+"""
+Reads a pgvector column back into a float32 matrix: query_table + parsing the text vectors
+(one DataFrame holding every row) vs query_vectors (server-side cursor, binary vectors
+decoded into a preallocated array).
+
+Usage:
+    python -m benchmarks.bench_query_stream --rows 50000 --dim 1536
+
+Uses the same DB_* environment variables as the ETL jobs and a scratch table that is dropped
+afterwards. Each reader runs in its own process so peak RSS (which includes libpq's client-side
+result buffer) is comparable.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+import numpy as np
+from dotenv import load_dotenv
+from dataloader.load_data import DataLoader
+from utils.utilities import get_env_variable
+
+BENCH_TABLE = "bench_query_stream"
+QUERY = f"SELECT id, embeddings FROM {BENCH_TABLE} ORDER BY id;"
+
+
+def make_loader() -> DataLoader:
+    load_dotenv()
+    return DataLoader(
+        user=get_env_variable("DB_USER"),
+        password=get_env_variable("DB_PASSWORD"),
+        host=get_env_variable("DB_HOST"),
+        port=get_env_variable("DB_PORT"),
+        dbname=get_env_variable("DB_NAME"),
+    )
+
+
+def read(reader: str) -> dict:
+    loader = make_loader()
+    t0 = time.perf_counter()
+    if reader == "query_table":
+        df = loader.query_table(QUERY)
+        vectors = np.array(
+            [np.array(vector[1:-1].split(","), dtype=np.float32) for vector in df["embeddings"]],
+            dtype=np.float32,
+        )
+    else:
+        df, vectors = loader.query_vectors(QUERY, vector_column="embeddings")
+    seconds = time.perf_counter() - t0
+    loader.close()
+    return {
+        "seconds": seconds,
+        "shape": list(vectors.shape),
+        "checksum": float(vectors.sum(dtype=np.float64)),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--reader", choices=["query_table", "query_vectors"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.reader:
+        print(json.dumps(read(args.reader)))
+        return
+
+    loader = make_loader()
+    loader.drop_table(BENCH_TABLE)
+    loader.create_table(BENCH_TABLE, {"id": "BIGINT PRIMARY KEY", "embeddings": f"vector({args.dim})"})
+    with loader._connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {BENCH_TABLE}
+                SELECT i, (SELECT array_agg(random()) FROM generate_series(1, %s) WHERE i > 0)::vector
+                FROM generate_series(1, %s) AS i;
+                """,
+                (args.dim, args.rows),
+            )
+        conn.commit()
+
+    try:
+        print(f"\n{args.rows} rows x {args.dim} dims")
+        print(f"{'reader':<14} {'seconds':>9} {'peak RSS MB':>12} {'checksum':>14}")
+        for reader in ("query_table", "query_vectors"):
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_query_stream", "--reader", reader],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            print(
+                f"{reader:<14} {result['seconds']:>9.2f} {result['peak_rss_mb']:>12.0f} "
+                f"{result['checksum']:>14.1f}"
+            )
+    finally:
+        loader.drop_table(BENCH_TABLE)
+        loader.close()
+
+
+if __name__ == "__main__":
+    main()
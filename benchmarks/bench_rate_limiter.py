@@ -0,0 +1,164 @@
+"""
+Reddit request pacing against the fake Reddit API enforcing a real quota: the fixed token bucket
+(`PostAPIConfigs.adaptive_ratelimit = False`) vs the limiter pacing on Reddit's
+`x-ratelimit-*` headers, each with a configured budget at, below and above the actual quota.
+
+Usage:
+    python -m benchmarks.bench_rate_limiter --posts 60 --quota 60 --window 5 \\
+        --configured 30 60 120
+
+The stub allows `--quota` API requests per fixed `--window` seconds and app, answers the rest
+with 429 and reports the quota in its response headers. Every variant extracts the posts, then
+the comments (PostAPIConfigs.comment_workers threads), of one subreddit with its own app, so
+the quota windows do not carry over. The script reports wall time, requests, the 429s the stub
+sent, the most requests one quota window saw and the limiter state at the end. With `--check`
+it asserts that every header-paced variant got all comments without a 429 while its busiest
+window used at least 80% of the quota, i.e. that throughput matches the headers' budget. Tables
+live in a scratch schema (`--schema`) of the DB_* database, dropped afterwards.
+"""
+import argparse
+import os
+import tempfile
+import time
+from benchmarks.bench_pipeline import SCHEMA_SQL
+from benchmarks.stubs.reddit_stub import RedditStubServer
+
+TABLES = ["posts", "comments", "comment_crawl_state", "pipeline_checkpoints", "pipeline_pending"]
+
+
+def run_variant(client_id: str, configured: int, adaptive: bool) -> dict:
+    from api.configs import PostAPIConfigs
+    from etl.context import context
+    from etl.extract_load_comments import etl_comments
+    from etl.extract_load_posts import etl_posts
+    from extractors.rate_limiter import RateLimiter
+
+    PostAPIConfigs.adaptive_ratelimit = adaptive
+    settings = context.subreddit_settings(
+        PostAPIConfigs.subreddit_name, {"client_id": client_id, "secret": "stub"}, configured
+    )
+    error = None
+    try:
+        etl_posts(reddit_settings=settings)
+        etl_comments(reddit_settings=settings)
+    except Exception as e:
+        error = e.__class__.__name__
+    limiter = RateLimiter.shared(
+        client_id=client_id,
+        max_requests=configured,
+        period_seconds=PostAPIConfigs.ratelimit_seconds,
+        adaptive=adaptive,
+    )
+    return {"error": error, **limiter.state()}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--posts", type=int, default=60)
+    parser.add_argument("--quota", type=int, default=60, help="requests per window and app")
+    parser.add_argument("--window", type=float, default=5.0, help="quota window in seconds")
+    parser.add_argument(
+        "--configured", type=int, nargs="+", default=[30, 60, 120],
+        help="PostAPIConfigs.requests_per_window values to run with",
+    )
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--schema", default="bench_rate_limiter")
+    parser.add_argument(
+        "--check", action="store_true", help="fail unless header pacing uses the quota without 429s"
+    )
+    args = parser.parse_args()
+
+    reddit = RedditStubServer(
+        subreddits=["wot"],
+        posts_per_subreddit=args.posts,
+        comment_depth=3,
+        comment_fanout=3,
+        latency_seconds=args.latency,
+        ratelimit_quota=args.quota,
+        ratelimit_window=args.window,
+    )
+
+    with tempfile.TemporaryDirectory() as tmp, reddit:
+        os.environ.update(reddit.praw_config_env(tmp))
+        os.environ["PGOPTIONS"] = f"-c search_path={args.schema},public"
+        os.environ.setdefault("REDDIT_USERNAME", "stub")
+
+        from api.configs import PostAPIConfigs
+        from etl.context import context
+
+        PostAPIConfigs.subreddit_name = "wot"
+        PostAPIConfigs.post_limit = args.posts
+        PostAPIConfigs.ratelimit_seconds = args.window
+
+        loader = context.loader
+        loader.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE; CREATE SCHEMA {args.schema};")
+        loader.execute(SCHEMA_SQL.read_text())
+        results = []
+        try:
+            for adaptive in (False, True):
+                for configured in args.configured:
+                    client_id = f"app-{len(results)}"
+                    loader.execute(f"TRUNCATE {', '.join(TABLES)} CASCADE;")
+                    t0 = time.perf_counter()
+                    state = run_variant(client_id, configured, adaptive)
+                    seconds = time.perf_counter() - t0
+                    comments = int(
+                        loader.query_table("SELECT count(*) AS n FROM comments;")["n"][0]
+                    )
+                    times = reddit.request_times.get(client_id, [])
+                    per_window = {}
+                    for t in times:
+                        window = int((t - reddit._started) // args.window)
+                        per_window[window] = per_window.get(window, 0) + 1
+                    label = f"{'headers' if adaptive else 'bucket'}, {configured}/{args.window:g}s"
+                    results.append(
+                        (
+                            adaptive,
+                            label,
+                            seconds,
+                            comments,
+                            len(times),
+                            reddit.throttled.get(client_id, 0),
+                            max(per_window.values(), default=0),
+                            state,
+                        )
+                    )
+        finally:
+            loader.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE;")
+            context.close()
+
+    print(
+        f"\n{args.posts} posts, {reddit.comments_per_post} comments/post; "
+        f"actual quota {args.quota} requests / {args.window:g}s"
+    )
+    print(
+        f"{'limiter, configured':<22} {'seconds':>8} {'comments':>9} {'requests':>9} "
+        f"{'429s':>5} {'peak/window':>12}  state"
+    )
+    for _, label, seconds, comments, requests, throttled, peak, state in results:
+        summary = f"{state['mode']}, waited {state['waited_seconds']}s"
+        if state["error"]:
+            summary += f", failed: {state['error']}"
+        print(
+            f"{label:<22} {seconds:>8.1f} {comments:>9} {requests:>9} {throttled:>5} "
+            f"{peak:>12}  {summary}"
+        )
+
+    if args.check:
+        expected = args.posts * reddit.comments_per_post
+        for adaptive, label, _, comments, _, throttled, peak, state in results:
+            if not adaptive:
+                continue
+            assert state["error"] is None, f"{label}: extraction failed with {state['error']}"
+            assert throttled == 0, f"{label}: {throttled} requests answered with 429"
+            assert comments == expected, f"{label}: {comments} of {expected} comments written"
+            assert 0.8 * args.quota <= peak <= args.quota, (
+                f"{label}: busiest window saw {peak} requests, quota is {args.quota}"
+            )
+        print("check passed: header pacing used the quota without 429s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Dashboard queries answered from the analytics rollups (analytics.rollups.CommunityAnalytics)
+vs the same aggregates computed from `posts`, `comments` and `posts_ai_analysis`, as history
+grows, plus the cost of keeping the rollups current.
+
+Usage:
+    python -m benchmarks.bench_rollups --posts 10000 100000 --comments-per-post 10 --days 365
+
+For every history size the script loads synthetic posts spread over `--days` days with their
+comments and classifications, rebuilds the rollups, then applies one pipeline run's worth of
+writes (`--batch` new posts with comments and classifications, plus new scores for as many
+recent posts, a tenth of which lose their author) and refreshes the rollups from those rows
+only, like the stages do. It reports the rebuild and incremental refresh times, checks that the
+incrementally maintained rollups equal a full rebuild and that every query returns the same
+result both ways, and prints the p50 latency of each query. Tables live in a scratch schema
+(`--schema`) of the DB_* database, dropped afterwards.
+"""
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from analytics.rollups import ROLLUPS, CommunityAnalytics, RollupManager
+from benchmarks.bench_pipeline import SCHEMA_SQL
+from benchmarks.bench_query_stream import make_loader
+
+TABLES = ["posts", "comments", "posts_ai_analysis", "pipeline_pending"] + list(ROLLUPS)
+BASE_TIME = "2025-01-01 00:00:00+00"
+
+LOAD_SQL = """
+    INSERT INTO posts (id, title, author, flair, selftext, subreddit, score, num_comments, created_utc)
+    SELECT 'p' || i, 'Post ' || i, 'author_' || (i * 7 %% 5000),
+           (ARRAY['Discussion', 'Question', 'Video', NULL])[1 + i %% 4], 'Body of post ' || i,
+           (ARRAY['WorldofTanks', 'WorldofTanksBlitz'])[1 + i %% 2], (i * 13) %% 1000,
+           %(comments)s, %(base)s::timestamptz - i * %(spacing)s * interval '1 second'
+    FROM generate_series(%(first)s, %(last)s) AS i;
+
+    INSERT INTO comments (id, post_id, parent_id, body, author, score, created_utc)
+    SELECT p.id || 'c' || j, p.id, 't3_' || p.id, 'Comment ' || j,
+           'commenter_' || ((hashtext(p.id) & 65535) * 31 + j) %% 20000, (j * 3) %% 50,
+           p.created_utc + j * interval '7 minutes'
+    FROM posts p, generate_series(1, %(comments)s) AS j
+    WHERE p.created_utc > %(base)s::timestamptz - (%(last)s + 1) * %(spacing)s * interval '1 second'
+      AND p.created_utc <= %(base)s::timestamptz - %(first)s * %(spacing)s * interval '1 second';
+
+    INSERT INTO posts_ai_analysis (id, title, author, flair, selftext, category, reasoning, created_utc)
+    SELECT id, title, author, flair, selftext,
+           (ARRAY['Positive', 'Negative', 'Neutral', 'Bug report'])[1 + (hashtext(id) & 3)],
+           'synthetic', created_utc
+    FROM posts
+    WHERE created_utc > %(base)s::timestamptz - (%(last)s + 1) * %(spacing)s * interval '1 second'
+      AND created_utc <= %(base)s::timestamptz - %(first)s * %(spacing)s * interval '1 second';
+"""
+
+# the dashboard queries computed from the base tables (no date bounds: the whole history)
+DIRECT_SQL = {
+    "category_share": """
+        SELECT (created_utc AT TIME ZONE 'UTC')::date AS day, category, count(*) AS posts,
+               count(*)::float / sum(count(*)) OVER (PARTITION BY (created_utc AT TIME ZONE 'UTC')::date) AS share
+        FROM posts_ai_analysis WHERE category IS NOT NULL
+        GROUP BY 1, 2 ORDER BY day, posts DESC, category;
+    """,
+    "top_authors": """
+        SELECT author, sum(posts) AS posts, sum(comments) AS comments,
+               sum(post_score) AS post_score, sum(comment_score) AS comment_score
+        FROM (
+            SELECT author, 1 AS posts, 0 AS comments, score AS post_score, 0 AS comment_score
+            FROM posts
+            UNION ALL
+            SELECT author, 0, 1, 0, score FROM comments
+        ) activity
+        WHERE author NOT IN ('', '[deleted]')
+        GROUP BY author ORDER BY posts DESC, author LIMIT 10;
+    """,
+    "comment_volume": """
+        SELECT c.post_id, (p.created_utc AT TIME ZONE 'UTC')::date AS day, p.title,
+               count(*) AS comments, count(DISTINCT c.author) AS commenters,
+               sum(c.score) AS comment_score, max(c.created_utc) AS last_comment_utc
+        FROM comments c JOIN posts p ON p.id = c.post_id
+        GROUP BY c.post_id, p.created_utc, p.title
+        ORDER BY comments DESC, c.post_id LIMIT 20;
+    """,
+    "score_by_flair": """
+        SELECT coalesce(flair, '') AS flair, count(*) AS posts, avg(score)::float AS avg_score,
+               avg(num_comments)::float AS avg_num_comments
+        FROM posts GROUP BY 1 ORDER BY posts DESC, flair;
+    """,
+}
+
+
+def load_history(loader, posts: int, comments: int, days: int, batch: int = 20_000) -> float:
+    spacing = days * 86400 / posts
+    for first in range(0, posts, batch):
+        loader.execute(
+            LOAD_SQL,
+            {
+                "first": first,
+                "last": min(first + batch, posts) - 1,
+                "comments": comments,
+                "base": BASE_TIME,
+                "spacing": spacing,
+            },
+        )
+    loader.execute("ANALYZE;")
+    return spacing
+
+
+def pipeline_run(loader, manager: RollupManager, n: int, comments: int, spacing: float) -> float:
+    """One run's writes (n new posts, comments and classifications, n rescored posts), then the
+    rollup refresh the stages do for them; returns the refresh seconds."""
+
+    # new posts are newer than the history: negative offsets from BASE_TIME
+    loader.execute(
+        LOAD_SQL,
+        {"first": -n, "last": -1, "comments": comments, "base": BASE_TIME, "spacing": spacing},
+    )
+    new_ids = [f"p{i}" for i in range(-n, 0)]
+    rescored = [f"p{i}" for i in range(n)]
+    # keys before the upsert, like the stages take them: every 10th rescored post loses its author
+    t0 = time.perf_counter()
+    previous_keys = manager.touched_keys("posts", rescored)
+    lookup_seconds = time.perf_counter() - t0
+    loader.execute(
+        """
+        UPDATE posts SET score = score + 1, num_comments = num_comments + 1,
+                         author = CASE WHEN substr(id, 2)::int %% 10 = 0 THEN '[deleted]' ELSE author END
+        WHERE id = ANY(%(ids)s);
+        """,
+        {"ids": rescored},
+    )
+    comment_ids = loader.query_table(
+        "SELECT id FROM comments WHERE post_id = ANY(%(ids)s);", params={"ids": new_ids}
+    )["id"].to_list()
+
+    t0 = time.perf_counter()
+    manager.update("posts", new_ids + rescored, previous_keys)
+    manager.update("comments", comment_ids)
+    manager.update("posts_ai_analysis", new_ids)
+    return lookup_seconds + time.perf_counter() - t0
+
+
+def snapshot(loader) -> dict:
+    return {
+        table: loader.query_table(f"SELECT * FROM {table} ORDER BY 1, 2, 3;")
+        for table in ROLLUPS
+    }
+
+
+def same(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    if a.shape != b.shape:
+        return False
+    for column in a.columns:
+        x, y = a[column].to_numpy(), b[column].to_numpy()
+        if x.dtype.kind == "f" or y.dtype.kind == "f":
+            if not np.allclose(x.astype(float), y.astype(float), equal_nan=True):
+                return False
+        elif not (pd.Series(x).astype(str) == pd.Series(y).astype(str)).all():
+            return False
+    return True
+
+
+def p50_ms(run, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times) * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--posts", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--comments-per-post", type=int, default=10)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--batch", type=int, default=450, help="posts written per pipeline run")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--schema", default="bench_rollups")
+    args = parser.parse_args()
+
+    os.environ["PGOPTIONS"] = f"-c search_path={args.schema},public"
+    loader = make_loader()
+    manager = RollupManager(loader)
+    analytics = CommunityAnalytics(loader)
+    rollup_queries = {
+        "category_share": analytics.category_share,
+        "top_authors": analytics.top_authors,
+        "comment_volume": analytics.comment_volume,
+        "score_by_flair": analytics.score_by_flair,
+    }
+
+    loader.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE; CREATE SCHEMA {args.schema};")
+    loader.execute(SCHEMA_SQL.read_text())
+    results = []
+    try:
+        for posts in args.posts:
+            loader.execute(f"TRUNCATE {', '.join(TABLES)} CASCADE;")
+            spacing = load_history(loader, posts, args.comments_per_post, args.days)
+
+            t0 = time.perf_counter()
+            manager.rebuild()
+            rebuild_seconds = time.perf_counter() - t0
+            refresh_seconds = pipeline_run(
+                loader, manager, args.batch, args.comments_per_post, spacing
+            )
+            incremental = snapshot(loader)
+            manager.rebuild()
+            consistent = all(same(incremental[t], df) for t, df in snapshot(loader).items())
+
+            timings = {}
+            for name, query in rollup_queries.items():
+                direct = lambda name=name: loader.query_table(DIRECT_SQL[name])
+                timings[name] = (
+                    p50_ms(direct, args.repeat),
+                    p50_ms(query, args.repeat),
+                    same(direct(), query()),
+                )
+            results.append((posts, rebuild_seconds, refresh_seconds, consistent, timings))
+    finally:
+        loader.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE;")
+        loader.close()
+
+    print(
+        f"\n{args.comments_per_post} comments/post over {args.days} days; "
+        f"pipeline run = {args.batch} new + {args.batch} rescored posts"
+    )
+    for posts, rebuild_seconds, refresh_seconds, consistent, timings in results:
+        print(
+            f"\n{posts} posts: rebuild {rebuild_seconds:.2f}s, incremental refresh "
+            f"{refresh_seconds:.2f}s, incremental == rebuild: {consistent}"
+        )
+        print(f"{'query':<16} {'base ms':>9} {'rollup ms':>10} {'same':>5}")
+        for name, (direct_ms, rollup_ms, equal) in timings.items():
+            print(f"{name:<16} {direct_ms:>9.1f} {rollup_ms:>10.1f} {str(equal):>5}")
+
+
+if __name__ == "__main__":
+    main()
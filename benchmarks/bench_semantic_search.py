@@ -0,0 +1,71 @@
+"""
+Query latency of the memory-mapped LocalVectorIndex at growing index sizes.
+
+Usage:
+    python -m benchmarks.bench_semantic_search --sizes 10000 100000 1000000 --queries 50
+
+Synthetic unit vectors are written block by block into a temporary index directory, so the
+1M x 1536 case needs ~6 GB of free disk but not of RAM. Reports p50/p99 latency for
+unfiltered and filtered (category + date range) top-10 queries.
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+from pathlib import Path
+from search.semantic_search import LocalVectorIndex
+
+CATEGORIES = np.array(["Positive Experience", "Negative Experience", "Bug/Issue Report", "Sarcasm/Humor"])
+
+
+def build_synthetic_index(index_dir: str, n: int, dim: int, block: int = 65_536) -> LocalVectorIndex:
+    path = Path(index_dir)
+    rng = np.random.default_rng(0)
+    embeddings = np.lib.format.open_memmap(
+        path / "embeddings.npy", mode="w+", dtype=np.float32, shape=(n, dim)
+    )
+    for begin in range(0, n, block):
+        rows = rng.standard_normal((min(block, n - begin), dim), dtype=np.float32)
+        embeddings[begin : begin + len(rows)] = LocalVectorIndex.normalize_rows(rows)
+    embeddings.flush()
+    del embeddings
+
+    np.save(path / "ids.npy", np.array([f"p{i}" for i in range(n)]))
+    np.save(path / "categories.npy", CATEGORIES[rng.integers(0, len(CATEGORIES), n)])
+    np.save(path / "flairs.npy", np.full(n, "Discussion"))
+    np.save(path / "created_utc.npy", rng.integers(1_700_000_000, 1_750_000_000, n, dtype=np.int64))
+    return LocalVectorIndex.load(index_dir)
+
+
+def latencies(index: LocalVectorIndex, queries: np.ndarray, **filters) -> np.ndarray:
+    timings = []
+    for query in queries:
+        t0 = time.perf_counter()
+        index.search(query, k=10, **filters)
+        timings.append(time.perf_counter() - t0)
+    return np.array(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    queries = np.random.default_rng(1).standard_normal((args.queries, args.dim), dtype=np.float32)
+    filters = {"category": "Bug/Issue Report", "start": "2024-01-01", "end": "2025-01-01"}
+
+    print(f"{'vectors':>9} {'query':<9} {'p50 ms':>8} {'p99 ms':>8}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as index_dir:
+            index = build_synthetic_index(index_dir, n, args.dim)
+            index.search(queries[0], k=10)  # warm the page cache
+            for label, kwargs in (("all", {}), ("filtered", filters)):
+                ms = latencies(index, queries, **kwargs)
+                print(f"{n:>9} {label:<9} {np.percentile(ms, 50):>8.2f} {np.percentile(ms, 99):>8.2f}")
+            del index
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Multi-subreddit extraction (posts, then comments) against the fake Reddit API: one subreddit
+after another in this process vs the sharded mode of etl.extract_load_sharded, with one and
+with several credential sets.
+
+Usage:
+    python -m benchmarks.bench_sharded_extraction --subreddits 4 --posts 40 \\
+        --budget 60 --window 5 --credentials 1 2 4 --processes 4
+
+`--budget` requests per `--window` seconds is the quota of every credential set, so the runs are
+rate-bound like real ones: sharding over a single app cannot go faster than its quota, more
+apps can. The stub records every request per client id; the script reports wall time, rows
+and the most requests any credential sent within one sliding window (the token bucket allows
+its burst on top of the refill, so up to twice the quota). Tables live in a scratch schema
+(`--schema`) of the DB_* database, dropped afterwards.
+"""
+import argparse
+import bisect
+import os
+import tempfile
+import time
+from typing import Dict, List
+from benchmarks.bench_pipeline import SCHEMA_SQL
+from benchmarks.stubs.reddit_stub import RedditStubServer
+
+TABLES = ["posts", "comments", "comment_crawl_state", "pipeline_checkpoints", "pipeline_pending"]
+
+
+def peak_in_window(times: List[float], window: float) -> int:
+    """Most requests sent within any `window` seconds."""
+
+    return max((bisect.bisect_left(times, t + window) - i for i, t in enumerate(times)), default=0)
+
+
+def run_sequential(subreddits: List[str]) -> None:
+    from etl.context import context
+    from etl.extract_load_comments import etl_comments
+    from etl.extract_load_posts import etl_posts
+
+    for subreddit in subreddits:
+        etl_posts(reddit_settings=context.subreddit_settings(subreddit), stage=f"etl_posts:{subreddit}")
+    for subreddit in subreddits:
+        etl_comments(
+            reddit_settings=context.subreddit_settings(subreddit),
+            stage=f"etl_comments:{subreddit}",
+            only_subreddit=True,
+        )
+
+
+def run_sharded(credential_sets: int, processes: int) -> None:
+    from api.configs import PostAPIConfigs
+    from etl.context import context
+    from etl.extract_load_sharded import run_sharded as run
+
+    PostAPIConfigs.credential_sets = credential_sets
+    PostAPIConfigs.shard_processes = processes
+    context.close()  # credentials are re-read for the new credential_sets
+    run("posts")
+    run("comments")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--subreddits", type=int, default=4)
+    parser.add_argument("--posts", type=int, default=40, help="posts per subreddit")
+    parser.add_argument("--budget", type=int, default=60, help="requests per window and app")
+    parser.add_argument("--window", type=float, default=5.0, help="quota window in seconds")
+    parser.add_argument("--credentials", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--schema", default="bench_sharded")
+    args = parser.parse_args()
+
+    subreddits = [f"wot{i}" for i in range(args.subreddits)]
+    reddit = RedditStubServer(
+        subreddits=subreddits,
+        posts_per_subreddit=args.posts,
+        comment_depth=3,
+        comment_fanout=3,
+        latency_seconds=args.latency,
+    )
+
+    with tempfile.TemporaryDirectory() as tmp, reddit:
+        # inherited by the spawned shard processes
+        os.environ.update(reddit.praw_config_env(tmp))
+        os.environ["PGOPTIONS"] = f"-c search_path={args.schema},public"
+        os.environ.setdefault("REDDIT_USERNAME", "stub")
+        for n in range(1, max(args.credentials) + 1):
+            suffix = "" if n == 1 else f"_{n}"
+            os.environ[f"CLIENT_ID{suffix}"] = f"app{n}"
+            os.environ[f"CLIENT_SECRET{suffix}"] = "stub"
+
+        from api.configs import PostAPIConfigs
+        from etl.context import context
+
+        PostAPIConfigs.subreddit_names = subreddits
+        PostAPIConfigs.post_limit = args.posts
+        PostAPIConfigs.requests_per_window = args.budget
+        PostAPIConfigs.ratelimit_seconds = args.window
+
+        variants = [("sequential, 1 app", lambda: run_sequential(subreddits))]
+        variants += [
+            (
+                f"{args.processes} processes, {n} app{'s' if n > 1 else ''}",
+                lambda n=n: run_sharded(n, args.processes),
+            )
+            for n in args.credentials
+        ]
+
+        loader = context.loader
+        loader.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE; CREATE SCHEMA {args.schema};")
+        loader.execute(SCHEMA_SQL.read_text())
+        results = []
+        try:
+            for label, run in variants:
+                loader.execute(f"TRUNCATE {', '.join(TABLES)} CASCADE;")
+                reddit.request_times.clear()
+                t0 = time.perf_counter()
+                run()
+                seconds = time.perf_counter() - t0
+                counts: Dict[str, int] = {
+                    table: int(loader.query_table(f"SELECT count(*) AS n FROM {table};")["n"][0])
+                    for table in ("posts", "comments")
+                }
+                peak = max(
+                    peak_in_window(times, args.window)
+                    for client, times in reddit.request_times.items()
+                    if client is not None
+                )
+                requests = sum(len(times) for times in reddit.request_times.values())
+                results.append((label, seconds, counts, requests, peak))
+        finally:
+            loader.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE;")
+            context.close()
+
+    print(
+        f"\n{args.subreddits} subreddits x {args.posts} posts, {reddit.comments_per_post} "
+        f"comments/post; quota {args.budget} requests / {args.window:g}s per app"
+    )
+    print(
+        f"{'variant':<24} {'seconds':>8} {'posts':>6} {'comments':>9} {'requests':>9} "
+        f"{'peak/window':>12}"
+    )
+    for label, seconds, counts, requests, peak in results:
+        print(
+            f"{label:<24} {seconds:>8.1f} {counts['posts']:>6} {counts['comments']:>9} "
+            f"{requests:>9} {peak:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
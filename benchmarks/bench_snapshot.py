@@ -0,0 +1,185 @@
+"""
+Offline copies of `posts_ai_analysis`: a flat CSV like the ones in results/ vs the
+date-partitioned Parquet and Arrow snapshots of dataloader.snapshots.
+
+Usage:
+    python -m benchmarks.bench_snapshot --rows 50000 --dim 256 --days 365
+
+The script loads synthetic classified posts with `--dim` embeddings into a scratch schema
+(`--schema`, dropped afterwards) and exports them once per format, the CSV through
+`stream_query` + `DataFrame.to_csv`. It then reports the export time and size, and the read
+times for four cases:
+- everything without embeddings
+- a projection (id, category)
+- one category over the last 30 days (filter pushdown / partition pruning)
+- every embedding as a float32 matrix (the CSV has to parse them from text)
+It checks that the embeddings and the created_utc values read back equal the database's, and
+notes the dtype created_utc comes back with.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from api.configs import SchemaConfigs
+from benchmarks.bench_pipeline import SCHEMA_SQL
+from benchmarks.bench_query_stream import make_loader
+from dataloader.snapshots import SnapshotExporter, SnapshotReader
+
+TABLE = "posts_ai_analysis"
+CATEGORIES = ["Positive Experience", "Negative Experience", "Bug/Issue Report", "Question/Help Request"]
+BASE_TIME = pd.Timestamp("2025-01-01", tz="UTC")
+
+
+def load_rows(loader, rows: int, dim: int, days: int, batch: int = 5_000) -> None:
+    rng = np.random.default_rng(0)
+    spacing = days * 86400 / rows
+    for start in range(0, rows, batch):
+        n = min(batch, rows - start)
+        vectors = rng.standard_normal((n, dim), dtype=np.float32)
+        loader.write_data(
+            table_name=TABLE,
+            data_rows=[
+                (
+                    f"p{i}",
+                    f"Post {i}",
+                    f"author_{i % 5000}",
+                    ["Discussion", "Question", "Video", None][i % 4],
+                    f"Body of post {i}. " * (1 + i % 5),
+                    CATEGORIES[i % len(CATEGORIES)],
+                    "Synthetic reasoning, with a comma.",
+                    (BASE_TIME - pd.Timedelta(seconds=i * spacing)).to_pydatetime(),
+                    vector,
+                )
+                for i, vector in zip(range(start, start + n), vectors)
+            ],
+            column_names=SchemaConfigs.table_mapping[TABLE],
+            write_method="append",
+        )
+
+
+def export_csv(loader, path: Path) -> None:
+    header = True
+    for frame in loader.stream_query(f"SELECT * FROM {TABLE} ORDER BY created_utc;"):
+        frame.to_csv(path, mode="w" if header else "a", header=header, index=False)
+        header = False
+
+
+def csv_cases(path: Path, since: pd.Timestamp) -> dict:
+    def everything():
+        return pd.read_csv(path).drop(columns=["embeddings"])
+
+    def projection():
+        return pd.read_csv(path, usecols=["id", "category"])
+
+    def filtered():
+        df = pd.read_csv(path)
+        df["created_utc"] = pd.to_datetime(df["created_utc"], utc=True, format="ISO8601")
+        return df[(df["category"] == CATEGORIES[0]) & (df["created_utc"] >= since)]
+
+    def embeddings():
+        df = pd.read_csv(path, usecols=["id", "embeddings"])
+        return df[["id"]], np.array(
+            [np.fromstring(text[1:-1], sep=",", dtype=np.float32) for text in df["embeddings"]]
+        )
+
+    return {"all columns": everything, "projection": projection, "filtered": filtered, "embeddings": embeddings}
+
+
+def snapshot_cases(reader: SnapshotReader, since: pd.Timestamp) -> dict:
+    columns = [c for c in SchemaConfigs.table_mapping[TABLE] if c != "embeddings"]
+    return {
+        "all columns": lambda: reader.read_pandas(TABLE, columns=columns + ["processing_timestamp"]),
+        "projection": lambda: reader.read_pandas(TABLE, columns=["id", "category"]),
+        "filtered": lambda: reader.read_pandas(
+            TABLE, filters=[("category", "=", CATEGORIES[0])], start=since
+        ),
+        "embeddings": lambda: reader.read_vectors(TABLE, columns=["id"]),
+    }
+
+
+def timed(run):
+    t0 = time.perf_counter()
+    result = run()
+    return time.perf_counter() - t0, result
+
+
+def dir_bytes(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--schema", default="bench_snapshot")
+    args = parser.parse_args()
+
+    os.environ["PGOPTIONS"] = f"-c search_path={args.schema},public"
+    loader = make_loader()
+    loader.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE; CREATE SCHEMA {args.schema};")
+    loader.execute(SCHEMA_SQL.read_text().replace("vector(1536)", f"vector({args.dim})"))
+    since = BASE_TIME.normalize() - pd.Timedelta(days=30)
+    work_dir = Path(tempfile.mkdtemp())
+    results = []
+    try:
+        load_rows(loader, args.rows, args.dim, args.days)
+        truth, truth_vectors = loader.query_vectors(
+            f"SELECT id, created_utc, embeddings FROM {TABLE} ORDER BY id;", vector_column="embeddings"
+        )
+        truth_vectors = dict(zip(truth["id"], truth_vectors))
+        truth_times = dict(zip(truth["id"], pd.to_datetime(truth["created_utc"], utc=True)))
+
+        csv_path = work_dir / f"{TABLE}.csv"
+        seconds, _ = timed(lambda: export_csv(loader, csv_path))
+        variants = [("csv", seconds, csv_path.stat().st_size, csv_cases(csv_path, since))]
+        for file_format in ("parquet", "arrow"):
+            root = work_dir / file_format
+            exporter = SnapshotExporter(loader, str(root), file_format=file_format)
+            seconds, _ = timed(lambda: exporter.export(tables=[TABLE]))
+            reader = SnapshotReader(str(root))
+            variants.append((file_format, seconds, dir_bytes(root), snapshot_cases(reader, since)))
+
+        for name, export_seconds, size, cases in variants:
+            reads = {}
+            for case, run in cases.items():
+                reads[case], result = timed(run)
+                if case == "embeddings":
+                    ids, vectors = result
+                    exact = all(
+                        np.array_equal(truth_vectors[i], v) for i, v in zip(ids["id"], vectors)
+                    )
+                elif case == "all columns":
+                    created = result["created_utc"]
+                    dtype = str(created.dtype)
+                    times = pd.to_datetime(created, utc=True, format="ISO8601")
+                    same_times = all(truth_times[i] == t for i, t in zip(result["id"], times))
+                elif case == "filtered":
+                    matched = len(result)
+            results.append((name, export_seconds, size, reads, exact, dtype, same_times, matched))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        loader.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE;")
+        loader.close()
+
+    print(f"\n{args.rows} rows x {args.dim}-dim embeddings over {args.days} days")
+    print(
+        f"{'format':<8} {'export s':>9} {'MB':>7} {'all s':>7} {'project s':>10} "
+        f"{'filter s':>9} {'vectors s':>10} {'rows':>6}  vectors exact, created_utc"
+    )
+    for name, export_seconds, size, reads, exact, dtype, same_times, matched in results:
+        print(
+            f"{name:<8} {export_seconds:>9.2f} {size / 2**20:>7.1f} {reads['all columns']:>7.2f} "
+            f"{reads['projection']:>10.3f} {reads['filtered']:>9.3f} {reads['embeddings']:>10.3f} "
+            f"{matched:>6}  {exact}, {dtype} (values equal: {same_times})"
+        )
+
+
+if __name__ == "__main__":
+    main()
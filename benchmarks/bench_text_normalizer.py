@@ -0,0 +1,89 @@
+"""
+Parity and speed of TextNormalizer against the original clean_comment implementation,
+on the text columns of the results/*.csv corpora.
+
+Usage:
+    python -m benchmarks.bench_text_normalizer --repeat 20
+"""
+import argparse
+import csv
+import html
+import re
+import time
+from pathlib import Path
+from ai_moderator.text_normalizer import TextNormalizer
+
+RESULTS_DIR = Path(__file__).resolve().parent.parent / "results"
+TEXT_COLUMNS = {
+    "posts_table.csv": ["title", "selftext"],
+    "comments_table.csv": ["body"],
+    "posts_ai_analysis.csv": ["title", "selftext", "reasoning"],
+}
+
+
+def legacy_clean_comment(text: str) -> str:
+    """The original AIModerator.clean_comment, kept verbatim as the reference."""
+    if not text:
+        return ""
+    text = text.replace("\n", " ")
+    text = html.unescape(text)
+    text = re.sub(r"https?://\S+|www\.\S+", "", text)
+    text = re.sub(r"\S+@\S+", "", text)
+    text = re.sub(r"<.*?>", "", text)
+    text = re.sub(r"[^\x00-\x7F]+", "", text)
+    text = re.sub(r"[\x00-\x1F\x7F]", "", text)
+    text = re.sub(r"\s+", " ", text)
+    text = text.strip()
+    return text
+
+
+def load_corpus():
+    texts = []
+    csv.field_size_limit(10**8)
+    for file_name, columns in TEXT_COLUMNS.items():
+        with open(RESULTS_DIR / file_name, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                texts.extend(row[column] for column in columns)
+    return texts
+
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    texts = load_corpus()
+    normalizer = TextNormalizer()
+
+    expected = [legacy_clean_comment(text) for text in texts]
+    mismatches = [
+        (text, want, got)
+        for text, want, got in zip(texts, expected, normalizer.normalize_many(texts))
+        if want != got
+    ]
+    for text, want, got in mismatches[:5]:
+        print(f"MISMATCH\n  input: {text!r}\n  legacy: {want!r}\n  new: {got!r}")
+    assert not mismatches, f"{len(mismatches)} of {len(texts)} texts differ"
+
+    legacy = best_of(args.repeat, lambda: [legacy_clean_comment(text) for text in texts])
+    single = best_of(args.repeat, lambda: [normalizer.normalize(text) for text in texts])
+    batch = best_of(args.repeat, lambda: normalizer.normalize_many(texts))
+
+    print(f"\n{len(texts)} texts, identical output; best of {args.repeat}")
+    print(f"{'implementation':<26} {'ms':>8} {'speedup':>8}")
+    print(f"{'legacy clean_comment':<26} {legacy * 1000:>8.2f} {1:>7.1f}x")
+    print(f"{'TextNormalizer.normalize':<26} {single * 1000:>8.2f} {legacy / single:>7.1f}x")
+    print(f"{'normalize_many':<26} {batch * 1000:>8.2f} {legacy / batch:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
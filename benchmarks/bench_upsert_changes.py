@@ -0,0 +1,90 @@
+"""
+Re-upserting rows that mostly did not change, as every pipeline run does with posts and
+comments: the unconditional ON CONFLICT DO UPDATE vs the change-aware upsert
+(`LoaderConfigs.skip_unchanged_upserts`), which only rewrites rows that differ.
+
+Usage:
+    python -m benchmarks.bench_upsert_changes --rows 50000 --changed 0 0.05 1
+
+For each share of changed rows the scratch table is loaded fresh, then the batch is upserted
+again (COPY engine) and the script reports the time, the WAL generated and how much the table
+grew (every rewritten row leaves a dead tuple behind until vacuum). Uses the same DB_*
+environment variables as the ETL jobs.
+"""
+import argparse
+import time
+from benchmarks.bench_query_stream import make_loader
+from benchmarks.bench_write_data import BENCH_TABLE, COLUMNS, FIELDS, make_rows
+
+
+def wal_lsn(loader) -> str:
+    return loader.query_table("SELECT pg_current_wal_lsn()::text AS lsn;")["lsn"][0]
+
+
+def table_bytes(loader) -> int:
+    return int(
+        loader.query_table(f"SELECT pg_total_relation_size('{BENCH_TABLE}') AS n;")["n"][0]
+    )
+
+
+def reupsert(loader, rows, changed: float, skip_unchanged: bool) -> dict:
+    loader.drop_table(BENCH_TABLE)
+    loader.create_table(BENCH_TABLE, FIELDS)
+    loader.write_data(BENCH_TABLE, rows, COLUMNS, "upsert", upsert_on=["id"])
+
+    step = round(1 / changed) if changed else 0
+    batch = [
+        row[:5] + (row[5] + 1,) + row[6:] if step and i % step == 0 else row
+        for i, row in enumerate(rows)
+    ]
+    size_before, lsn_before = table_bytes(loader), wal_lsn(loader)
+    t0 = time.perf_counter()
+    counts = loader.write_data(
+        BENCH_TABLE, batch, COLUMNS, "upsert", upsert_on=["id"], skip_unchanged=skip_unchanged
+    )
+    seconds = time.perf_counter() - t0
+    wal = loader.query_table(
+        "SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), %(lsn)s) AS n;", params={"lsn": lsn_before}
+    )["n"][0]
+    return {
+        "seconds": seconds,
+        "wal_mb": float(wal) / 2**20,
+        "growth_mb": (table_bytes(loader) - size_before) / 2**20,
+        **counts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--changed", type=float, nargs="+", default=[0, 0.05, 1])
+    args = parser.parse_args()
+
+    loader = make_loader()
+    rows = make_rows(args.rows)
+    results = []
+    try:
+        for changed in args.changed:
+            for skip_unchanged in (False, True):
+                results.append((changed, skip_unchanged, reupsert(loader, rows, changed, skip_unchanged)))
+    finally:
+        loader.drop_table(BENCH_TABLE)
+        loader.close()
+
+    print(f"\n{args.rows} rows re-upserted")
+    print(
+        f"{'changed':>8} {'upsert':<14} {'seconds':>8} {'WAL MB':>8} {'growth MB':>10} "
+        f"{'inserted':>9} {'updated':>8} {'unchanged':>10}"
+    )
+    for changed, skip_unchanged, r in results:
+        mode = "skip-unchanged" if skip_unchanged else "always"
+        print(
+            f"{changed:>8.0%} {mode:<14} {r['seconds']:>8.2f} {r['wal_mb']:>8.1f} "
+            f"{r['growth_mb']:>10.1f} {r['inserted']:>9} {r['updated']:>8} {r['unchanged']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
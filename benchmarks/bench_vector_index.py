@@ -0,0 +1,128 @@
+"""
+Recall vs latency of top-k cosine search on a pgvector column under the index setups the
+pipeline has used:
+
+- schema ivfflat:  the ivfflat index schema.sql used to create on the empty table (default
+                   lists = 100, centroids trained on no data) with the default probes = 1
+- managed ivfflat: VectorIndexManager's build after loading (lists = rows / 1000), per probes
+- managed hnsw:    VectorIndexManager's HNSW build, per ef_search
+- exact:           sequential scan, recall 1 by definition
+
+Usage:
+    python -m benchmarks.bench_vector_index --rows 100000 --dim 256 --queries 50
+
+Vectors are drawn around `--clusters` random centres so neighbourhoods exist the way they do
+for topic embeddings. The row marked "*" is the setting the manager's tuning picked for
+VectorIndexConfigs.target_recall. Uses the same DB_* environment variables as the ETL jobs and
+a scratch table that is dropped afterwards.
+"""
+import argparse
+import time
+import numpy as np
+from api.configs import VectorIndexConfigs
+from benchmarks.bench_query_stream import make_loader
+from search.index_manager import EXACT_SEARCH, QUERY_PARAMS, VectorIndexManager
+
+BENCH_TABLE = "bench_vector_index"
+
+
+def load_vectors(loader, rows: int, dim: int, clusters: int, batch: int = 5_000) -> None:
+    rng = np.random.default_rng(0)
+    centres = rng.standard_normal((clusters, dim), dtype=np.float32)
+    for start in range(0, rows, batch):
+        n = min(batch, rows - start)
+        vectors = centres[rng.integers(clusters, size=n)]
+        vectors = vectors + 0.5 * rng.standard_normal((n, dim), dtype=np.float32)
+        loader.write_data(
+            table_name=BENCH_TABLE,
+            data_rows=[(f"p{start + i}", vector) for i, vector in enumerate(vectors)],
+            column_names=["id", "embeddings"],
+            write_method="append",
+        )
+
+
+def print_curve(label: str, points: list, chosen: dict = None) -> None:
+    for point in points:
+        setting = ", ".join(f"{k} = {v}" for k, v in point.items() if k in QUERY_PARAMS.values())
+        mark = "*" if chosen and all(point.get(k) == v for k, v in chosen.items()) else " "
+        print(
+            f"{label:<16} {setting or '-':<22}{mark} {point['recall']:>7.3f} "
+            f"{point['p50_ms']:>8.2f} {point['p99_ms']:>8.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    loader = make_loader()
+    manager = VectorIndexManager(loader, table_name=BENCH_TABLE)
+    loader.drop_table(BENCH_TABLE)
+    loader.create_table(
+        BENCH_TABLE,
+        {
+            "id": "TEXT PRIMARY KEY",
+            "embeddings": f"vector({args.dim})",
+            "processing_timestamp": "TIMESTAMPTZ NOT NULL DEFAULT now()",
+        },
+    )
+    try:
+        # what schema.sql did: index the empty table, then load
+        loader.execute(
+            f"CREATE INDEX {BENCH_TABLE}_schema_idx ON {BENCH_TABLE} "
+            f"USING ivfflat (embeddings vector_cosine_ops);"
+        )
+        t0 = time.perf_counter()
+        load_vectors(loader, args.rows, args.dim, args.clusters)
+        print(f"\n{args.rows} rows x {args.dim} dims loaded in {time.perf_counter() - t0:.1f}s")
+
+        queries = manager.sample_queries(args.queries)
+        exact, latencies = [], []
+        for query in queries:
+            t0 = time.perf_counter()
+            exact.append(manager.nearest_ids(query, args.k, EXACT_SEARCH))
+            latencies.append(time.perf_counter() - t0)
+
+        print(f"\n{'index':<16} {'setting':<23} {'recall@' + str(args.k):>7} {'p50 ms':>8} {'p99 ms':>8}")
+        print_curve(
+            "exact",
+            [{
+                "recall": 1.0,
+                "p50_ms": float(np.percentile(latencies, 50) * 1000),
+                "p99_ms": float(np.percentile(latencies, 99) * 1000),
+            }],
+        )
+        print_curve(
+            "schema ivfflat",
+            [{"ivfflat.probes": 1, **manager.measure(queries, args.k, {"ivfflat.probes": 1}, exact)}],
+        )
+
+        builds = []
+        for method in ("ivfflat", "hnsw"):
+            built = manager.build(method=method)
+            param = QUERY_PARAMS[method]
+            curve = [
+                {param: value, **manager.measure(queries, args.k, {param: value}, exact)}
+                for value in manager.candidate_values(method, built["params"], args.k)
+            ]
+            print_curve(f"managed {method}", curve, built["query_params"])
+            builds.append((method, built))
+
+        print(f"\ntarget recall {VectorIndexConfigs.target_recall}")
+        for method, built in builds:
+            print(f"{method:<8} {built['params']} built in {built['build_seconds']:.1f}s")
+    finally:
+        manager.drop()
+        loader.drop_table(BENCH_TABLE)
+        loader.close()
+
+
+if __name__ == "__main__":
+    main()
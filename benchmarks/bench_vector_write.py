@@ -0,0 +1,162 @@
+"""
+Writes embeddings into a pgvector table the way analyze_posts does (upsert through the COPY
+engine), comparing how vectors travel:
+
+- list / text:    lists of Python floats formatted as text (embeddings before NumPy transport)
+- array / text:   float32 arrays, still formatted as text (`LoaderConfigs.vector_copy_format = "text"`)
+- array / binary: float32 arrays in pgvector's binary format (the default)
+- binary, --reduced-dim dims: shorter vectors (`AIConfigs.embedding_dimensions`)
+- halfvec / binary: half-precision storage (needs pgvector >= 0.7, skipped otherwise)
+
+Usage:
+    python -m benchmarks.bench_vector_write --rows 100000 --dim 1536 --batch 5000
+
+Rows are generated and written `--batch` at a time; only `write_data` is timed. Reports the
+COPY payload sent, the Python memory held per vector, the table size and each variant's peak
+RSS (every variant runs in its own process). Uses the same DB_* environment variables as the
+ETL jobs and a scratch table that is dropped afterwards.
+"""
+import argparse
+import io
+import json
+import resource
+import subprocess
+import sys
+import time
+import numpy as np
+from api.configs import LoaderConfigs
+from benchmarks.bench_query_stream import make_loader
+
+BENCH_TABLE = "bench_vector_write"
+COLUMNS = ["id", "created_utc", "embeddings"]
+
+
+def _payload_size(buffer: io.IOBase) -> int:
+    size = buffer.seek(0, io.SEEK_END)
+    buffer.seek(0)
+    return size
+
+
+def _vector_memory(vector: object) -> int:
+    """Python heap bytes held by one embedding in its transport form."""
+
+    if isinstance(vector, list):
+        return sys.getsizeof(vector) + sum(map(sys.getsizeof, vector))
+    return sys.getsizeof(np.array(vector))  # an array owning its buffer counts it
+
+
+def write(variant: str, rows: int, dim: int, batch: int) -> dict:
+    transport, copy_format, column_type = variant.split(":")
+    LoaderConfigs.vector_copy_format = copy_format
+    loader = make_loader()
+
+    payload = [0]
+    for name in ("_copy_buffer", "_copy_binary_buffer"):
+        original = getattr(loader, name)
+
+        def measured(*args, _original=original, **kwargs):
+            buffer = _original(*args, **kwargs)
+            payload[0] += _payload_size(buffer)
+            return buffer
+
+        setattr(loader, name, measured)
+
+    rng = np.random.default_rng(0)
+    seconds, sample = 0.0, None
+    for start in range(0, rows, batch):
+        vectors = rng.standard_normal((min(batch, rows - start), dim), dtype=np.float32)
+        embeddings = vectors.tolist() if transport == "list" else list(vectors)
+        sample = embeddings[0]
+        data_rows = [
+            (f"p{start + i}", "2024-01-01_00:00:00", embedding)
+            for i, embedding in enumerate(embeddings)
+        ]
+        t0 = time.perf_counter()
+        loader.write_data(
+            table_name=BENCH_TABLE,
+            data_rows=data_rows,
+            column_names=COLUMNS,
+            write_method="upsert",
+            upsert_on=["id"],
+        )
+        seconds += time.perf_counter() - t0
+
+    size = loader.query_table(f"SELECT pg_total_relation_size('{BENCH_TABLE}') AS n;")["n"][0]
+    loader.close()
+    return {
+        "seconds": seconds,
+        "payload_mb": payload[0] / 2**20,
+        "bytes_per_vector": _vector_memory(sample),
+        "table_mb": int(size) / 2**20,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--reduced-dim", type=int, default=512)
+    parser.add_argument("--batch", type=int, default=5_000)
+    parser.add_argument("--variant", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(write(args.variant, args.rows, args.dim, args.batch)))
+        return
+
+    variants = [
+        ("list / text", "list:text:vector", args.dim),
+        ("array / text", "array:text:vector", args.dim),
+        ("array / binary", "array:binary:vector", args.dim),
+        (f"binary, {args.reduced_dim} dims", "array:binary:vector", args.reduced_dim),
+        ("halfvec / binary", "array:binary:halfvec", args.dim),
+    ]
+
+    loader = make_loader()
+    print(f"\n{args.rows} rows, written {args.batch} at a time")
+    print(
+        f"{'variant':<22} {'seconds':>8} {'rows/s':>8} {'payload MB':>11} "
+        f"{'B/vector':>9} {'table MB':>9} {'peak RSS MB':>12}"
+    )
+    try:
+        for label, variant, dim in variants:
+            column_type = variant.split(":")[2]
+            loader.drop_table(BENCH_TABLE)
+            try:
+                loader.create_table(
+                    BENCH_TABLE,
+                    {
+                        "id": "TEXT PRIMARY KEY",
+                        "created_utc": "TIMESTAMPTZ",
+                        "embeddings": f"{column_type}({dim})",
+                        "processing_timestamp": "TIMESTAMPTZ NOT NULL DEFAULT now()",
+                    },
+                )
+            except Exception:
+                print(f"{label:<22} skipped: {column_type} is not supported by this pgvector")
+                continue
+            out = subprocess.run(
+                [
+                    sys.executable, "-m", "benchmarks.bench_vector_write", "--variant", variant,
+                    "--rows", str(args.rows), "--dim", str(dim), "--batch", str(args.batch),
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+            print(
+                f"{label:<22} {r['seconds']:>8.2f} {args.rows / r['seconds']:>8.0f} "
+                f"{r['payload_mb']:>11.1f} {r['bytes_per_vector']:>9} {r['table_mb']:>9.1f} "
+                f"{r['peak_rss_mb']:>12.0f}"
+            )
+    finally:
+        loader.drop_table(BENCH_TABLE)
+        loader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Compares the DataLoader write engines (COPY vs executemany) on synthetic comment rows.
+
+Usage:
+    python -m benchmarks.bench_write_data --rows 20000
+
+Uses the same DB_* environment variables as the ETL jobs and writes into a scratch
+table that is dropped afterwards; do not point it at a table you care about.
+"""
+import argparse
+import random
+import string
+import time
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from dataloader.load_data import DataLoader
+from utils.utilities import get_env_variable
+
+BENCH_TABLE = "bench_write_data"
+COLUMNS = ["id", "post_id", "parent_id", "body", "author", "score", "created_utc"]
+FIELDS = {
+    "id": "TEXT PRIMARY KEY",
+    "post_id": "TEXT",
+    "parent_id": "TEXT",
+    "body": "TEXT",
+    "author": "TEXT",
+    "score": "BIGINT",
+    "created_utc": "TIMESTAMPTZ",
+    "processing_timestamp": "TIMESTAMPTZ NOT NULL DEFAULT now()",
+}
+
+
+def make_rows(n: int, seed: int = 0):
+    rnd = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    return [
+        (
+            f"c{i}",
+            f"p{i % 500}",
+            f"p{i % 500}",
+            "".join(rnd.choices(string.ascii_letters + " \t\n\\", k=rnd.randint(20, 400))),
+            f"user_{rnd.randint(0, 5000)}",
+            rnd.randint(-20, 2000),
+            (start + timedelta(seconds=i)).strftime("%Y-%m-%d_%H:%M:%S"),
+        )
+        for i in range(n)
+    ]
+
+
+def timed_write(loader: DataLoader, rows, engine: str, write_method: str) -> float:
+    t0 = time.perf_counter()
+    loader.write_data(
+        table_name=BENCH_TABLE,
+        data_rows=rows,
+        column_names=COLUMNS,
+        write_method=write_method,
+        upsert_on=["id"],
+        engine=engine,
+    )
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    load_dotenv()
+    loader = DataLoader(
+        user=get_env_variable("DB_USER"),
+        password=get_env_variable("DB_PASSWORD"),
+        host=get_env_variable("DB_HOST"),
+        port=get_env_variable("DB_PORT"),
+        dbname=get_env_variable("DB_NAME"),
+    )
+    rows = make_rows(args.rows)
+
+    results = []
+    try:
+        for engine in ("executemany", "copy"):
+            loader.drop_table(BENCH_TABLE)
+            loader.create_table(BENCH_TABLE, FIELDS)
+            # insert path: every key is new; update path: every key conflicts
+            results.append((engine, "upsert (insert)", timed_write(loader, rows, engine, "upsert")))
+            results.append((engine, "upsert (update)", timed_write(loader, rows, engine, "upsert")))
+            results.append((engine, "replace", timed_write(loader, rows, engine, "replace")))
+    finally:
+        loader.drop_table(BENCH_TABLE)
+
+    print(f"\n{args.rows} rows")
+    print(f"{'engine':<12} {'operation':<16} {'seconds':>9} {'rows/s':>10}")
+    for engine, op, seconds in results:
+        print(f"{engine:<12} {op:<16} {seconds:>9.3f} {args.rows / seconds:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
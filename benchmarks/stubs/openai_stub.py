@@ -0,0 +1,194 @@
+"""
+Local stand-in for the OpenAI HTTP API, so AI code paths can be exercised offline.
+
+Point a client at it with `OpenAI(api_key="stub", base_url=server.base_url)`.
+
+- POST /v1/embeddings returns deterministic vectors (seeded by the input text), so
+  callers can check that every vector was mapped back to the right input.
+- POST /v1/chat/completions answers with a deterministic JSON classification
+  ({"category": ..., "reasoning": ...}), like the AIModerator prompt asks for.
+- Requests containing `fail_marker` in any input answer 400, like OpenAI does for an
+  invalid input, and the first `transient_failures` requests (to paths ending in
+  `transient_path`, if set) answer `transient_status` (500 for a flaky endpoint, 429 for
+  rate limiting).
+"""
+import json
+import base64
+import random
+import hashlib
+import threading
+import time
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+
+def stub_embedding(text: str, dim: int = 1536) -> List[float]:
+    """Deterministic pseudo-embedding of `text` (float32 precision, like the real API)."""
+
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    rnd = random.Random(seed)
+    return array("f", [rnd.uniform(-1, 1) for _ in range(dim)]).tolist()
+
+
+CATEGORIES = [
+    "Positive Experience",
+    "Negative Experience",
+    "Constructive Feedback",
+    "Bug/Issue Report",
+    "Community/Discussion",
+    "Sarcasm/Humor",
+    "News/Update Sharing",
+    "Question/Help Request",
+    "Off-topic/Other",
+]
+
+
+def stub_category(prompt: str) -> str:
+    """Deterministic category for a prompt."""
+
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    return CATEGORIES[digest[0] % len(CATEGORIES)]
+
+
+def _encode(vector: List[float], encoding_format: str) -> Any:
+    # the openai client asks for base64 float32 payloads by default
+    if encoding_format == "base64":
+        return base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+    return vector
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    stub: "OpenAIStubServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # keep benchmark output clean
+
+    def _reply(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        status, payload = self.stub.handle(self.path, request)
+        self._reply(status, payload)
+
+
+class OpenAIStubServer:
+    def __init__(
+        self,
+        dim: int = 1536,
+        latency_seconds: float = 0.0,
+        fail_marker: str = "__FAIL__",
+        transient_failures: int = 0,
+        transient_status: int = 500,
+        transient_path: str = "",
+    ) -> None:
+        self.dim = dim
+        self.latency_seconds = latency_seconds
+        self.fail_marker = fail_marker
+        self.transient_failures = transient_failures
+        self.transient_status = transient_status
+        self.transient_path = transient_path
+
+        self.requests = 0
+        self.inputs = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def __enter__(self) -> "OpenAIStubServer":
+        handler = type("Handler", (_StubHandler,), {"stub": self})
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _error(self, status: int, message: str):
+        error_type = {400: "invalid_request_error", 429: "rate_limit_exceeded"}.get(
+            status, "server_error"
+        )
+        return status, {"error": {"message": message, "type": error_type, "code": None}}
+
+    def handle(self, path: str, request: Dict[str, Any]):
+        """Dispatches a decoded JSON request; returns (status, payload)."""
+
+        with self._lock:
+            self.requests += 1
+            flaky = self.requests <= self.transient_failures and path.endswith(self.transient_path)
+
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        if flaky:
+            return self._error(self.transient_status, "injected transient failure")
+
+        if path.endswith("/embeddings"):
+            return self._embeddings(request)
+        if path.endswith("/chat/completions"):
+            return self._chat(request)
+        return self._error(404, f"no stub for {path}")
+
+    def _chat(self, request: Dict[str, Any]):
+        prompt = request["messages"][-1]["content"]
+        if self.fail_marker in prompt:
+            return self._error(400, "injected failure for poisoned input")
+
+        content = json.dumps(
+            {"category": stub_category(prompt), "reasoning": "Stubbed one-sentence justification."}
+        )
+        tokens = len(prompt) // 4 + 1
+        return 200, {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {"prompt_tokens": tokens, "completion_tokens": 20, "total_tokens": tokens + 20},
+        }
+
+    def _embeddings(self, request: Dict[str, Any]):
+        inputs = request["input"]
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        if any(self.fail_marker in text for text in inputs):
+            return self._error(400, "injected failure for poisoned input")
+
+        with self._lock:
+            self.inputs += len(inputs)
+
+        tokens = sum(len(text) // 4 + 1 for text in inputs)
+        encoding_format = request.get("encoding_format", "float")
+        return 200, {
+            "object": "list",
+            "data": [
+                {
+                    "object": "embedding",
+                    "index": i,
+                    "embedding": _encode(
+                        stub_embedding(text, request.get("dimensions", self.dim)), encoding_format
+                    ),
+                }
+                for i, text in enumerate(inputs)
+            ],
+            "model": request.get("model"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
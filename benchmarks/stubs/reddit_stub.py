@@ -0,0 +1,386 @@
+"""
+Local stand-in for the Reddit API, so PostExtractor and CommentExtractor can run offline through
+unmodified PRAW. PRAW only takes its endpoint URLs from keyword arguments or praw.ini, so
+`server.praw_config_env(directory)` writes a praw.ini pointing at the stub and returns the
+environment (XDG_CONFIG_HOME) that makes PRAW read it; set it before the first `praw.Reddit` is
+created. `**server.praw_settings` can be passed to `praw.Reddit` directly instead.
+
+Synthetic subreddits have `posts_per_subreddit` posts, newest first, one minute apart. Every post
+has a comment tree `comment_depth` levels deep where each comment (and the post) has
+`comment_fanout` replies. Like the real API, responses only inline part of a tree:
+
+- GET /comments/{id}/ inlines the first `top_level_page` top-level comments and collapses the
+  rest into one "load more comments" object (resolved with POST /api/morechildren).
+- Replies deeper than `inline_depth` levels below a returned comment become "continue this
+  thread" objects (resolved with GET /comments/{id}/_/{comment_id}).
+
+Supported endpoints: POST /api/v1/access_token, GET /r/{name}/new, GET /comments/{id}/,
+GET /comments/{id}/_/{comment_id} and POST /api/morechildren. Every response waits
+`latency_seconds` first. Each app (client id) gets its own access token, and the time of every
+request is recorded per client id in `request_times` to check per-credential budgets.
+
+With `ratelimit_quota` set, each app may make that many API requests per fixed
+`ratelimit_window` seconds (token requests are free, as on reddit.com). Responses then carry
+Reddit's `x-ratelimit-used/remaining/reset` headers and requests over the quota get a 429,
+counted per client id in `throttled`.
+"""
+import base64
+import math
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+BASE_TIME = 1_735_689_600  # 2025-01-01 00:00:00 UTC, the newest post of every subreddit
+
+
+def _base36(number: int) -> str:
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    out = ""
+    while True:
+        number, rest = divmod(number, 36)
+        out = digits[rest] + out
+        if not number:
+            return out
+
+
+class _Comment:
+    def __init__(self, comment_id: str, parent: Optional["_Comment"], depth: int) -> None:
+        self.id = comment_id
+        self.parent = parent
+        self.depth = depth
+        self.children: List["_Comment"] = []
+
+    def descendants(self) -> int:
+        return sum(1 + child.descendants() for child in self.children)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    stub: "RedditStubServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # keep benchmark output clean
+
+    def _dispatch(self, method: str) -> None:
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if method == "POST":
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length).decode("utf-8")
+            params.update({key: values[-1] for key, values in parse_qs(body).items()})
+
+        status, payload, headers = self.stub.handle(
+            method, url.path, params, client=self._client_id()
+        )
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _client_id(self) -> Optional[str]:
+        """The app a request comes from: basic auth for tokens, then the token it was issued."""
+
+        scheme, _, value = self.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() == "basic":
+            return base64.b64decode(value).decode("utf-8").split(":", 1)[0]
+        if scheme.lower() == "bearer" and value.startswith("stub-token-"):
+            return value[len("stub-token-") :]
+        return None
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+
+class RedditStubServer:
+    def __init__(
+        self,
+        subreddits: Optional[List[str]] = None,
+        posts_per_subreddit: int = 500,
+        comment_depth: int = 3,
+        comment_fanout: int = 3,
+        top_level_page: int = 2,
+        inline_depth: int = 2,
+        latency_seconds: float = 0.0,
+        ratelimit_quota: Optional[int] = None,
+        ratelimit_window: float = 600.0,
+    ) -> None:
+        self.subreddits = subreddits or ["stubsub"]
+        self.posts_per_subreddit = posts_per_subreddit
+        self.comment_depth = comment_depth
+        self.comment_fanout = comment_fanout
+        self.top_level_page = top_level_page
+        self.inline_depth = inline_depth
+        self.latency_seconds = latency_seconds
+        self.ratelimit_quota = ratelimit_quota
+        self.ratelimit_window = ratelimit_window
+
+        self.requests: Dict[str, int] = {}
+        self.request_times: Dict[Optional[str], List[float]] = {}
+        self.throttled: Dict[Optional[str], int] = {}
+        # client id -> (window number, requests made in it)
+        self._windows: Dict[Optional[str], Tuple[int, int]] = {}
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+        self._trees: Dict[str, Dict[str, _Comment]] = {}
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def praw_settings(self) -> Dict[str, str]:
+        return {"oauth_url": self.base_url, "reddit_url": self.base_url, "short_url": self.base_url}
+
+    def praw_config_env(self, directory: str) -> Dict[str, str]:
+        settings = "".join(f"{key} = {value}\n" for key, value in self.praw_settings.items())
+        with open(os.path.join(directory, "praw.ini"), "w") as f:
+            f.write(f"[DEFAULT]\n{settings}check_for_updates = False\n")
+        return {"XDG_CONFIG_HOME": directory}
+
+    def __enter__(self) -> "RedditStubServer":
+        handler = type("Handler", (_StubHandler,), {"stub": self})
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def comments_per_post(self) -> int:
+        return sum(self.comment_fanout**level for level in range(1, self.comment_depth + 1))
+
+    # -- synthetic data ---------------------------------------------------------------------
+
+    def post_id(self, subreddit: str, index: int) -> str:
+        return f"{_base36(self.subreddits.index(subreddit) + 10)}{_base36(index)}"
+
+    def _post(self, post_id: str) -> Tuple[str, int]:
+        """(subreddit, index) of a post id minted by `post_id`."""
+
+        for i, subreddit in enumerate(self.subreddits):
+            prefix = _base36(i + 10)
+            if post_id.startswith(prefix):
+                index = int(post_id[len(prefix) :], 36)
+                if index < self.posts_per_subreddit:
+                    return subreddit, index
+        raise KeyError(post_id)
+
+    def _tree(self, post_id: str) -> Dict[str, _Comment]:
+        """Comment id -> node for a post; the key "" holds the virtual root (the post)."""
+
+        with self._lock:
+            if post_id not in self._trees:
+                root = _Comment("", None, 0)
+                nodes = {"": root}
+                level = [root]
+                for depth in range(1, self.comment_depth + 1):
+                    next_level = []
+                    for parent in level:
+                        for _ in range(self.comment_fanout):
+                            node = _Comment(f"{post_id}c{_base36(len(nodes))}", parent, depth)
+                            parent.children.append(node)
+                            nodes[node.id] = node
+                            next_level.append(node)
+                    level = next_level
+                self._trees[post_id] = nodes
+            return self._trees[post_id]
+
+    def _post_data(self, subreddit: str, index: int) -> Dict[str, Any]:
+        post_id = self.post_id(subreddit, index)
+        return {
+            "id": post_id,
+            "name": f"t3_{post_id}",
+            "title": f"Synthetic post {index} in r/{subreddit}",
+            "author": f"author_{index % 97}",
+            "link_flair_text": ["Discussion", "Question", None][index % 3],
+            "selftext": f"Body of post {index}. " * (1 + index % 5),
+            "subreddit": subreddit,
+            "score": (index * 7) % 500,
+            "num_comments": self.comments_per_post,
+            "created_utc": float(BASE_TIME - index * 60),
+            "permalink": f"/r/{subreddit}/comments/{post_id}/",
+        }
+
+    def _comment_data(self, post_id: str, node: _Comment, replies: Any) -> Dict[str, Any]:
+        subreddit, index = self._post(post_id)
+        return {
+            "id": node.id,
+            "name": f"t1_{node.id}",
+            "link_id": f"t3_{post_id}",
+            "parent_id": f"t1_{node.parent.id}" if node.parent.id else f"t3_{post_id}",
+            "body": f"Synthetic comment {node.id} at depth {node.depth}.\nSecond line.",
+            "author": f"commenter_{len(node.id) % 50}",
+            "score": node.depth * 3,
+            "created_utc": float(BASE_TIME - index * 60 + node.depth * 30),
+            "subreddit": subreddit,
+            "replies": replies,
+            "depth": node.depth - 1,
+        }
+
+    @staticmethod
+    def _listing(children: List[Dict[str, Any]], after: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            "kind": "Listing",
+            "data": {"after": after, "before": None, "dist": len(children), "children": children},
+        }
+
+    @staticmethod
+    def _more(parent_name: str, children: List[str], count: int) -> Dict[str, Any]:
+        return {
+            "kind": "more",
+            "data": {
+                "id": children[0] if children else "_",
+                "name": f"t1_{children[0]}" if children else "t1__",
+                "parent_id": parent_name,
+                "children": children,
+                "count": count,
+                "depth": 0,
+            },
+        }
+
+    def _thing(self, post_id: str, node: _Comment, levels: int) -> Dict[str, Any]:
+        """A comment with `levels` more levels of replies inlined, then "continue this thread"."""
+
+        if not node.children:
+            replies: Any = ""
+        elif levels <= 0:
+            replies = self._listing([self._more(f"t1_{node.id}", [], 0)])
+        else:
+            replies = self._listing(
+                [self._thing(post_id, child, levels - 1) for child in node.children]
+            )
+        return {"kind": "t1", "data": self._comment_data(post_id, node, replies)}
+
+    # -- endpoints --------------------------------------------------------------------------
+
+    def _ratelimit(self, client: Optional[str]) -> Tuple[bool, Dict[str, str]]:
+        """Counts a request against the client's window: (allowed, x-ratelimit-* headers)."""
+
+        elapsed = time.monotonic() - self._started
+        window = int(elapsed // self.ratelimit_window)
+        with self._lock:
+            current, used = self._windows.get(client, (window, 0))
+            used = used + 1 if current == window else 1
+            self._windows[client] = (window, used)
+            allowed = used <= self.ratelimit_quota
+            if not allowed:
+                self.throttled[client] = self.throttled.get(client, 0) + 1
+        reset = math.ceil((window + 1) * self.ratelimit_window - elapsed)
+        return allowed, {
+            "x-ratelimit-used": str(min(used, self.ratelimit_quota)),
+            "x-ratelimit-remaining": f"{max(self.ratelimit_quota - used, 0):.1f}",
+            "x-ratelimit-reset": str(reset),
+        }
+
+    def handle(
+        self, method: str, path: str, params: Dict[str, str], client: Optional[str] = None
+    ):
+        """Dispatches a decoded request; returns (status, payload, extra headers)."""
+
+        parts = [part for part in path.split("/") if part] or [""]
+        if parts[:3] == ["api", "v1", "access_token"]:
+            endpoint = "access_token"
+        elif parts[:2] == ["api", "morechildren"]:
+            endpoint = "morechildren"
+        elif parts[0] == "r" and parts[2:3] == ["new"]:
+            endpoint = "r/new"
+        else:
+            endpoint = parts[0]
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            self.request_times.setdefault(client, []).append(time.monotonic())
+
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+        if endpoint == "access_token":
+            return 200, {
+                "access_token": f"stub-token-{client}",
+                "token_type": "bearer",
+                "expires_in": 86400,
+                "scope": "*",
+            }, {}
+        headers: Dict[str, str] = {}
+        if self.ratelimit_quota is not None:
+            allowed, headers = self._ratelimit(client)
+            if not allowed:
+                return 429, {"message": "Too Many Requests", "error": 429}, headers
+
+        try:
+            if endpoint == "r/new":
+                return 200, self._new(parts[1], params), headers
+            if endpoint == "comments":
+                return 200, self._comments(parts[1], parts[3] if len(parts) > 3 else None), headers
+            if endpoint == "morechildren":
+                return 200, self._morechildren(params), headers
+        except (KeyError, ValueError) as e:
+            return 404, {"message": "Not Found", "error": 404, "reason": str(e)}, headers
+        return 404, {"message": "Not Found", "error": 404}, headers
+
+    def _new(self, subreddit: str, params: Dict[str, str]) -> Dict[str, Any]:
+        if subreddit not in self.subreddits:
+            raise KeyError(subreddit)
+        limit = min(int(params.get("limit", 25)), 100)
+        start = 0
+        if params.get("after"):
+            start = self._post(params["after"].split("_", 1)[1])[1] + 1
+        indexes = range(start, min(start + limit, self.posts_per_subreddit))
+        children = [{"kind": "t3", "data": self._post_data(subreddit, i)} for i in indexes]
+        more = children and indexes[-1] + 1 < self.posts_per_subreddit
+        return self._listing(children, after=children[-1]["data"]["name"] if more else None)
+
+    def _comments(self, post_id: str, comment_id: Optional[str]) -> List[Dict[str, Any]]:
+        subreddit, index = self._post(post_id)
+        post = self._listing([{"kind": "t3", "data": self._post_data(subreddit, index)}])
+        tree = self._tree(post_id)
+
+        if comment_id is not None:  # continue this thread
+            thing = self._thing(post_id, tree[comment_id], self.inline_depth)
+            return [post, self._listing([thing])]
+
+        top_level = tree[""].children
+        shown = [
+            self._thing(post_id, node, self.inline_depth)
+            for node in top_level[: self.top_level_page]
+        ]
+        hidden = top_level[self.top_level_page :]
+        if hidden:
+            count = sum(1 + node.descendants() for node in hidden)
+            shown.append(self._more(f"t3_{post_id}", [node.id for node in hidden], count))
+        return [post, self._listing(shown)]
+
+    def _morechildren(self, params: Dict[str, str]) -> Dict[str, Any]:
+        post_id = params["link_id"].split("_", 1)[1]
+        tree = self._tree(post_id)
+        things = []
+
+        def flatten(node: _Comment, levels: int) -> None:
+            # morechildren returns a flat list; PRAW re-attaches replies through parent_id
+            things.append({"kind": "t1", "data": self._comment_data(post_id, node, "")})
+            for child in node.children:
+                if levels > 0:
+                    flatten(child, levels - 1)
+                else:
+                    things.append(self._more(f"t1_{node.id}", [], 0))
+                    break
+
+        for comment_id in params["children"].split(","):
+            flatten(tree[comment_id], self.inline_depth)
+        return {"json": {"errors": [], "data": {"things": things}}}
@@ -8,6 +8,7 @@ CREATE TABLE IF NOT EXISTS POSTS_AI_ANALYSIS(
     CATEGORY TEXT,
     REASONING TEXT,
     CREATED_UTC TIMESTAMPTZ,
+    -- dimension follows AIConfigs.embedding_dimensions; halfvec(...) (pgvector >= 0.7) halves storage
     EMBEDDINGS vector(1536),
     PROCESSING_TIMESTAMP TIMESTAMPTZ NOT NULL DEFAULT now()
 );
@@ -40,6 +41,124 @@ CREATE TABLE IF NOT EXISTS COMMENTS(
     PROCESSING_TIMESTAMP TIMESTAMPTZ NOT NULL DEFAULT now()
 );
 
--- Create index on posts_analysis for fast search
-CREATE INDEX ON POSTS_AI_ANALYSIS
-USING ivfflat (EMBEDDINGS vector_cosine_ops);
+-- State: per-post comment crawl watermarks used by incremental comment extraction
+CREATE TABLE IF NOT EXISTS COMMENT_CRAWL_STATE(
+    POST_ID TEXT PRIMARY KEY
+            REFERENCES POSTS(ID)
+            ON DELETE CASCADE,
+    NUM_COMMENTS BIGINT,
+    LAST_CRAWLED_UTC TIMESTAMPTZ,
+    PROCESSING_TIMESTAMP TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- State: per-stage high-water marks (etl_posts, etl_comments, analyze_posts)
+CREATE TABLE IF NOT EXISTS PIPELINE_CHECKPOINTS(
+    STAGE TEXT PRIMARY KEY,
+    WATERMARK TIMESTAMPTZ,
+    LAST_RUN_UTC TIMESTAMPTZ,
+    ROWS_PROCESSED BIGINT,
+    PROCESSING_TIMESTAMP TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- State: ids a stage still has to (re)process regardless of its watermark
+CREATE TABLE IF NOT EXISTS PIPELINE_PENDING(
+    STAGE TEXT NOT NULL,
+    ITEM_ID TEXT NOT NULL,
+    ATTEMPTS INT NOT NULL DEFAULT 0,
+    LAST_ERROR TEXT,
+    PROCESSING_TIMESTAMP TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (STAGE, ITEM_ID)
+);
+
+-- State: the managed ANN index per vector column, its build and tuned query-time settings
+CREATE TABLE IF NOT EXISTS VECTOR_INDEX_STATE(
+    TABLE_NAME TEXT NOT NULL,
+    COLUMN_NAME TEXT NOT NULL,
+    INDEX_NAME TEXT,
+    METHOD TEXT,
+    BUILD_PARAMS JSONB,
+    QUERY_PARAMS JSONB,
+    RECALL DOUBLE PRECISION,
+    BASELINE_ROWS BIGINT,
+    BASELINE_UTC TIMESTAMPTZ,
+    BUILT_UTC TIMESTAMPTZ,
+    PROCESSING_TIMESTAMP TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (TABLE_NAME, COLUMN_NAME)
+);
+
+-- Analytics: rollups kept up to date by the stages for the rows they write (analytics.rollups)
+CREATE TABLE IF NOT EXISTS ROLLUP_POSTS_DAILY(
+    DAY DATE NOT NULL,
+    SUBREDDIT TEXT NOT NULL,
+    FLAIR TEXT NOT NULL, -- '' for posts without flair
+    POSTS BIGINT NOT NULL,
+    SCORE_SUM BIGINT NOT NULL,
+    NUM_COMMENTS_SUM BIGINT NOT NULL,
+    PRIMARY KEY (DAY, SUBREDDIT, FLAIR)
+);
+
+CREATE TABLE IF NOT EXISTS ROLLUP_CATEGORIES_DAILY(
+    DAY DATE NOT NULL,
+    CATEGORY TEXT NOT NULL,
+    POSTS BIGINT NOT NULL,
+    PRIMARY KEY (DAY, CATEGORY)
+);
+
+CREATE TABLE IF NOT EXISTS ROLLUP_AUTHORS_DAILY(
+    DAY DATE NOT NULL,
+    AUTHOR TEXT NOT NULL,
+    POSTS BIGINT NOT NULL,
+    POST_SCORE BIGINT NOT NULL,
+    COMMENTS BIGINT NOT NULL,
+    COMMENT_SCORE BIGINT NOT NULL,
+    PRIMARY KEY (DAY, AUTHOR)
+);
+
+-- all-time totals per author, summed from ROLLUP_AUTHORS_DAILY
+CREATE TABLE IF NOT EXISTS ROLLUP_AUTHORS(
+    AUTHOR TEXT PRIMARY KEY,
+    POSTS BIGINT NOT NULL,
+    POST_SCORE BIGINT NOT NULL,
+    COMMENTS BIGINT NOT NULL,
+    COMMENT_SCORE BIGINT NOT NULL,
+    FIRST_DAY DATE,
+    LAST_DAY DATE
+);
+
+CREATE TABLE IF NOT EXISTS ROLLUP_POST_COMMENTS(
+    POST_ID TEXT PRIMARY KEY,
+    DAY DATE, -- the post's creation day
+    COMMENTS BIGINT NOT NULL,
+    COMMENT_SCORE BIGINT NOT NULL,
+    COMMENTERS BIGINT NOT NULL,
+    LAST_COMMENT_UTC TIMESTAMPTZ
+);
+
+-- Observability: one summary row per stage and pipeline run (timers, counters, latency histograms)
+CREATE TABLE IF NOT EXISTS RUN_METRICS(
+    RUN_ID TEXT NOT NULL,
+    STAGE TEXT NOT NULL,
+    STATUS TEXT,
+    STARTED_UTC TIMESTAMPTZ,
+    DURATION_SECONDS DOUBLE PRECISION,
+    ROWS_WRITTEN BIGINT,
+    METRICS JSONB,
+    PROCESSING_TIMESTAMP TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (RUN_ID, STAGE)
+);
+
+-- Work discovery: watermark range scans and newest-first windows
+CREATE INDEX IF NOT EXISTS POSTS_CREATED_UTC_IDX ON POSTS (CREATED_UTC);
+CREATE INDEX IF NOT EXISTS POSTS_AI_ANALYSIS_CREATED_UTC_IDX ON POSTS_AI_ANALYSIS (CREATED_UTC);
+CREATE INDEX IF NOT EXISTS COMMENTS_POST_ID_IDX ON COMMENTS (POST_ID);
+-- Rollup refreshes recompute whole UTC days; dashboards read rollup rows by day
+CREATE INDEX IF NOT EXISTS COMMENTS_CREATED_UTC_IDX ON COMMENTS (CREATED_UTC);
+CREATE INDEX IF NOT EXISTS ROLLUP_AUTHORS_DAILY_AUTHOR_IDX ON ROLLUP_AUTHORS_DAILY (AUTHOR);
+CREATE INDEX IF NOT EXISTS ROLLUP_POST_COMMENTS_DAY_IDX ON ROLLUP_POST_COMMENTS (DAY, COMMENTS DESC);
+-- NOT EXISTS probe for analyzed posts can be answered from this index alone
+CREATE INDEX IF NOT EXISTS POSTS_AI_ANALYSIS_CLASSIFIED_IDX ON POSTS_AI_ANALYSIS (ID)
+    WHERE CATEGORY IS NOT NULL;
+
+-- The ANN index on POSTS_AI_ANALYSIS.EMBEDDINGS is not created here: ivfflat lists trained on an
+-- empty table are useless. search.index_manager.VectorIndexManager builds it once there is data
+-- and rebuilds/tunes it as the table grows (see VECTOR_INDEX_STATE).
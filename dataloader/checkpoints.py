@@ -0,0 +1,92 @@
+import pandas as pd
+from datetime import datetime
+from typing import Any, Iterable, List, Optional
+from api.configs import PipelineConfigs
+from dataloader.load_data import DataLoader
+
+
+class CheckpointStore:
+    """
+    Per-stage progress kept in Postgres. `pipeline_checkpoints` holds each stage's high-water
+    mark (only ever moves forward), `pipeline_pending` the ids a stage still owes work for
+    (failures, items left behind the watermark), which work discovery picks up regardless of
+    the watermark until they succeed or run out of attempts.
+    """
+
+    def __init__(self, loader: DataLoader) -> None:
+        self.loader = loader
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(loader={self.loader!r})"
+
+    def get_watermark(self, stage: str) -> Optional[datetime]:
+        """Returns the stage's high-water mark, or None if it never completed a run."""
+
+        df = self.loader.query_table(
+            "SELECT watermark FROM pipeline_checkpoints WHERE stage = %(stage)s;",
+            params={"stage": stage},
+        )
+        if df.empty or pd.isna(df["watermark"][0]):
+            return None
+        return df["watermark"][0].to_pydatetime()
+
+    def advance(self, stage: str, watermark: Optional[Any], rows_processed: int = 0) -> None:
+        """Records a finished run; the watermark is kept if the new one is older (or None)."""
+
+        self.loader.execute(
+            """
+            INSERT INTO pipeline_checkpoints (stage, watermark, last_run_utc, rows_processed)
+            VALUES (%(stage)s, %(watermark)s, now(), %(rows)s)
+            ON CONFLICT (stage) DO UPDATE SET
+                watermark = GREATEST(pipeline_checkpoints.watermark, EXCLUDED.watermark),
+                last_run_utc = EXCLUDED.last_run_utc,
+                rows_processed = EXCLUDED.rows_processed,
+                processing_timestamp = now();
+            """,
+            {"stage": stage, "watermark": watermark, "rows": rows_processed},
+        )
+
+    def add_pending(self, stage: str, item_ids: Iterable[str], error: Optional[str] = None) -> None:
+        """Queues ids for retry; ids already pending have their attempt count bumped."""
+
+        item_ids = list(item_ids)
+        if not item_ids:
+            return
+        self.loader.execute(
+            """
+            INSERT INTO pipeline_pending (stage, item_id, attempts, last_error)
+            SELECT %(stage)s, item_id, 1, %(error)s FROM unnest(%(ids)s::text[]) AS item_id
+            ON CONFLICT (stage, item_id) DO UPDATE SET
+                attempts = pipeline_pending.attempts + 1,
+                last_error = EXCLUDED.last_error,
+                processing_timestamp = now();
+            """,
+            {"stage": stage, "ids": item_ids, "error": error},
+        )
+
+    def clear_pending(self, stage: str, item_ids: Iterable[str]) -> None:
+        """Removes ids that were processed successfully."""
+
+        item_ids = list(item_ids)
+        if not item_ids:
+            return
+        self.loader.execute(
+            "DELETE FROM pipeline_pending WHERE stage = %(stage)s AND item_id = ANY(%(ids)s);",
+            {"stage": stage, "ids": item_ids},
+        )
+
+    def pending_ids(self, stage: str, max_attempts: Optional[int] = None) -> List[str]:
+        """Ids still owed by the stage that have not exhausted `max_attempts`."""
+
+        df = self.loader.query_table(
+            """
+            SELECT item_id FROM pipeline_pending
+            WHERE stage = %(stage)s AND attempts < %(max_attempts)s
+            ORDER BY item_id;
+            """,
+            params={
+                "stage": stage,
+                "max_attempts": max_attempts or PipelineConfigs.max_pending_attempts,
+            },
+        )
+        return df["item_id"].to_list()
@@ -1,19 +1,78 @@
+import contextvars
+import io
+import time
+import queue
+import struct
+import threading
+import uuid
 import psycopg2
+import numpy as np
 import pandas as pd
-from typing import Tuple, List, Optional, Any
+from contextlib import contextmanager
+from psycopg2.extensions import (
+    TRANSACTION_STATUS_IDLE,
+    TRANSACTION_STATUS_UNKNOWN,
+    AsIs,
+    register_adapter,
+)
+from typing import Tuple, List, Dict, Optional, Any, Iterator, Iterable, Union
+from api.configs import LoaderConfigs
+from utils.metrics import metrics
+
+# COPY text format escapes, see https://www.postgresql.org/docs/current/sql-copy.html
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+# COPY binary framing, and the pgvector binary input formats (vector_recv / halfvec_recv):
+# int16 dimensions, int16 unused, then one big-endian float per dimension
+_COPY_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+_COPY_BINARY_TRAILER = struct.pack(">h", -1)
+_COPY_BINARY_NULL = struct.pack(">i", -1)
+_VECTOR_DTYPES = {"vector": ">f4", "halfvec": ">f2"}
+
+
+def _vector_literal(array: np.ndarray) -> str:
+    """pgvector text representation of a float array, e.g. [0.1,0.2]"""
+    return "[" + ",".join(map(str, array)) + "]"
+
+
+def _adapt_ndarray(array: np.ndarray) -> AsIs:
+    """Lets psycopg2 pass NumPy embeddings as query parameters (e.g. the executemany engine)."""
+    return AsIs(f"'{_vector_literal(array)}'")
+
+
+register_adapter(np.ndarray, _adapt_ndarray)
+
+
+# errors after which a pooled connection is discarded and the operation may be retried
+_DISCONNECT_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
 
 
 class DataLoader:
     def __init__(
-        self, user: str, password: str, host: str, port: str, dbname: str
+        self,
+        user: str,
+        password: str,
+        host: str,
+        port: str,
+        dbname: str,
+        max_connections: Optional[int] = None,
     ) -> None:
         self.user = user
         self.password = password
         self.host = host
         self.port = port
         self.dbname = dbname
+        self.max_connections = max_connections or LoaderConfigs.pool_max_connections
+
+        # Connection pool: idle connections are reused LIFO and opened lazily; the
+        # semaphore bounds open connections and makes extra threads wait for one.
+        self._idle: List[Any] = []
+        self._last_used = {}
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+        self._column_types: Dict[str, Dict[str, str]] = {}
 
-    def _connect(self) -> None:
+    def _connect(self) -> Any:
         """Establishes connection to Postgres"""
 
         try:
@@ -32,12 +91,94 @@ class DataLoader:
             print(e)
             raise
 
+    def _is_healthy(self, conn: Any) -> bool:
+        """Checks a pooled connection; connections idle for a while are pinged first."""
+
+        if conn.closed:
+            return False
+        idle_for = time.monotonic() - self._last_used.get(conn, 0.0)
+        if idle_for < LoaderConfigs.pool_health_check_seconds:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except _DISCONNECT_ERRORS:
+            return False
+
+    @staticmethod
+    def _is_disconnect(error: BaseException) -> bool:
+        """True if the error (or the driver error it wraps) means the connection is gone."""
+
+        return isinstance(error, _DISCONNECT_ERRORS) or isinstance(
+            error.__cause__, _DISCONNECT_ERRORS
+        )
+
+    def _checkout(self) -> Any:
+        """Takes a healthy idle connection from the pool or opens a new one."""
+
+        while True:
+            with self._pool_lock:
+                if not self._idle:
+                    break
+                conn = self._idle.pop()
+
+            if self._is_healthy(conn):
+                return conn
+            print(f"{self.__class__.__name__}: discarding dead connection, reconnecting...")
+            metrics.incr("db.reconnects")
+            self._last_used.pop(conn, None)
+            conn.close()
+
+        return self._connect()
+
+    def _release(self, conn: Any) -> None:
+        """Returns a connection to the pool, closing it if it is no longer usable."""
+
+        broken = conn.closed or conn.get_transaction_status() == TRANSACTION_STATUS_UNKNOWN
+        if not broken and conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except _DISCONNECT_ERRORS:
+                broken = True
+
+        if broken:
+            self._last_used.pop(conn, None)
+            conn.close()
+            return
+
+        with self._pool_lock:
+            self._last_used[conn] = time.monotonic()
+            self._idle.append(conn)
+
+    @contextmanager
+    def _connection(self) -> Iterator[Any]:
+        """Checks out a pooled connection for the duration of the block (thread-safe)."""
+
+        with self._slots:
+            conn = self._checkout()
+            try:
+                yield conn
+            finally:
+                self._release(conn)
+
+    def close(self) -> None:
+        """Closes every idle pooled connection; new ones are opened on next use."""
+
+        with self._pool_lock:
+            for conn in self._idle:
+                conn.close()
+            self._idle.clear()
+            self._last_used.clear()
+
     def __repr__(self) -> str:
         return (
             f"Postgres(user='{self.user}', password='***', "
             f"host='{self.host}', port='{self.port}', dbname='{self.dbname}')"
         )
 
+    @metrics.timed("db.write_data")
     def write_data(
         self,
         table_name: str,
@@ -45,57 +186,90 @@ class DataLoader:
         column_names: List[str],
         write_method: str,
         upsert_on: Optional[List[str]] = None,
-    ) -> None:
-        """Writes data to a database table using the specified method (replace, append, upsert)."""
+        engine: Optional[str] = None,
+        chunk_size: Optional[int] = None,
+        skip_unchanged: Optional[bool] = None,
+        compare_on: Optional[List[str]] = None,
+    ) -> Dict[str, int]:
+        """Writes data to a database table using the specified method (replace, append, upsert).
+
+        The "copy" engine streams rows with COPY FROM STDIN (through a temp staging table
+        for upserts), the "executemany" engine sends one statement per row with
+        `cursor.executemany` (upserts first look up which keys exist, to report the counts).
+        With `skip_unchanged` (default `LoaderConfigs.skip_unchanged_upserts`) an upsert only
+        rewrites existing rows whose `compare_on` columns (default: every non-key column)
+        differ, leaving identical rows and their processing_timestamp untouched.
+        Returns the inserted / updated / unchanged row counts.
+        """
+
+        engine = engine or LoaderConfigs.write_engine
+        chunk_size = chunk_size or LoaderConfigs.copy_chunk_size
+        if skip_unchanged is None:
+            skip_unchanged = LoaderConfigs.skip_unchanged_upserts
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
 
         try:
-            with self._connect() as conn:
-                with conn.cursor() as cursor:
-                    cursor = conn.cursor()
+            if write_method not in ("replace", "append", "upsert"):
+                raise NotImplementedError(f"{write_method} is not implemented!")
+            if write_method == "upsert" and upsert_on is None:
+                raise ValueError("upsert_on must be provided for upsert operations.")
 
+            with self._connection() as conn:
+                with conn.cursor() as cursor:
                     if write_method == "replace":
                         cursor.execute(f"DELETE FROM {table_name};")
                         conn.commit()
                         write_method = "append"  # append after replace
 
-                    if write_method == "append":
-                        insert_query = f"""
-                            INSERT INTO {table_name} ({', '.join(column_names)})
-                            VALUES ({', '.join(['%s'] * len(column_names))});
-                        """
-                        cursor.executemany(insert_query, data_rows)
-                        conn.commit()
-
-                    elif write_method == "upsert":
-                        if upsert_on is None:
-                            raise ValueError(
-                                "upsert_on must be provided for upsert operations."
-                            )
-
-                        conflict_cols = ", ".join(upsert_on)
-                        update_cols = [col for col in column_names if col not in upsert_on]
-                        update_clause = ", ".join(
-                            [
-                                f"{col} = EXCLUDED.{col}"
-                                for col in update_cols
-                                if col != "processing_timestamp"
-                            ]
-                            + ["processing_timestamp = now()"]
+                    if engine == "copy":
+                        counts = self._copy_rows(
+                            conn=conn,
+                            cursor=cursor,
+                            table_name=table_name,
+                            data_rows=data_rows,
+                            column_names=column_names,
+                            write_method=write_method,
+                            upsert_on=upsert_on,
+                            chunk_size=chunk_size,
+                            skip_unchanged=skip_unchanged,
+                            compare_on=compare_on,
                         )
 
-                        upsert_query = f"""
-                            INSERT INTO {table_name} ({', '.join(column_names)})
-                            VALUES ({', '.join(['%s'] * len(column_names))})
-                            ON CONFLICT ({conflict_cols})
-                            DO UPDATE SET {update_clause};
-                        """
-                        cursor.executemany(upsert_query, data_rows)
+                    elif engine == "executemany":
+                        if write_method == "append":
+                            insert_query = f"""
+                                INSERT INTO {table_name} ({', '.join(column_names)})
+                                VALUES ({', '.join(['%s'] * len(column_names))});
+                            """
+                            cursor.executemany(insert_query, data_rows)
+                            counts["inserted"] = len(data_rows)
+                        else:
+                            existing = self._count_existing(
+                                cursor, table_name, data_rows, column_names, upsert_on
+                            )
+                            upsert_query = f"""
+                                INSERT INTO {table_name} AS target ({', '.join(column_names)})
+                                VALUES ({', '.join(['%s'] * len(column_names))})
+                                {self._on_conflict_clause(column_names, upsert_on, skip_unchanged, compare_on)};
+                            """
+                            cursor.executemany(upsert_query, data_rows)
+                            # rowcount sums the rows each statement wrote (0 when the guard skipped it)
+                            counts["inserted"] = len(data_rows) - existing
+                            counts["updated"] = cursor.rowcount - counts["inserted"]
+                            counts["unchanged"] = len(data_rows) - cursor.rowcount
                         conn.commit()
 
                     else:
-                        raise NotImplementedError(f"{write_method} is not implemented!")
+                        raise NotImplementedError(f"{engine} engine is not implemented!")
 
-                    print(f"Row data successfully {write_method} on table {table_name}!")
+                    print(
+                        f"Row data successfully {write_method} on table {table_name}! "
+                        f"({counts['inserted']} inserted, {counts['updated']} updated, "
+                        f"{counts['unchanged']} unchanged)"
+                    )
+                    metrics.incr("db.rows_written", counts["inserted"] + counts["updated"])
+                    metrics.incr("db.rows_unchanged", counts["unchanged"])
+                    return counts
 
         except Exception as e:
             print(
@@ -104,6 +278,340 @@ class DataLoader:
             )
             raise
 
+    def write_stream(
+        self,
+        table_name: str,
+        chunks: Iterable[List[Tuple[Any, ...]]],
+        column_names: List[str],
+        write_method: str,
+        upsert_on: Optional[List[str]] = None,
+        queue_size: Optional[int] = None,
+    ) -> int:
+        """
+        Writes chunks of rows as they are produced: the caller's thread iterates `chunks` (e.g. a
+        generator paging through an API) while a writer thread commits each chunk with `write_data`.
+        The bounded queue applies backpressure, so at most `queue_size` chunks are held in memory,
+        and chunks committed before a failure stay committed. Returns the number of rows written.
+        """
+
+        chunk_queue = queue.Queue(maxsize=queue_size or LoaderConfigs.stream_queue_size)
+        done = object()
+        errors = []
+        written = [0]
+
+        def writer() -> None:
+            method = write_method
+            while True:
+                chunk = chunk_queue.get()
+                if chunk is done:
+                    return
+                try:
+                    self.write_data(
+                        table_name=table_name,
+                        data_rows=chunk,
+                        column_names=column_names,
+                        write_method=method,
+                        upsert_on=upsert_on,
+                    )
+                    written[0] += len(chunk)
+                    method = "append" if method == "replace" else method
+                except Exception as e:
+                    errors.append(e)
+                    return
+
+        def put(item: Any) -> None:
+            while True:
+                if errors:
+                    raise errors[0]
+                try:
+                    chunk_queue.put(item, timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+
+        # the writer's metrics count towards the stage that streams the rows
+        thread = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(writer,),
+            name=f"{table_name}-writer",
+            daemon=True,
+        )
+        thread.start()
+        try:
+            for chunk in chunks:
+                if chunk:
+                    put(chunk)
+        finally:
+            if not errors:
+                put(done)
+            thread.join()
+
+        if errors:
+            raise errors[0]
+        return written[0]
+
+    @staticmethod
+    def _count_existing(
+        cursor: Any,
+        table_name: str,
+        data_rows: List[Tuple[Any, ...]],
+        column_names: List[str],
+        upsert_on: List[str],
+    ) -> int:
+        """
+        Number of `data_rows` whose `upsert_on` key is already in the table: the executemany
+        upsert cannot tell inserts from updates itself, so it counts them up front.
+        """
+
+        if not data_rows:
+            return 0
+        key_idx = [column_names.index(col) for col in upsert_on]
+        keys = {tuple(row[i] for i in key_idx) for row in data_rows}
+        cursor.execute(
+            f"SELECT {', '.join(upsert_on)} FROM {table_name} WHERE ({', '.join(upsert_on)}) IN %s;",
+            (tuple(keys),),
+        )
+        found = set(cursor.fetchall())
+        return sum(tuple(row[i] for i in key_idx) in found for row in data_rows)
+
+    @staticmethod
+    def _on_conflict_clause(
+        column_names: List[str],
+        upsert_on: List[str],
+        skip_unchanged: bool = False,
+        compare_on: Optional[List[str]] = None,
+    ) -> str:
+        """
+        Builds the ON CONFLICT ... DO UPDATE clause shared by both write engines (the target
+        table is aliased `target`). With `skip_unchanged` the update is guarded by
+        IS DISTINCT FROM on the compared columns, so identical rows are not rewritten.
+        """
+
+        conflict_cols = ", ".join(upsert_on)
+        update_cols = [
+            col for col in column_names if col not in upsert_on and col != "processing_timestamp"
+        ]
+        update_clause = ", ".join(
+            [f"{col} = EXCLUDED.{col}" for col in update_cols] + ["processing_timestamp = now()"]
+        )
+        clause = f"ON CONFLICT ({conflict_cols}) DO UPDATE SET {update_clause}"
+        if skip_unchanged:
+            compare_cols = compare_on or update_cols
+            if not compare_cols:
+                return f"ON CONFLICT ({conflict_cols}) DO NOTHING"
+            # row constructors compare NULLs as values: NULL -> NULL is unchanged
+            clause += (
+                f" WHERE ({', '.join(f'target.{col}' for col in compare_cols)}) IS DISTINCT FROM "
+                f"({', '.join(f'EXCLUDED.{col}' for col in compare_cols)})"
+            )
+        return clause
+
+    @staticmethod
+    def _copy_value(value: Any) -> str:
+        """Renders a single value in COPY text format."""
+
+        if value is None:
+            return "\\N"
+        if isinstance(value, np.ndarray):
+            return _vector_literal(value)
+        if isinstance(value, (list, tuple)):
+            # pgvector text representation, e.g. [0.1,0.2]
+            return "[" + ",".join(map(str, value)) + "]"
+        return str(value).translate(_COPY_ESCAPES)
+
+    def _copy_buffer(self, data_rows: List[Tuple[Any, ...]]) -> io.StringIO:
+        """Serializes rows into an in-memory COPY text stream."""
+
+        buffer = io.StringIO()
+        buffer.writelines(
+            "\t".join(map(self._copy_value, row)) + "\n" for row in data_rows
+        )
+        buffer.seek(0)
+        return buffer
+
+    def column_types(self, table_name: str, cursor: Optional[Any] = None) -> Dict[str, str]:
+        """
+        Column name -> SQL type (e.g. "vector(1536)") of a table, looked up once per loader.
+        Callers already holding a pooled connection pass its `cursor`: the lookup then runs in
+        their transaction instead of checking out a second connection.
+        """
+
+        if table_name not in self._column_types:
+            query = """
+                SELECT attname, format_type(atttypid, atttypmod)
+                FROM pg_attribute
+                WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+                ORDER BY attnum;
+            """
+            if cursor is not None:
+                cursor.execute(query, (table_name,))
+                self._column_types[table_name] = dict(cursor.fetchall())
+            else:
+                with self._connection() as conn:
+                    with conn.cursor() as own_cursor:
+                        own_cursor.execute(query, (table_name,))
+                        self._column_types[table_name] = dict(own_cursor.fetchall())
+                    conn.rollback()
+        return self._column_types[table_name]
+
+    def _vector_columns(
+        self, table_name: str, column_names: List[str], cursor: Optional[Any] = None
+    ) -> Dict[int, str]:
+        """Positions of the vector/halfvec columns among `column_names` -> binary dtype."""
+
+        types = self.column_types(table_name, cursor=cursor)
+        vector_columns = {}
+        for i, col in enumerate(column_names):
+            base_type = types.get(col, "").split("(")[0]
+            if base_type in _VECTOR_DTYPES:
+                vector_columns[i] = _VECTOR_DTYPES[base_type]
+        return vector_columns
+
+    @staticmethod
+    def _copy_binary_buffer(
+        data_rows: Iterable[Tuple[Any, ...]], vector_columns: Dict[int, str]
+    ) -> io.BytesIO:
+        """
+        Serializes rows into a COPY binary stream. Vector columns are written in pgvector's
+        binary format straight from float arrays; every other value is sent as text and cast
+        by the merge query (see `_copy_rows`).
+        """
+
+        buffer = io.BytesIO()
+        write = buffer.write
+        write(_COPY_BINARY_HEADER)
+        for row in data_rows:
+            write(struct.pack(">h", len(row)))
+            for i, value in enumerate(row):
+                if value is None:
+                    write(_COPY_BINARY_NULL)
+                    continue
+                if i in vector_columns:
+                    vector = np.asarray(value, dtype=vector_columns[i])
+                    write(struct.pack(">ihh", 4 + vector.nbytes, len(vector), 0))
+                    write(vector.tobytes())
+                else:
+                    data = str(value).encode("utf-8")
+                    write(struct.pack(">i", len(data)))
+                    write(data)
+        write(_COPY_BINARY_TRAILER)
+        buffer.seek(0)
+        return buffer
+
+    def _copy_rows(
+        self,
+        conn: Any,
+        cursor: Any,
+        table_name: str,
+        data_rows: List[Tuple[Any, ...]],
+        column_names: List[str],
+        write_method: str,
+        upsert_on: Optional[List[str]],
+        chunk_size: int,
+        skip_unchanged: bool = False,
+        compare_on: Optional[List[str]] = None,
+    ) -> Dict[str, int]:
+        """
+        Bulk writes rows with COPY FROM STDIN, one transaction per chunk, and returns the
+        inserted / updated / unchanged counts.
+        Appends are copied straight into the target table; upserts are copied into a
+        temp staging table and merged with a single INSERT ... SELECT ... ON CONFLICT.
+        Tables with vector columns are staged with COPY binary (`LoaderConfigs.vector_copy_format`)
+        so embeddings travel as raw floats instead of formatted text.
+        """
+
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+
+        columns = ", ".join(column_names)
+        vector_columns = {}
+        if LoaderConfigs.vector_copy_format == "binary":
+            vector_columns = self._vector_columns(table_name, column_names, cursor=cursor)
+
+        if write_method == "append" and not vector_columns:
+            for start in range(0, len(data_rows), chunk_size):
+                chunk = data_rows[start : start + chunk_size]
+                cursor.copy_expert(
+                    f"COPY {table_name} ({columns}) FROM STDIN",
+                    self._copy_buffer(chunk),
+                )
+                conn.commit()
+                counts["inserted"] += len(chunk)
+            return counts
+
+        if vector_columns:
+            # text staging columns (cast on merge) keep the binary encoder type-agnostic
+            types = self.column_types(table_name, cursor=cursor)
+            staging_table = f"{table_name.replace('.', '_')}_binary_staging"
+            staging_columns = ", ".join(
+                f"{col} {types[col] if i in vector_columns else 'text'}"
+                for i, col in enumerate(column_names)
+            )
+            create_query = (
+                f"CREATE TEMP TABLE IF NOT EXISTS {staging_table} ({staging_columns}) "
+                f"ON COMMIT DELETE ROWS;"
+            )
+            select_columns = ", ".join(
+                col if i in vector_columns else f"{col}::{types[col]}"
+                for i, col in enumerate(column_names)
+            )
+            copy_query = f"COPY {staging_table} ({columns}) FROM STDIN WITH (FORMAT binary)"
+
+            def to_buffer(rows: Iterable[Tuple[Any, ...]]) -> io.BytesIO:
+                return self._copy_binary_buffer(rows, vector_columns)
+
+        else:
+            staging_table = f"{table_name.replace('.', '_')}_staging"
+            create_query = (
+                f"CREATE TEMP TABLE IF NOT EXISTS {staging_table} "
+                f"(LIKE {table_name} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS;"
+            )
+            select_columns = columns
+            copy_query = f"COPY {staging_table} ({columns}) FROM STDIN"
+            to_buffer = self._copy_buffer
+
+        merge_query = f"""
+            INSERT INTO {table_name} ({columns})
+            SELECT {select_columns} FROM {staging_table};
+        """
+        if write_method == "upsert":
+            key_idx = [column_names.index(col) for col in upsert_on]
+            # xmax = 0 only on freshly inserted rows; rows skipped by the guard are not returned
+            merge_query = f"""
+                WITH merged AS (
+                    INSERT INTO {table_name} AS target ({columns})
+                    SELECT {select_columns} FROM {staging_table}
+                    {self._on_conflict_clause(column_names, upsert_on, skip_unchanged, compare_on)}
+                    RETURNING (xmax = 0) AS inserted
+                )
+                SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted)
+                FROM merged;
+            """
+
+        cursor.execute(create_query)
+        try:
+            for start in range(0, len(data_rows), chunk_size):
+                chunk = data_rows[start : start + chunk_size]
+                if write_method == "upsert":
+                    # a single INSERT ... ON CONFLICT cannot touch the same key twice,
+                    # keep the last occurrence like the row-by-row path does
+                    chunk = list({tuple(row[i] for i in key_idx): row for row in chunk}.values())
+                cursor.copy_expert(copy_query, to_buffer(chunk))
+                cursor.execute(merge_query)
+                if write_method == "upsert":
+                    inserted, updated = cursor.fetchone()
+                    counts["inserted"] += inserted
+                    counts["updated"] += updated
+                    counts["unchanged"] += len(chunk) - inserted - updated
+                else:
+                    counts["inserted"] += cursor.rowcount
+                conn.commit()
+        finally:
+            if not conn.closed:
+                conn.rollback()
+                cursor.execute(f"DROP TABLE IF EXISTS {staging_table};")
+                conn.commit()
+        return counts
+
     def create_table(self, table_name: str, fields: dict) -> None:
         """Creates a table in the database with the specified name and fields."""
 
@@ -111,7 +619,7 @@ class DataLoader:
             columns = ", ".join([f"{col} {dtype}" for col, dtype in fields.items()])
             create_query = f"CREATE TABLE IF NOT EXISTS {table_name} ({columns});"
 
-            with self._connect() as conn:
+            with self._connection() as conn:
                 with conn.cursor() as cursor:
                     cursor = conn.cursor()
                     cursor.execute(create_query)
@@ -128,7 +636,7 @@ class DataLoader:
         """Drops a table from the database if it exists."""
 
         try:
-            with self._connect() as conn:
+            with self._connection() as conn:
                 with conn.cursor() as cursor:
                     cursor = conn.cursor()
                     drop_query = f"DROP TABLE IF EXISTS {table_name}"
@@ -142,13 +650,160 @@ class DataLoader:
             )
             raise
 
-    def query_table(self, query: str) -> pd.DataFrame:
+    def execute(
+        self, query: str, params: Optional[Any] = None, autocommit: bool = False
+    ) -> int:
+        """
+        Runs a single statement in its own transaction and returns the affected row count.
+        `autocommit` runs it outside any transaction block, as CREATE INDEX CONCURRENTLY needs.
+        """
+
         try:
-            with self._connect() as conn:
-                return pd.read_sql(query, conn)
+            with self._connection() as conn:
+                conn.autocommit = autocommit
+                try:
+                    with conn.cursor() as cursor:
+                        cursor.execute(query, params)
+                        rowcount = cursor.rowcount
+                    conn.commit()
+                finally:
+                    if not conn.closed:
+                        conn.autocommit = False
+                return rowcount
+        except Exception as e:
+            print(
+                f"{self.__class__.__name__} - {self.execute.__name__}: an error while executing:",
+                e,
+            )
+            raise
+
+    def query_table(self, query: str, params: Optional[Any] = None) -> pd.DataFrame:
+        for attempt in range(2):
+            try:
+                with self._connection() as conn:
+                    return pd.read_sql(query, conn, params=params)
+            except Exception as e:
+                # a dropped connection usually means the idle ones are dead too (server
+                # restart, network blip): reset the pool and retry, reads are idempotent
+                if attempt == 0 and self._is_disconnect(e):
+                    self.close()
+                    continue
+                print(
+                    f"{self.__class__.__name__} - {self.query_table.__name__}: an error while querying:",
+                    e,
+                )
+                raise
+
+    def stream_query(
+        self,
+        query: str,
+        params: Optional[Any] = None,
+        fetch_size: Optional[int] = None,
+        as_frame: bool = True,
+    ) -> Iterator[Union[pd.DataFrame, List[Tuple[Any, ...]]]]:
+        """
+        Runs a query through a named server-side cursor and yields the result `fetch_size` rows
+        at a time, as DataFrames (default) or lists of row tuples, so large results are never
+        held in memory at once. The pooled connection is held until the generator is exhausted
+        or closed.
+        """
+
+        fetch_size = fetch_size or LoaderConfigs.fetch_size
+        yielded = False
+        for attempt in range(2):
+            try:
+                with self._connection() as conn:
+                    with conn.cursor(name=f"stream_{uuid.uuid4().hex}") as cursor:
+                        cursor.itersize = fetch_size
+                        cursor.execute(query, params)
+                        while True:
+                            rows = cursor.fetchmany(fetch_size)
+                            if not rows:
+                                return
+                            yielded = True
+                            if as_frame:
+                                columns = [col.name for col in cursor.description]
+                                yield pd.DataFrame.from_records(rows, columns=columns)
+                            else:
+                                yield rows
+            except Exception as e:
+                # same retry as query_table, but only before anything reached the caller
+                if attempt == 0 and not yielded and self._is_disconnect(e):
+                    self.close()
+                    continue
+                print(
+                    f"{self.__class__.__name__} - {self.stream_query.__name__}: an error while querying:",
+                    e,
+                )
+                raise
+
+    @staticmethod
+    def _decode_vectors(values: List[Optional[memoryview]], out: np.ndarray) -> None:
+        """
+        Decodes pgvector binary values (vector_send: int16 dim, int16 unused, big-endian float4s)
+        into the rows of `out`; NULLs become NaN rows.
+        """
+
+        present = [i for i, value in enumerate(values) if value is not None]
+        if len(present) < len(values):
+            out[:] = np.nan
+        if not present:
+            return
+        # the 4-byte header occupies exactly one float slot per vector, skip it
+        flat = np.frombuffer(b"".join(values[i] for i in present), dtype=">f4")
+        out[present] = flat.reshape(len(present), out.shape[1] + 1)[:, 1:]
+
+    def query_vectors(
+        self,
+        query: str,
+        vector_column: str,
+        params: Optional[Any] = None,
+        fetch_size: Optional[int] = None,
+    ) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        Runs a query with a pgvector column and returns (the other columns as a DataFrame, the
+        vectors as an (n, dim) float32 array). The array is allocated once from a row count taken
+        in the same snapshot and filled batch by batch from a server-side cursor with the binary
+        vector representation, so vectors never exist as text or Python lists of floats.
+        """
+
+        fetch_size = fetch_size or LoaderConfigs.fetch_size
+        inner = query.strip().rstrip(";")
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cursor:
+                    # the probe, the count and the cursor must all see the same rows
+                    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY;")
+                    cursor.execute(f"SELECT * FROM ({inner}) AS q LIMIT 0;", params)
+                    columns = [col.name for col in cursor.description if col.name != vector_column]
+                    cursor.execute(
+                        f"SELECT count(*), max(vector_dims({vector_column}::vector)) FROM ({inner}) AS q;",
+                        params,
+                    )
+                    n_rows, dim = cursor.fetchone()
+
+                select_list = ", ".join(
+                    [f'q."{col}"' for col in columns] + [f"vector_send(q.{vector_column}::vector)"]
+                )
+                vectors = np.empty((n_rows, dim or 0), dtype=np.float32)
+                records = []
+                with conn.cursor(name=f"vectors_{uuid.uuid4().hex}") as cursor:
+                    cursor.itersize = fetch_size
+                    cursor.execute(f"SELECT {select_list} FROM ({inner}) AS q;", params)
+                    while True:
+                        rows = cursor.fetchmany(fetch_size)
+                        if not rows:
+                            break
+                        start = len(records)
+                        self._decode_vectors(
+                            [r[-1] for r in rows], vectors[start : start + len(rows)]
+                        )
+                        records.extend(r[:-1] for r in rows)
+
+            return pd.DataFrame.from_records(records, columns=columns), vectors
         except Exception as e:
             print(
-                f"{self.__class.__name__} - {self.query_table.__name__}: an error while querying:",
+                f"{self.__class__.__name__} - {self.query_vectors.__name__}: an error while querying:",
                 e,
             )
             raise
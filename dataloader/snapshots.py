@@ -0,0 +1,433 @@
+import itertools
+import json
+import shutil
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+from api.configs import LoaderConfigs, SchemaConfigs, SnapshotConfigs
+from dataloader.load_data import DataLoader
+from utils.metrics import metrics
+from utils.utilities import utc_day
+
+DateLike = Union[str, date, datetime, None]
+# a list of (column, op, value) conditions ANDed together, or a pyarrow compute expression
+Filters = Union[List[Tuple[str, str, Any]], ds.Expression, None]
+
+MANIFEST = "_manifest.json"
+# partition of the rows without created_utc (pyarrow's hive default for nulls)
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+PARTITIONING = ds.partitioning(pa.schema([("day", pa.date32())]), flavor="hive")
+_EXTENSIONS = {"parquet": "parquet", "arrow": "arrow"}
+_DATASET_FORMATS = {"parquet": "parquet", "arrow": "ipc"}
+
+_ARROW_TYPES = {
+    "text": pa.string(),
+    "bigint": pa.int64(),
+    "integer": pa.int32(),
+    "smallint": pa.int16(),
+    "double precision": pa.float64(),
+    "real": pa.float32(),
+    "boolean": pa.bool_(),
+    "date": pa.date32(),
+    "timestamp with time zone": pa.timestamp("us", tz="UTC"),
+    "timestamp without time zone": pa.timestamp("us"),
+}
+
+
+def _arrow_type(sql_type: str) -> pa.DataType:
+    """Arrow type of a column; vector(n) / halfvec(n) become fixed-size lists of n float32."""
+
+    base, _, size = sql_type.partition("(")
+    if base in ("vector", "halfvec"):
+        return pa.list_(pa.float32(), int(size.rstrip(")")))
+    if sql_type not in _ARROW_TYPES:
+        raise ValueError(f"no Arrow type for SQL type '{sql_type}'")
+    return _ARROW_TYPES[sql_type]
+
+
+class _DayWriter:
+    """One partition file, written through a temporary name and buffered into row groups."""
+
+    def __init__(self, path: Path, schema: pa.Schema, file_format: str) -> None:
+        self.path = path
+        self.schema = schema
+        self.file_format = file_format
+        self.rows = 0
+        self._batches: List[pa.RecordBatch] = []
+        self._buffered = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # dot-prefixed, so readers skip the file until it is complete
+        self._tmp = path.with_name(f".{path.name}.tmp")
+        if file_format == "parquet":
+            vectors = [f.name for f in schema if pa.types.is_fixed_size_list(f.type)]
+            self._writer = pq.ParquetWriter(
+                self._tmp,
+                schema,
+                # float noise neither compresses nor dictionary-encodes: leave vectors plain
+                compression={
+                    f.name: "none" if f.name in vectors else SnapshotConfigs.compression
+                    for f in schema
+                },
+                use_dictionary=[f.name for f in schema if f.name not in vectors],
+            )
+        else:
+            # uncompressed IPC, so memory-mapped reads hand out the file's buffers as they are
+            self._writer = pa.ipc.new_file(str(self._tmp), schema)
+
+    def write(self, batch: pa.RecordBatch) -> None:
+        self._batches.append(batch)
+        self._buffered += batch.num_rows
+        if self._buffered >= SnapshotConfigs.row_group_rows:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._batches:
+            return
+        table = pa.Table.from_batches(self._batches, schema=self.schema)
+        if self.file_format == "parquet":
+            self._writer.write_table(table, row_group_size=SnapshotConfigs.row_group_rows)
+        else:
+            self._writer.write_table(table, max_chunksize=SnapshotConfigs.row_group_rows)
+        self.rows += table.num_rows
+        self._batches, self._buffered = [], 0
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+        self._tmp.replace(self.path)
+
+    def discard(self) -> None:
+        """Closes the writer of a failed export and removes its temporary file."""
+
+        try:
+            self._writer.close()
+        finally:
+            self._tmp.unlink(missing_ok=True)
+
+
+class SnapshotExporter:
+    """
+    Exports tables into a snapshot directory of date-partitioned Parquet (or Arrow IPC) files,
+    `<root>/<table>/day=YYYY-MM-DD/part-0.parquet` by the UTC day of `created_utc`, streamed
+    from a server-side cursor in created_utc order so one partition file is open at a time.
+    Column types follow the table: timestamps stay UTC timestamps and vector columns become
+    fixed-size float32 lists, decoded from pgvector's binary format. `since` re-exports only
+    the days from then on. `import_table` loads a snapshot back into a database.
+    """
+
+    def __init__(
+        self,
+        loader: DataLoader,
+        root: Optional[str] = None,
+        file_format: Optional[str] = None,
+    ) -> None:
+        self.loader = loader
+        self.root = Path(root or SnapshotConfigs.root_dir)
+        self.file_format = file_format or SnapshotConfigs.file_format
+        if self.file_format not in _EXTENSIONS:
+            raise ValueError(f"file_format must be one of {list(_EXTENSIONS)}, got '{self.file_format}'")
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(root='{self.root}', file_format='{self.file_format}')"
+        )
+
+    def schema(self, table: str) -> pa.Schema:
+        return pa.schema(
+            [(col, _arrow_type(sql_type)) for col, sql_type in self.loader.column_types(table).items()]
+        )
+
+    @staticmethod
+    def _record_batch(rows: List[Tuple[Any, ...]], schema: pa.Schema) -> pa.RecordBatch:
+        arrays = []
+        for i, field in enumerate(schema):
+            values = [row[i] for row in rows]
+            if pa.types.is_fixed_size_list(field.type):
+                vectors = np.empty((len(rows), field.type.list_size), dtype=np.float32)
+                DataLoader._decode_vectors(values, vectors)
+                nulls = np.array([value is None for value in values])
+                arrays.append(
+                    pa.FixedSizeListArray.from_arrays(
+                        pa.array(vectors.reshape(-1)),
+                        field.type.list_size,
+                        mask=pa.array(nulls) if nulls.any() else None,
+                    )
+                )
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    def _swap_in(self, staging_dir: Path, table_dir: Path, since: Optional[date]) -> None:
+        """
+        Replaces the partitions an export rewrites (all of them, or the days from `since`) with
+        the ones staged in `staging_dir`, once the whole export succeeded.
+        """
+
+        if since is None:
+            old_dir = table_dir.with_name(f".{table_dir.name}.old")
+            shutil.rmtree(old_dir, ignore_errors=True)
+            if table_dir.exists():
+                table_dir.rename(old_dir)
+            staging_dir.rename(table_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+            return
+        for partition in table_dir.glob("day=*"):
+            day = partition.name.split("=", 1)[1]
+            if day != NULL_PARTITION and date.fromisoformat(day) >= since:
+                shutil.rmtree(partition)
+        table_dir.mkdir(parents=True, exist_ok=True)
+        for partition in staging_dir.glob("day=*"):
+            partition.rename(table_dir / partition.name)
+        shutil.rmtree(staging_dir)
+
+    def export_table(self, table: str, since: DateLike = None) -> int:
+        """Writes the table's rows (created from `since` on, default all) and returns the count."""
+
+        since = utc_day(since)
+        schema = self.schema(table)
+        select_list = ", ".join(
+            f"vector_send({f.name}::vector)" if pa.types.is_fixed_size_list(f.type) else f.name
+            for f in schema
+        )
+        query = f"""
+            SELECT {select_list}, (created_utc AT TIME ZONE 'UTC')::date::text AS day
+            FROM {table}
+            WHERE %(since)s::date IS NULL
+               OR created_utc >= %(since)s::date::timestamp AT TIME ZONE 'UTC'
+            ORDER BY created_utc NULLS LAST;
+        """
+        table_dir = self.root / table
+        # written aside and swapped in at the end, so a failed export leaves the snapshot as it was
+        staging_dir = self.root / f".{table}.staging"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        staging_dir.mkdir(parents=True)
+        extension = _EXTENSIONS[self.file_format]
+
+        written, writer = 0, None
+        try:
+            with metrics.timer("snapshot.export"):
+                for rows in self.loader.stream_query(query, params={"since": since}, as_frame=False):
+                    # rows arrive in created_utc order: each day is one run of consecutive rows
+                    for day, group in itertools.groupby(rows, key=lambda row: row[-1]):
+                        path = staging_dir / f"day={day or NULL_PARTITION}" / f"part-0.{extension}"
+                        if writer is None or writer.path != path:
+                            if writer is not None:
+                                writer.close()
+                                written += writer.rows
+                            writer = _DayWriter(path, schema, self.file_format)
+                        writer.write(self._record_batch(list(group), schema))
+                if writer is not None:
+                    writer.close()
+                    written += writer.rows
+                    writer = None
+            self._swap_in(staging_dir, table_dir, since)
+        except Exception as e:
+            print(
+                f"{self.__class__.__name__} - {self.export_table.__name__}: exporting {table} "
+                f"failed, snapshot left unchanged: {e}"
+            )
+            if writer is not None:
+                writer.discard()
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+        metrics.incr("snapshot.rows_exported", written)
+        return written
+
+    def export(
+        self, tables: Optional[List[str]] = None, since: DateLike = None
+    ) -> Dict[str, int]:
+        """Exports tables (default `SnapshotConfigs.tables`) and updates the manifest."""
+
+        exported = {table: self.export_table(table, since) for table in tables or SnapshotConfigs.tables}
+        path = self.root / MANIFEST
+        manifest = json.loads(path.read_text()) if path.exists() else {"tables": {}}
+        reader = SnapshotReader(str(self.root))
+        for table in exported:
+            manifest["tables"][table] = {
+                "file_format": self.file_format,
+                "rows": reader.count_rows(table, file_format=self.file_format),
+                "exported_utc": datetime.now(timezone.utc).isoformat(),
+                "since": str(utc_day(since)) if since else None,
+                "columns": {f.name: str(f.type) for f in self.schema(table)},
+            }
+        path.write_text(json.dumps(manifest, indent=2))
+        return exported
+
+    def import_table(
+        self,
+        table: str,
+        start: DateLike = None,
+        end: DateLike = None,
+        upsert_on: Optional[List[str]] = None,
+    ) -> int:
+        """
+        Upserts a table's snapshot rows (optionally only the days `start`..`end`) into the
+        database in batches of `LoaderConfigs.copy_chunk_size`; returns the rows read.
+        """
+
+        reader = SnapshotReader(str(self.root))
+        columns = SchemaConfigs.table_mapping[table]
+        dataset = reader.dataset(table)
+        scanner = dataset.scanner(
+            columns=columns,
+            filter=reader.expression(None, start, end),
+            batch_size=LoaderConfigs.copy_chunk_size,
+        )
+        imported = 0
+        for batch in scanner.to_batches():
+            if not batch.num_rows:
+                continue
+            values = []
+            for col in columns:
+                array = batch.column(col)
+                if pa.types.is_fixed_size_list(array.type):
+                    vectors = _vectors(array)
+                    values.append(
+                        [None if np.isnan(v[0]) else v for v in vectors]
+                        if array.null_count
+                        else list(vectors)
+                    )
+                else:
+                    values.append(array.to_pylist())
+            self.loader.write_data(
+                table_name=table,
+                data_rows=list(zip(*values)),
+                column_names=columns,
+                write_method="upsert",
+                upsert_on=upsert_on or ["id"],
+            )
+            imported += batch.num_rows
+        return imported
+
+
+def _vectors(array: Union[pa.Array, pa.ChunkedArray]) -> np.ndarray:
+    """
+    (n, dim) float32 view of a fixed-size list column; a copy only when it spans several
+    chunks or has nulls, which become NaN rows like `DataLoader.query_vectors`.
+    """
+
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks() if array.num_chunks != 1 else array.chunk(0)
+    dim = array.type.list_size
+    values = array.values.slice(array.offset * dim, len(array) * dim)
+    vectors = values.to_numpy(zero_copy_only=False).reshape(len(array), dim)
+    if array.null_count:
+        vectors = vectors.copy()
+        vectors[array.is_null().to_numpy(zero_copy_only=False)] = np.nan
+    return vectors
+
+
+class SnapshotReader:
+    """
+    Offline access to a snapshot directory, without a database connection. Reads go through
+    pyarrow datasets: `columns` projects (only those column chunks are read), `start` / `end`
+    prune day partitions and `filters` are pushed down to Parquet row-group statistics before
+    rows are filtered. Files are memory-mapped (`memory_map`), so only the pages a read touches
+    are loaded and several processes share them through the page cache; Arrow IPC snapshots
+    are used in place without decoding.
+    """
+
+    def __init__(self, root: Optional[str] = None, memory_map: bool = True) -> None:
+        self.root = Path(root or SnapshotConfigs.root_dir)
+        self.memory_map = memory_map
+        self._filesystem = pafs.LocalFileSystem(use_mmap=memory_map)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(root='{self.root}', memory_map={self.memory_map})"
+
+    @property
+    def manifest(self) -> Dict[str, Any]:
+        path = self.root / MANIFEST
+        return json.loads(path.read_text()) if path.exists() else {"tables": {}}
+
+    def tables(self) -> List[str]:
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir())
+
+    def dataset(self, table: str, file_format: Optional[str] = None) -> ds.Dataset:
+        file_format = (
+            file_format
+            or self.manifest["tables"].get(table, {}).get("file_format")
+            or SnapshotConfigs.file_format
+        )
+        return ds.dataset(
+            str(self.root / table),
+            format=_DATASET_FORMATS[file_format],
+            partitioning=PARTITIONING,
+            filesystem=self._filesystem,
+            exclude_invalid_files=False,
+            ignore_prefixes=[".", "_"],
+        )
+
+    @staticmethod
+    def expression(
+        filters: Filters, start: DateLike = None, end: DateLike = None
+    ) -> Optional[ds.Expression]:
+        """Row filter: `filters` ANDed with the inclusive UTC day range `start`..`end`."""
+
+        conditions = []
+        if isinstance(filters, ds.Expression):
+            conditions.append(filters)
+        elif filters:
+            conditions.append(pq.filters_to_expression(filters))
+        if start is not None:
+            conditions.append(ds.field("day") >= pa.scalar(utc_day(start), pa.date32()))
+        if end is not None:
+            conditions.append(ds.field("day") <= pa.scalar(utc_day(end), pa.date32()))
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def read(
+        self,
+        table: str,
+        columns: Optional[List[str]] = None,
+        filters: Filters = None,
+        start: DateLike = None,
+        end: DateLike = None,
+    ) -> pa.Table:
+        with metrics.timer("snapshot.read"):
+            return self.dataset(table).to_table(
+                columns=columns, filter=self.expression(filters, start, end)
+            )
+
+    def read_pandas(
+        self,
+        table: str,
+        columns: Optional[List[str]] = None,
+        filters: Filters = None,
+        start: DateLike = None,
+        end: DateLike = None,
+    ) -> pd.DataFrame:
+        """`read` as a DataFrame; vector columns are best taken with `read_vectors` instead."""
+
+        return self.read(table, columns, filters, start, end).to_pandas()
+
+    def read_vectors(
+        self,
+        table: str = "posts_ai_analysis",
+        vector_column: str = "embeddings",
+        columns: Optional[List[str]] = None,
+        filters: Filters = None,
+        start: DateLike = None,
+        end: DateLike = None,
+    ) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        Same result as `DataLoader.query_vectors`: (the other columns as a DataFrame, the
+        vectors as an (n, dim) float32 array).
+        """
+
+        if columns is not None and vector_column not in columns:
+            columns = columns + [vector_column]
+        data = self.read(table, columns, filters, start, end)
+        vectors = _vectors(data.column(vector_column))
+        return data.drop_columns([vector_column]).to_pandas(), vectors
+
+    def count_rows(self, table: str, filters: Filters = None, file_format: Optional[str] = None) -> int:
+        return self.dataset(table, file_format).count_rows(filter=self.expression(filters))
@@ -1,62 +1,113 @@
-from ai_moderator.chatbot import AIModerator
-from ai_moderator.analyze_posts import PostAnalyzer
-from dotenv import load_dotenv
-from openai import OpenAI
-from dataloader.load_data import DataLoader
-from api.configs import SchemaConfigs, PostAPIConfigs
-from utils.utilities import get_env_variable
-
-load_dotenv()
-# Env vars
-API_KEY = get_env_variable("API_KEY")
-USER    = get_env_variable("DB_USER")
-PASSWORD= get_env_variable("DB_PASSWORD")
-HOST    = get_env_variable("DB_HOST")
-PORT    = get_env_variable("DB_PORT")
-DBNAME  = get_env_variable("DB_NAME")
-POST_LIMIT = PostAPIConfigs.post_limit
-
-# Clients
-client = OpenAI(api_key=API_KEY)
-ai_mod = AIModerator(client=client)
+import argparse
+from api.configs import SchemaConfigs, PostAPIConfigs, AIConfigs
+from etl.context import context
+from etl.rollups import rollup_keys, update_rollups
 
-# Instances
-loader = DataLoader(
-    user=USER,
-    password=PASSWORD,
-    host=HOST,
-    port=PORT,
-    dbname=DBNAME
-)
-analyzer = PostAnalyzer()
+POST_LIMIT = PostAPIConfigs.post_limit
 
 def analyze_posts():
     print("Running analyze posts...")
     try:
+        # heavy dependencies (openai, pandas, psycopg2) load on first run, not on import
+        import asyncio
+        from ai_moderator.analyze_posts import PostAnalyzer
+
+        loader = context.loader
+        ai_mod = context.moderator
+        analyzer = PostAnalyzer()
 
         new_posts = analyzer.find_new_posts(loader = loader, post_limit = POST_LIMIT)    
 
         print(f"Found {len(new_posts)} posts to analyze.")
 
-        results = analyzer.process_posts(moderator = ai_mod,posts = new_posts)   
+        if AIConfigs.async_mode:
+            results = asyncio.run(
+                analyzer.aprocess_posts(moderator=ai_mod, posts=new_posts)
+            )
+        else:
+            results = analyzer.process_posts(moderator = ai_mod,posts = new_posts)
         if results:
 
             print(f"{len(results)} have been processed.")
             print("Writing data to remote database...")
 
-            loader.write_data(
-            table_name="posts_ai_analysis",
-            data_rows=results,
-            column_names=SchemaConfigs.table_mapping["posts_ai_analysis"],
-            write_method="upsert",
-            upsert_on=["id"],
-            )
+            write_analysis_rows(results)
         else:
             print("No results to write; exiting...")
+
+        analyzer.record_progress(loader=loader, posts=new_posts, rows=results)
+
+        if context.cache is not None:
+            print(f"AI result cache: {context.cache.stats()}")
         
     except Exception as e:
         print(f"{analyze_posts.__name__} - [ERROR] An error occurred {e}")
+        raise
+
+
+def write_analysis_rows(rows):
+    ids = [row[0] for row in rows]
+    previous_keys = rollup_keys("posts_ai_analysis", ids)
+    context.loader.write_data(
+        table_name="posts_ai_analysis",
+        data_rows=rows,
+        column_names=SchemaConfigs.table_mapping["posts_ai_analysis"],
+        write_method="upsert",
+        upsert_on=["id"],
+    )
+    update_rollups("posts_ai_analysis", ids, previous_keys)
+
+
+def analyze_posts_batch(backfill: bool = False, backend=None):
+    """Classifies pending posts (or every post when backfilling) through a batch job."""
+
+    print("Running analyze posts in batch-job mode...")
+    try:
+        from ai_moderator.analyze_posts import PostAnalyzer
+        from ai_moderator.batch_jobs import BatchAnalysisJob, OpenAIBatchBackend
+
+        loader = context.loader
+        analyzer = PostAnalyzer()
+
+        if backfill:
+            posts = analyzer.find_all_posts(loader=loader)
+        else:
+            posts = analyzer.find_new_posts(loader=loader, post_limit=POST_LIMIT)
+        print(f"Found {len(posts)} posts to analyze.")
+
+        job = BatchAnalysisJob(
+            moderator=context.moderator,
+            backend=backend or OpenAIBatchBackend(client=context.openai_client),
+            work_dir=AIConfigs.batch_work_dir,
+            poll_seconds=AIConfigs.batch_poll_seconds,
+            chunk_size=AIConfigs.batch_chunk_size,
+        )
+        written_rows = []
+
+        def write_rows(rows):
+            write_analysis_rows(rows)
+            written_rows.extend(rows)
+
+        written = job.run(posts=posts, write_rows=write_rows)
+        print(f"{written} posts written to posts_ai_analysis.")
+
+        analyzer.record_progress(loader=loader, posts=posts, rows=written_rows)
+
+    except Exception as e:
+        print(f"{analyze_posts_batch.__name__} - [ERROR] An error occurred {e}")
+        raise
 
 
 if __name__ == "__main__":
-    analyze_posts()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="AI analysis of subreddit posts.")
+    parser.add_argument("--batch", action="store_true", help="use the batch-job API")
+    parser.add_argument("--backfill", action="store_true", help="re-classify every post (batch mode)")
+    args = parser.parse_args()
+
+    try:
+        if args.batch or args.backfill:
+            analyze_posts_batch(backfill=args.backfill)
+        else:
+            analyze_posts()
+    finally:
+        context.close()
\ No newline at end of file
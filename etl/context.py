@@ -0,0 +1,162 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from api.configs import AIConfigs, PostAPIConfigs
+from utils.utilities import get_env_variable
+
+
+class PipelineContext:
+    """
+    Resources shared by the ETL stages (env, DB loader, OpenAI clients, AI result cache), each
+    created on first use. Importing a stage module therefore reads no secrets, opens no
+    connections and does not import pandas/openai/praw; a run only pays for what it touches.
+    Safe to use from concurrent stages: every resource is built once under a lock.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._resources: Dict[str, Any] = {}
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(created={sorted(self._resources)})"
+
+    def _resource(self, name: str, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            if name not in self._resources:
+                self._resources[name] = factory()
+            return self._resources[name]
+
+    def env(self, name: str) -> str:
+        """Reads an environment variable, loading `.env` on the first call."""
+
+        def load() -> bool:
+            from dotenv import load_dotenv
+
+            return load_dotenv()
+
+        self._resource("dotenv", load)
+        return get_env_variable(name)
+
+    @property
+    def loader(self) -> Any:
+        """One pooled DataLoader shared by every ETL stage (and their worker threads)."""
+
+        def create() -> Any:
+            from dataloader.load_data import DataLoader
+
+            return DataLoader(
+                user=self.env("DB_USER"),
+                password=self.env("DB_PASSWORD"),
+                host=self.env("DB_HOST"),
+                port=self.env("DB_PORT"),
+                dbname=self.env("DB_NAME"),
+            )
+
+        return self._resource("loader", create)
+
+    @property
+    def reddit_credentials(self) -> List[Dict[str, str]]:
+        """
+        The Reddit app credentials to spread requests over (`PostAPIConfigs.credential_sets`):
+        CLIENT_ID / CLIENT_SECRET, then CLIENT_ID_2 / CLIENT_SECRET_2 and so on.
+        """
+
+        def create() -> List[Dict[str, str]]:
+            suffixes = [""] + [f"_{n}" for n in range(2, PostAPIConfigs.credential_sets + 1)]
+            return [
+                {
+                    "client_id": self.env(f"CLIENT_ID{suffix}"),
+                    "secret": self.env(f"CLIENT_SECRET{suffix}"),
+                }
+                for suffix in suffixes
+            ]
+
+        return self._resource("reddit_credentials", create)
+
+    def subreddit_settings(
+        self,
+        subreddit_name: str,
+        credentials: Optional[Dict[str, str]] = None,
+        requests_per_window: Optional[int] = None,
+        ratelimit_share: float = 1.0,
+    ) -> Dict[str, Any]:
+        """
+        Extractor keyword arguments for one subreddit, credential set and request budget
+        (`ratelimit_share`: the part of the app's quota reported by Reddit it may spend).
+        """
+
+        return {
+            "subreddit_name": subreddit_name,
+            **(credentials or self.reddit_credentials[0]),
+            "timeout": PostAPIConfigs.timeout,
+            "user_agent": f"script:{subreddit_name}:1.0 (by u/{self.env('REDDIT_USERNAME')})",
+            "post_limit": PostAPIConfigs.post_limit,
+            "requests_per_window": requests_per_window or PostAPIConfigs.requests_per_window,
+            "ratelimit_seconds": PostAPIConfigs.ratelimit_seconds,
+            "ratelimit_share": ratelimit_share,
+        }
+
+    @property
+    def reddit_settings(self) -> Dict[str, Any]:
+        """Keyword arguments shared by the post and comment extractors."""
+
+        def create() -> Dict[str, Any]:
+            return self.subreddit_settings(PostAPIConfigs.subreddit_name)
+
+        return self._resource("reddit_settings", create)
+
+    @property
+    def openai_client(self) -> Any:
+        def create() -> Any:
+            from openai import OpenAI
+
+            return OpenAI(api_key=self.env("API_KEY"))
+
+        return self._resource("openai_client", create)
+
+    @property
+    def async_openai_client(self) -> Any:
+        def create() -> Any:
+            from openai import AsyncOpenAI
+
+            # retries are driven by PostAnalyzer's adaptive backoff in async mode
+            return AsyncOpenAI(api_key=self.env("API_KEY"), max_retries=0)
+
+        return self._resource("async_openai_client", create)
+
+    @property
+    def cache(self) -> Any:
+        """The AI result cache, or None when `AIConfigs.cache_enabled` is off."""
+
+        def create() -> Any:
+            if not AIConfigs.cache_enabled:
+                return None
+            from ai_moderator.cache import ResultCache
+
+            return ResultCache(path=AIConfigs.cache_path, max_bytes=AIConfigs.cache_max_bytes)
+
+        return self._resource("cache", create)
+
+    @property
+    def moderator(self) -> Any:
+        def create() -> Any:
+            from ai_moderator.chatbot import AIModerator
+
+            return AIModerator(
+                client=self.openai_client,
+                async_client=self.async_openai_client,
+                cache=self.cache,
+            )
+
+        return self._resource("moderator", create)
+
+    def close(self) -> None:
+        """Closes whatever was created (pooled connections, cache) and forgets it."""
+
+        with self._lock:
+            resources, self._resources = self._resources, {}
+        for name in ("loader", "cache"):
+            if resources.get(name) is not None:
+                resources[name].close()
+
+
+context = PipelineContext()
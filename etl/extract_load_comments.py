@@ -1,48 +1,52 @@
-from dotenv import load_dotenv
+from typing import Any, Dict, Optional
 from api.configs import PostAPIConfigs, SchemaConfigs
-from dataloader.load_data import DataLoader
-from utils.utilities import get_env_variable
-from extractors.extract_posts_comments import CommentExtractor
-
-load_dotenv()
-
-# DB CONFIGS
-USER = get_env_variable("DB_USER")
-PASSWORD = get_env_variable("DB_PASSWORD")
-HOST = get_env_variable("DB_HOST")
-PORT = get_env_variable("DB_PORT")
-DBNAME = get_env_variable("DB_NAME")
-
-loader = DataLoader(
-    user=USER, password=PASSWORD, host=HOST, port=PORT, dbname=DBNAME
-)
+from etl.context import context
+from etl.rollups import rollup_keys, update_rollups
 
 # Reddit configs
-REDDIT_USERNAME = get_env_variable("REDDIT_USERNAME")
-SUBREDDIT_NAME = PostAPIConfigs.subreddit_name
-CLIENT_ID = get_env_variable("CLIENT_ID")
-SECRET = get_env_variable("CLIENT_SECRET")
-TIMEOUT = PostAPIConfigs.timeout
-USER_AGENT = f"script:{SUBREDDIT_NAME}:1.0 (by u/{REDDIT_USERNAME})"
-POST_LIMIT = PostAPIConfigs.post_limit
-
-def etl_comments():    
+COMMENT_WORKERS = PostAPIConfigs.comment_workers
+INCREMENTAL = PostAPIConfigs.incremental_comments
+HOT_WINDOW_HOURS = PostAPIConfigs.hot_window_hours
+MORE_COMMENTS_LIMIT = PostAPIConfigs.more_comments_limit
+MORE_COMMENTS_THRESHOLD = PostAPIConfigs.more_comments_threshold
+MAX_COMMENT_DEPTH = PostAPIConfigs.max_comment_depth
+
+def etl_comments(
+    reddit_settings: Optional[Dict[str, Any]] = None,
+    stage: Optional[str] = None,
+    only_subreddit: bool = False,
+) -> int:
+    """
+    Crawls and loads the comments of the posts selected by CommentExtractor; sharded runs pass
+    their own subreddit/credentials, checkpoint stage and `only_subreddit`. Returns the comments
+    written.
+    """
     print("Running comments etl...")
     try:
+        # heavy dependencies (praw, pandas, psycopg2) load on first run, not on import
+        from extractors.extract_posts_comments import CommentExtractor
+
+        loader = context.loader
         CE = CommentExtractor(
-            subreddit_name=SUBREDDIT_NAME,
-            client_id=CLIENT_ID,
-            secret=SECRET,
-            timeout=TIMEOUT,
-            user_agent=USER_AGENT,
-            post_limit=POST_LIMIT,
+            **(reddit_settings or context.reddit_settings),
+            max_workers=COMMENT_WORKERS,
+            incremental=INCREMENTAL,
+            hot_window_hours=HOT_WINDOW_HOURS,
+            more_comments_limit=MORE_COMMENTS_LIMIT,
+            more_comments_threshold=MORE_COMMENTS_THRESHOLD,
+            max_depth=MAX_COMMENT_DEPTH,
+            stage=stage,
+            only_subreddit=only_subreddit,
         )
 
         print("Fetching comment data from posts...")
         comment_data = CE.fetch_comment_data(loader=loader)
 
+        print(f"Reddit rate limit: {CE.rate_limiter.state()}")
         print("Writing comments to remote database...")
 
+        comment_ids = [row[0] for row in comment_data]
+        previous_keys = rollup_keys("comments", comment_ids)
         loader.write_data(
             table_name="comments",
             data_rows=comment_data,
@@ -51,9 +55,18 @@ def etl_comments():
             upsert_on=["id"],
         )
 
+        # only advance the crawl watermarks once the comments are safely written
+        CE.update_crawl_state(loader=loader)
+        update_rollups("comments", comment_ids, previous_keys)
+        return len(comment_data)
+
     except Exception as e:
         print(f"{etl_comments.__name__} - [ERROR] An error occurred {e}")
+        raise
 
 
 if __name__ == "__main__":
-    etl_comments()
+    try:
+        etl_comments()
+    finally:
+        context.close()
@@ -1,56 +1,61 @@
+from typing import Any, Dict, Optional
 from api.configs import PostAPIConfigs, SchemaConfigs
-from utils.utilities import get_env_variable
-from dotenv import load_dotenv
-from extractors.extract_posts import PostExtractor
-from dataloader.load_data import DataLoader
+from etl.context import context
+from etl.rollups import rollup_keys, update_rollups
 
-load_dotenv()
+STREAM_CHUNK_SIZE = PostAPIConfigs.stream_chunk_size
+STAGE = "etl_posts"
 
-# DB CONFIGS
-USER = get_env_variable("DB_USER")
-PASSWORD = get_env_variable("DB_PASSWORD")
-HOST = get_env_variable("DB_HOST")
-PORT = get_env_variable("DB_PORT")
-DBNAME = get_env_variable("DB_NAME")
-
-# Subreddit Configs
-REDDIT_USERNAME = get_env_variable("REDDIT_USERNAME")
-SUBREDDIT_NAME = PostAPIConfigs.subreddit_name
-CLIENT_ID = get_env_variable("CLIENT_ID")
-SECRET = get_env_variable("CLIENT_SECRET")
-TIMEOUT = PostAPIConfigs.timeout
-USER_AGENT = f"script:{SUBREDDIT_NAME}:1.0 (by u/{REDDIT_USERNAME})"
-POST_LIMIT = PostAPIConfigs.post_limit
-
-def etl_posts():
+def etl_posts(reddit_settings: Optional[Dict[str, Any]] = None, stage: str = STAGE) -> int:
+    """
+    Streams the newest posts of a subreddit into `posts`; sharded runs pass their own
+    subreddit/credentials and checkpoint stage. Returns the posts written.
+    """
     print("Running posts etl...")
     try:
-        PE = PostExtractor(
-            subreddit_name=SUBREDDIT_NAME,
-            client_id=CLIENT_ID,
-            secret=SECRET,
-            timeout=TIMEOUT,
-            user_agent=USER_AGENT,
-            post_limit=POST_LIMIT,
-        )
+        # heavy dependencies (praw, pandas, psycopg2) load on first run, not on import
+        from dataloader.checkpoints import CheckpointStore
+        from extractors.extract_posts import PostExtractor
 
-        print("Fetching posts...")
-        posts_data = PE.fetch_post_data()
-        
-        loader = DataLoader(
-            user=USER, password=PASSWORD, host=HOST, port=PORT, dbname=DBNAME
-        )
-        print("Writing posts to remote database...")
+        loader = context.loader
+        PE = PostExtractor(**(reddit_settings or context.reddit_settings))
 
-        loader.write_data(
+        newest, ids = [], []
+        previous_keys = {}
+
+        def chunks():
+            for chunk in PE.iter_post_chunks(chunk_size=STREAM_CHUNK_SIZE):
+                newest.append(max((row[-1] for row in chunk if row[-1]), default=None))
+                chunk_ids = [row[0] for row in chunk]
+                ids.extend(chunk_ids)
+                # looked up before the chunk is queued, i.e. before the writer upserts it
+                for table, keys in rollup_keys("posts", chunk_ids).items():
+                    previous_keys.setdefault(table, []).extend(keys)
+                yield chunk
+
+        print("Fetching posts and writing them to remote database as they arrive...")
+        written = loader.write_stream(
             table_name="posts",
-            data_rows=posts_data,
+            chunks=chunks(),
             column_names=SchemaConfigs.table_mapping["posts"],
             write_method="upsert",
             upsert_on=["id"],
         )
+        print(f"{written} posts written.")
+        print(f"Reddit rate limit: {PE.rate_limiter.state()}")
+        CheckpointStore(loader).advance(
+            stage,
+            watermark=max(filter(None, newest), default=None),
+            rows_processed=written,
+        )
+        update_rollups("posts", ids, previous_keys)
+        return written
     except Exception as e:
         print(f"{etl_posts.__name__} - [ERROR] An error occurred {e}")
+        raise
 
 if __name__ == "__main__":
-    etl_posts()
+    try:
+        etl_posts()
+    finally:
+        context.close()
@@ -0,0 +1,139 @@
+import argparse
+from collections import Counter
+from typing import Any, Dict, List
+from api.configs import PostAPIConfigs
+from etl.context import context
+from etl.extract_load_comments import etl_comments
+from etl.extract_load_posts import etl_posts
+from utils.metrics import metrics
+
+
+def plan_shards(
+    subreddits: List[str],
+    credentials: List[Dict[str, str]],
+    processes: int,
+    requests_per_window: int,
+) -> List[Dict[str, Any]]:
+    """
+    Splits `subreddits` round-robin over at most `processes` shards and assigns credential sets
+    round-robin over the shards. Reddit's quota is per app, so shards sharing a credential set
+    split its `requests_per_window` and the quota reported in Reddit's rate limit headers
+    evenly; every shard gets the settings of its subreddits.
+    """
+
+    n_shards = max(1, min(processes, len(subreddits)))
+    owners = [i % len(credentials) for i in range(n_shards)]
+    sharing = Counter(owners)
+
+    shards = []
+    for i, owner in enumerate(owners):
+        budget = max(1, requests_per_window // sharing[owner])
+        shards.append(
+            {
+                "credential_set": owner + 1,
+                "requests_per_window": budget,
+                "settings": [
+                    context.subreddit_settings(
+                        subreddit, credentials[owner], budget, ratelimit_share=1 / sharing[owner]
+                    )
+                    for subreddit in subreddits[i::n_shards]
+                ],
+            }
+        )
+    return shards
+
+
+def _run_shard(job: str, shard: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Worker process entry point: loads the posts or comments (`job`) of each subreddit of the
+    shard one after another with the shard's credentials and budget. Returns rows per subreddit.
+    """
+
+    written = {}
+    try:
+        for settings in shard["settings"]:
+            subreddit = settings["subreddit_name"]
+            if job == "posts":
+                written[subreddit] = etl_posts(reddit_settings=settings, stage=f"etl_posts:{subreddit}")
+            else:
+                written[subreddit] = etl_comments(
+                    reddit_settings=settings,
+                    stage=f"etl_comments:{subreddit}",
+                    only_subreddit=True,
+                )
+    finally:
+        context.close()
+    return written
+
+
+def run_sharded(job: str) -> Dict[str, int]:
+    """
+    Runs `job` ("posts" or "comments") for every subreddit of `PostAPIConfigs.subreddit_names`
+    on a pool of worker processes (see `plan_shards`); all shards write into the same tables.
+    A failing shard does not stop the others; the run raises once they have all finished.
+    """
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    shards = plan_shards(
+        subreddits=list(PostAPIConfigs.subreddit_names),
+        credentials=context.reddit_credentials,
+        processes=PostAPIConfigs.shard_processes,
+        requests_per_window=PostAPIConfigs.requests_per_window,
+    )
+    print(
+        f"Running sharded {job} etl: {len(PostAPIConfigs.subreddit_names)} subreddits "
+        f"on {len(shards)} processes, {len(context.reddit_credentials)} credential sets..."
+    )
+
+    written, failed = {}, []
+    # spawn: workers build their own connections and PRAW sessions instead of forking ours
+    with ProcessPoolExecutor(
+        max_workers=len(shards), mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = {executor.submit(_run_shard, job, shard): shard for shard in shards}
+        for future in as_completed(futures):
+            shard = futures[future]
+            subreddits = [settings["subreddit_name"] for settings in shard["settings"]]
+            try:
+                written.update(future.result())
+            except Exception as e:
+                print(f"{run_sharded.__name__} - [ERROR] shard {subreddits} failed: {e}")
+                failed.extend(subreddits)
+
+    for subreddit, rows in sorted(written.items()):
+        print(f"r/{subreddit}: {rows} {job} written.")
+    # workers keep their own metrics; the stage still reports the rows its shards wrote
+    metrics.incr("db.rows_written", sum(written.values()))
+    if failed:
+        raise RuntimeError(f"sharded {job} etl failed for {sorted(failed)}")
+    return written
+
+
+def etl_posts_sharded() -> None:
+    run_sharded("posts")
+
+
+def etl_comments_sharded() -> None:
+    run_sharded("comments")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded multi-subreddit Reddit extraction.")
+    parser.add_argument(
+        "--subreddits", nargs="+", help="default: PostAPIConfigs.subreddit_names"
+    )
+    parser.add_argument("--processes", type=int, default=PostAPIConfigs.shard_processes)
+    parser.add_argument("--jobs", nargs="+", default=["posts", "comments"], choices=["posts", "comments"])
+    args = parser.parse_args()
+
+    PostAPIConfigs.subreddit_names = args.subreddits or PostAPIConfigs.subreddit_names
+    PostAPIConfigs.shard_processes = args.processes
+    if not PostAPIConfigs.subreddit_names:
+        parser.error("no subreddits: pass --subreddits or set PostAPIConfigs.subreddit_names")
+    try:
+        for job in args.jobs:
+            run_sharded(job)
+    finally:
+        context.close()
@@ -0,0 +1,69 @@
+from typing import Dict, Iterable, List, Optional
+from api.configs import AnalyticsConfigs
+from etl.context import context
+
+
+def rollup_keys(source_table: str, ids: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    The rollup keys the rows `ids` of `source_table` count towards now; taken before a write
+    and passed to `update_rollups`, so rows the write moves to another key (author, day) also
+    leave their old rollup rows. Empty when rollups are off or the lookup fails.
+    """
+
+    ids = list(ids)
+    if not AnalyticsConfigs.rollups_enabled or not ids:
+        return {}
+    try:
+        from analytics.rollups import RollupManager
+
+        return RollupManager(loader=context.loader).touched_keys(source_table, ids)
+
+    except Exception as e:
+        print(f"{rollup_keys.__name__} - [ERROR] An error occurred {e}")
+        return {}
+
+
+def update_rollups(
+    source_table: str,
+    ids: Iterable[str],
+    previous_keys: Optional[Dict[str, List[str]]] = None,
+) -> None:
+    """
+    Refreshes the analytics rollups fed by `source_table` for the rows `ids` just written, and
+    for the `previous_keys` (see `rollup_keys`) they had before.
+    Failures are reported, not raised: the rows are written either way, and keys that could not
+    be refreshed are retried by the next update (or `rebuild_rollups`).
+    """
+
+    ids = list(ids)
+    if not AnalyticsConfigs.rollups_enabled or not ids:
+        return
+    try:
+        # pandas/psycopg2 load on first run, not on import
+        from analytics.rollups import RollupManager
+
+        refreshed = RollupManager(loader=context.loader).update(source_table, ids, previous_keys)
+        print(f"Rollups refreshed (keys per table): {refreshed}")
+
+    except Exception as e:
+        print(f"{update_rollups.__name__} - [ERROR] An error occurred {e}")
+
+
+def rebuild_rollups() -> None:
+    print("Rebuilding analytics rollups...")
+    try:
+        from analytics.rollups import RollupManager
+
+        rebuilt = RollupManager(loader=context.loader).rebuild()
+        print(f"Rollups rebuilt (keys per table): {rebuilt}")
+
+    except Exception as e:
+        print(f"{rebuild_rollups.__name__} - [ERROR] An error occurred {e}")
+        raise
+
+
+if __name__ == "__main__":
+    try:
+        rebuild_rollups()
+    finally:
+        context.close()
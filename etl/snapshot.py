@@ -0,0 +1,68 @@
+import argparse
+from typing import List, Optional
+from api.configs import SnapshotConfigs
+from etl.context import context
+
+
+def export_snapshot(
+    tables: Optional[List[str]] = None,
+    since: Optional[str] = None,
+    root: Optional[str] = None,
+    file_format: Optional[str] = None,
+) -> None:
+    print("Exporting snapshot...")
+    try:
+        # pyarrow/pandas/psycopg2 load on first run, not on import
+        from dataloader.snapshots import SnapshotExporter
+
+        exporter = SnapshotExporter(loader=context.loader, root=root, file_format=file_format)
+        exported = exporter.export(tables=tables, since=since)
+        print(f"Snapshot written to {exporter.root} (rows per table): {exported}")
+
+    except Exception as e:
+        print(f"{export_snapshot.__name__} - [ERROR] An error occurred {e}")
+        raise
+
+
+def import_snapshot(
+    tables: Optional[List[str]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    root: Optional[str] = None,
+) -> None:
+    print("Importing snapshot...")
+    try:
+        from dataloader.snapshots import SnapshotExporter
+
+        exporter = SnapshotExporter(loader=context.loader, root=root)
+        for table in tables or SnapshotConfigs.tables:
+            rows = exporter.import_table(table, start=start, end=end)
+            print(f"{rows} {table} rows imported from {exporter.root}.")
+
+    except Exception as e:
+        print(f"{import_snapshot.__name__} - [ERROR] An error occurred {e}")
+        raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Date-partitioned Parquet/Arrow snapshots of the pipeline tables."
+    )
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("--tables", nargs="+", help=f"default: {SnapshotConfigs.tables}")
+    parser.add_argument("--root", help=f"snapshot directory (default: {SnapshotConfigs.root_dir})")
+    parser.add_argument(
+        "--since", help="export: only re-export the UTC days from this date (YYYY-MM-DD) on"
+    )
+    parser.add_argument("--start", help="import: first UTC day to import (YYYY-MM-DD)")
+    parser.add_argument("--end", help="import: last UTC day to import (YYYY-MM-DD)")
+    parser.add_argument("--format", choices=["parquet", "arrow"], help="export file format")
+    args = parser.parse_args()
+
+    try:
+        if args.action == "export":
+            export_snapshot(args.tables, args.since, args.root, args.format)
+        else:
+            import_snapshot(args.tables, args.start, args.end, args.root)
+    finally:
+        context.close()
@@ -0,0 +1,23 @@
+from etl.context import context
+
+
+def maintain_vector_index():
+    print("Running vector index maintenance...")
+    try:
+        # pandas/psycopg2 load on first run, not on import
+        from search.index_manager import VectorIndexManager
+
+        manager = VectorIndexManager(loader=context.loader)
+        action = manager.maintain()
+        print(f"Vector index maintenance done: {action}.")
+
+    except Exception as e:
+        print(f"{maintain_vector_index.__name__} - [ERROR] An error occurred {e}")
+        raise
+
+
+if __name__ == "__main__":
+    try:
+        maintain_vector_index()
+    finally:
+        context.close()
@@ -1,7 +1,10 @@
 import praw
-from typing import List, Dict, Tuple, Any
+from typing import List, Dict, Tuple, Any, Iterator, Optional
 from datetime import datetime
 from praw.models import Subreddit
+from api.configs import PostAPIConfigs
+from extractors.rate_limiter import RateLimiter, RateLimitedRequestor
+from utils.metrics import metrics
 
 
 class PostExtractor:
@@ -13,6 +16,9 @@ class PostExtractor:
         timeout: int,
         user_agent: str,
         post_limit: int,
+        requests_per_window: Optional[int] = None,
+        ratelimit_seconds: Optional[float] = None,
+        ratelimit_share: float = 1.0,
     ) -> None:
         self.subreddit_name = subreddit_name
         self.client_id = client_id
@@ -21,6 +27,15 @@ class PostExtractor:
         self.user_agent = user_agent
         self.post_limit = post_limit
 
+        # the request budget of these credentials (sharded runs pass their share of it)
+        self.rate_limiter = RateLimiter.shared(
+            client_id=client_id,
+            max_requests=requests_per_window or PostAPIConfigs.requests_per_window,
+            period_seconds=ratelimit_seconds or PostAPIConfigs.ratelimit_seconds,
+            share=ratelimit_share,
+            adaptive=PostAPIConfigs.adaptive_ratelimit,
+        )
+
     def _create_subreddit(self) -> Subreddit:
         """Creates and returns a PRAW Subreddit instance for the specified subreddit."""
 
@@ -29,6 +44,8 @@ class PostExtractor:
             client_secret=self.secret,
             user_agent=self.user_agent,
             timeout=self.timeout,
+            requestor_class=RateLimitedRequestor,
+            requestor_kwargs={"rate_limiter": self.rate_limiter},
         ).subreddit(self.subreddit_name)
 
     def __repr__(self) -> str:
@@ -42,6 +59,56 @@ class PostExtractor:
             f"post_limit={self.post_limit})"
         )
 
+    @staticmethod
+    def _to_row(submission: Any) -> Tuple[Any, ...]:
+        """Transforms a PRAW submission into a `posts` row-tuple."""
+
+        return (
+            submission.id,
+            submission.title,
+            str(submission.author) if submission.author else "unknown",
+            submission.link_flair_text or "",
+            submission.selftext or "",
+            str(submission.subreddit),
+            submission.score or 0,
+            submission.num_comments or 0,
+            datetime.utcfromtimestamp(submission.created_utc).strftime(
+                "%Y-%m-%d_%H:%M:%S"
+            )
+            if submission.created_utc
+            else None,
+        )
+
+    @metrics.timed("reddit.post_chunk")
+    def iter_post_chunks(self, chunk_size: int) -> Iterator[List[Tuple[Any]]]:
+        """
+        Streams post data from the specified subreddit in chunks of `chunk_size` rows while PRAW
+        pages through the newest posts, so memory stays flat regardless of `post_limit` and every
+        chunk can be loaded as soon as it is complete. Rows have the same layout as `fetch_post_data`.
+        """
+
+        try:
+            subreddit = self._create_subreddit()
+        except Exception as e:
+            print(f" [ERROR] Failed to create subreddit instance: {e}")
+            raise
+
+        chunk = []
+        for submission in subreddit.new(limit=self.post_limit):
+            try:
+                chunk.append(self._to_row(submission))
+            except Exception as e:
+                print(
+                    f" [ERROR] processing post {getattr(submission, 'id', 'unknown')}: {e}"
+                )
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+
+        if chunk:
+            yield chunk
+
+    @metrics.timed("reddit.fetch_post_data")
     def fetch_post_data(self) -> List[Tuple[Any]]:
         """
         Fetches post data from the specified subreddit.
@@ -62,34 +129,7 @@ class PostExtractor:
         """
 
         post_data = []
-        try:
-            subreddit = self._create_subreddit()
-        except Exception as e:
-            print(f" [ERROR] Failed to create subreddit instance: {e}")
-            raise
-
-        for submission in subreddit.new(limit=self.post_limit):
-            try:
-                post_data.append(
-                    (
-                        submission.id,
-                        submission.title,
-                        str(submission.author) if submission.author else "unknown",
-                        submission.link_flair_text or "",
-                        submission.selftext or "",
-                        str(submission.subreddit),
-                        submission.score or 0,
-                        submission.num_comments or 0,
-                        datetime.utcfromtimestamp(submission.created_utc).strftime(
-                            "%Y-%m-%d_%H:%M:%S"
-                        )
-                        if submission.created_utc
-                        else None,
-                    )
-                )
-            except Exception as e:
-                print(
-                    f" [ERROR] processing post {getattr(submission, 'id', 'unknown')}: {e}"
-                )
+        for chunk in self.iter_post_chunks(chunk_size=100):
+            post_data.extend(chunk)
 
         return post_data
@@ -1,12 +1,24 @@
+import contextvars
+import heapq
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from api.configs import PipelineConfigs, PostAPIConfigs, SchemaConfigs
+from dataloader.checkpoints import CheckpointStore
 from dataloader.load_data import DataLoader
 from datetime import datetime
+from extractors.rate_limiter import RateLimiter, RateLimitedRequestor
 from praw.models.reddit.submission import Submission
 from praw.models.reddit.comment import Comment
+from praw.models.reddit.more import MoreComments
 from praw import Reddit
-from typing import Tuple, List, Any
+from typing import Tuple, List, Any, Dict, Optional
+from utils.metrics import metrics
 
 
 class CommentExtractor:
+    STAGE = "etl_comments"
+
     def __init__(
         self,
         subreddit_name: str,
@@ -15,6 +27,17 @@ class CommentExtractor:
         timeout: int,
         user_agent: str,
         post_limit: int,
+        max_workers: int = 1,
+        incremental: bool = False,
+        hot_window_hours: int = 24,
+        more_comments_limit: Optional[int] = None,
+        more_comments_threshold: int = 0,
+        max_depth: Optional[int] = None,
+        requests_per_window: Optional[int] = None,
+        ratelimit_seconds: Optional[float] = None,
+        ratelimit_share: float = 1.0,
+        stage: Optional[str] = None,
+        only_subreddit: bool = False,
     ) -> None:
         self.subreddit_name = subreddit_name
         self.client_id = client_id
@@ -22,6 +45,31 @@ class CommentExtractor:
         self.timeout = timeout
         self.user_agent = user_agent
         self.post_limit = post_limit
+        self.max_workers = max_workers
+        self.incremental = incremental
+        self.hot_window_hours = hot_window_hours
+        self.more_comments_limit = more_comments_limit
+        self.more_comments_threshold = more_comments_threshold
+        self.max_depth = max_depth
+        # sharded runs crawl one subreddit's posts per extractor, with their own checkpoints
+        self.stage = stage or self.STAGE
+        self.only_subreddit = only_subreddit
+
+        # post_id -> num_comments / created_utc seen in `posts` when the crawl was planned, and
+        # the (post_id, num_comments, crawled_at) watermarks of posts crawled successfully
+        self._planned_num_comments = {}
+        self._planned_created_utc = {}
+        self.crawled_posts: List[Tuple[str, int, str]] = []
+
+        # one request budget for every worker using these credentials
+        self.rate_limiter = RateLimiter.shared(
+            client_id=client_id,
+            max_requests=requests_per_window or PostAPIConfigs.requests_per_window,
+            period_seconds=ratelimit_seconds or PostAPIConfigs.ratelimit_seconds,
+            share=ratelimit_share,
+            adaptive=PostAPIConfigs.adaptive_ratelimit,
+        )
+        self._local = threading.local()
 
     def _create_reddit(self) -> Reddit:
         """Creates and returns a PRAW reddit instance for the specified subreddit."""
@@ -31,13 +79,75 @@ class CommentExtractor:
             client_secret=self.secret,
             user_agent=self.user_agent,
             timeout=self.timeout,
+            requestor_class=RateLimitedRequestor,
+            requestor_kwargs={"rate_limiter": self.rate_limiter},
         )
 
+    def _thread_reddit(self) -> Reddit:
+        """Returns the calling thread's PRAW instance; PRAW objects are not thread-safe."""
+
+        if getattr(self._local, "reddit", None) is None:
+            self._local.reddit = self._create_reddit()
+        return self._local.reddit
+
+    def _comment_tree(self, submission: Submission) -> Dict[str, List[Comment]]:
+        """
+        Maps every parent fullname (submission or comment) to its loaded reply comments, after
+        expanding "load more comments" stubs within the budget. Like PRAW's `replace_more`, the
+        stubs hiding the most comments are expanded first (one request each), but at most
+        `more_comments_limit` of them, only those hiding at least `more_comments_threshold`
+        comments and none nested at or below `max_depth`. Stubs left over are dropped.
+        """
+
+        children: Dict[str, List[Comment]] = {}
+        depths = {submission.fullname: -1}
+        seq = itertools.count()
+        # max-heap of stubs on the hidden comment count; seq keeps the order stable on ties
+        stubs: List[Tuple[int, int, int, MoreComments]] = []
+
+        def attach(items: List[Any], parent_depth: int) -> None:
+            stack = [(item, None) for item in reversed(items)]
+            while stack:
+                item, parent = stack.pop()
+                parent_id = parent or item.parent_id
+                depth = depths.get(parent_id, parent_depth) + 1
+                if self.max_depth is not None and depth >= self.max_depth:
+                    continue
+                if isinstance(item, MoreComments):
+                    item.submission = submission
+                    heapq.heappush(stubs, (-item.count, next(seq), depth, item))
+                    continue
+                if item.name in depths:
+                    continue  # already loaded through another stub
+                depths[item.name] = depth
+                children.setdefault(parent_id, []).append(item)
+                stack.extend((reply, item.name) for reply in reversed(item.replies))
+
+        attach(list(submission.comments), parent_depth=-1)
+
+        remaining = self.more_comments_limit
+        skipped = 0
+        while stubs:
+            count, _, depth, stub = heapq.heappop(stubs)
+            if remaining is not None and remaining <= 0 or -count < self.more_comments_threshold:
+                skipped += 1
+                continue
+            if remaining is not None:
+                remaining -= 1
+            attach(list(stub.comments(update=False)), parent_depth=depth - 1)
+
+        if skipped:
+            metrics.incr("reddit.more_comments_skipped", skipped)
+        return children
+
+    @metrics.timed("reddit.process_comments")
     def _process_comments(
         self, post_id: str, submission: Submission
     ) -> List[Tuple[Any]]:
         """
-        Processes all comments in a Reddit submission, traversing the comment tree recursively.
+        Processes the comments of a Reddit submission within a bounded budget: collapsed branches
+        are expanded biggest first (see `_comment_tree`) and the tree is walked with an explicit
+        stack, so huge or deeply nested threads cost bounded requests, time and memory.
         Args:
             post_id (str): The ID of the Reddit post (submission) to which the comments belong.
             submission (Submission): The PRAW Submission object representing the Reddit post.
@@ -53,17 +163,23 @@ class CommentExtractor:
                     comment.created_utc (str, formatted as "%Y-%m-%d_%H:%M:%S")
                 )
         """
-        submission.comments.replace_more(limit=None)
+        children = self._comment_tree(submission)
         all_comments = []
         failed_comments = []
 
-        def walk_comments(comment: Comment, parent_id=None):
+        # (comment, parent id); children are pushed reversed to keep pre-order
+        stack = [
+            (comment, submission.id)
+            for comment in reversed(children.get(submission.fullname, []))
+        ]
+        while stack:
+            comment, parent_id = stack.pop()
             try:
                 all_comments.append(
                     (
                         comment.id,
                         post_id,
-                        parent_id or submission.id,
+                        parent_id,
                         comment.body,
                         str(comment.author) if comment.author else "deleted",
                         comment.score,
@@ -76,19 +192,104 @@ class CommentExtractor:
                 print(f"[ERROR] processing comment {comment.id}: {e}")
                 failed_comments.append(comment.id)
 
-            for reply in comment.replies:
-                walk_comments(reply, parent_id=comment.id)
-
-        for top_level_comment in submission.comments:
-            walk_comments(top_level_comment)
+            stack.extend(
+                (reply, comment.id) for reply in reversed(children.get(comment.name, []))
+            )
 
         if failed_comments:
+            metrics.incr("reddit.comments_failed", len(failed_comments))
             print(
                 f"[WARNING] Skipped {len(failed_comments)} comments under post {post_id}: {failed_comments}"
             )
 
         return all_comments
 
+    def _find_post_ids(self, loader: DataLoader) -> List[str]:
+        """
+        Returns the ids of the `n` posts whose comments should be crawled.
+        In incremental mode only posts that were never crawled, whose `num_comments` moved
+        since their last crawl, or that are still inside the hot window are selected.
+        With `only_subreddit` the posts of other subreddits are left to their own extractors.
+        """
+
+        subreddit_filter = ""
+        if self.only_subreddit:
+            subreddit_filter = "lower(p.subreddit) = lower(%(subreddit)s) and"
+
+        if self.incremental:
+            q = f"""
+            select p.id, p.num_comments, p.created_utc
+            from posts p
+            left join comment_crawl_state s on s.post_id = p.id
+            where {subreddit_filter} (
+                s.post_id is null
+                or s.num_comments is distinct from p.num_comments
+                or p.created_utc >= now() - interval '{int(self.hot_window_hours)} hours'
+                or exists (
+                    select 1 from pipeline_pending q
+                    where q.stage = %(stage)s
+                        and q.item_id = p.id
+                        and q.attempts < {PipelineConfigs.max_pending_attempts}
+                )
+            )
+            order by p.created_utc desc
+            limit {self.post_limit}
+            """
+        else:
+            q = f"""select id, num_comments, created_utc from posts p where {subreddit_filter} true order by created_utc asc limit {self.post_limit}"""
+
+        df = loader.query_table(q, params={"stage": self.stage, "subreddit": self.subreddit_name})
+        self._planned_num_comments = dict(zip(df["id"], df["num_comments"]))
+        dated = df.dropna(subset=["created_utc"])
+        self._planned_created_utc = dict(zip(dated["id"], dated["created_utc"]))
+        self.crawled_posts = []
+        return df["id"].to_list()
+
+    def _mark_crawled(self, post_id: str) -> None:
+        """Records the crawl watermark of a post whose comment tree was fetched successfully."""
+
+        num_comments = self._planned_num_comments.get(post_id)
+        self.crawled_posts.append(
+            (
+                post_id,
+                int(num_comments) if num_comments is not None else None,
+                datetime.utcnow().strftime("%Y-%m-%d_%H:%M:%S"),
+            )
+        )
+
+    def update_crawl_state(self, loader: DataLoader) -> None:
+        """
+        Upserts the watermarks of the posts crawled by the last `fetch_comment_data` call and
+        checkpoints the stage: posts whose comments could not be fetched are queued as pending.
+        """
+
+        if self.crawled_posts:
+            loader.write_data(
+                table_name="comment_crawl_state",
+                data_rows=self.crawled_posts,
+                column_names=SchemaConfigs.table_mapping["comment_crawl_state"],
+                write_method="upsert",
+                upsert_on=["post_id"],
+            )
+
+        crawled = [post_id for post_id, _, _ in self.crawled_posts]
+        failed = set(self._planned_num_comments) - set(crawled)
+        checkpoints = CheckpointStore(loader)
+        checkpoints.clear_pending(self.stage, crawled)
+        checkpoints.add_pending(self.stage, sorted(failed), error="comments not fetched")
+        checkpoints.advance(
+            self.stage,
+            watermark=max(
+                (
+                    self._planned_created_utc[post_id]
+                    for post_id in crawled
+                    if post_id in self._planned_created_utc
+                ),
+                default=None,
+            ),
+            rows_processed=len(crawled),
+        )
+
     def _create_submissions(self, loader: DataLoader) -> List[Tuple[str, Submission]]:
         """
         Fetches the most recent `n` Reddit submissions from the database and returns them as a list of tuples.
@@ -97,9 +298,7 @@ class CommentExtractor:
 
         # get the most recent n posts
         reddit = self._create_reddit()
-        q = f"""select id from posts order by created_utc asc limit {self.post_limit}"""
-        df = loader.query_table(q)
-        post_ids = df["id"].to_list()
+        post_ids = self._find_post_ids(loader=loader)
         for post_id in post_ids:
             try:
                 submission = reddit.submission(id=post_id)
@@ -109,12 +308,60 @@ class CommentExtractor:
 
         return submissions
 
+    def _fetch_post_comments(self, post_id: str) -> List[Tuple[Any]]:
+        """Fetches and processes the comment tree of one post on the calling worker thread."""
+
+        submission = self._thread_reddit().submission(id=post_id)
+        return self._process_comments(post_id, submission)
+
+    def _fetch_comment_data_parallel(self, loader: DataLoader) -> List[Tuple[Any]]:
+        """
+        Fetches comment trees with a bounded pool of worker threads sharing one rate limit
+        budget. Results keep the order of the posts; a failing post is logged and skipped.
+        """
+
+        post_ids = self._find_post_ids(loader=loader)
+        results = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                # copy_context: workers record metrics under the calling stage
+                executor.submit(
+                    contextvars.copy_context().run, self._fetch_post_comments, post_id
+                ): post_id
+                for post_id in post_ids
+            }
+            for future in as_completed(futures):
+                post_id = futures[future]
+                try:
+                    results[post_id] = future.result()
+                    self._mark_crawled(post_id)
+                except Exception as e:
+                    print(f"[ERROR] fetching comments for post {post_id}: {e}")
+
+        comment_data_tuples = []
+        for post_id in post_ids:
+            comment_data_tuples.extend(results.get(post_id, []))
+
+        return comment_data_tuples
+
     def fetch_comment_data(self, loader: DataLoader) -> List[Tuple[Any]]:
-        """Fetches and processes comment data for a set of Reddit submissions."""
+        """
+        Fetches and processes comment data for a set of Reddit submissions. In serial and
+        parallel mode alike a failing post is logged and skipped; `update_crawl_state` then
+        queues it as pending, so the next run retries it.
+        """
+
+        if self.max_workers > 1:
+            return self._fetch_comment_data_parallel(loader=loader)
 
         comment_data_tuples = []
         submissions = self._create_submissions(loader=loader)
         for post_id, submission in submissions:
-            comment_data_tuples.extend(self._process_comments(post_id, submission))
+            try:
+                comment_data_tuples.extend(self._process_comments(post_id, submission))
+                self._mark_crawled(post_id)
+            except Exception as e:
+                print(f"[ERROR] fetching comments for post {post_id}: {e}")
 
         return comment_data_tuples
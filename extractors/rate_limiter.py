@@ -0,0 +1,193 @@
+import time
+import threading
+from typing import Any, Dict, Mapping, Optional, Tuple
+from prawcore import Requestor
+from utils.metrics import metrics
+
+_shared: Dict[Tuple[str, int, float, float, bool], "RateLimiter"] = {}
+_shared_lock = threading.Lock()
+
+
+class RateLimiter:
+    """
+    Request pacing shared by every thread that talks to Reddit with the same credentials.
+
+    Once a response carried Reddit's `x-ratelimit-remaining/used/reset` headers, the requests
+    left in the current window are spread evenly over the seconds left until its reset (our
+    `share` of them when several processes use the same app), aiming to use the quota
+    without overrunning it. Concurrent callers reserve consecutive slots. Until the first
+    headers arrive, or after their window passed without news, a token bucket allowing bursts
+    of `max_requests` and refilling at max_requests / period_seconds applies instead; with
+    `adaptive=False` it always does.
+    """
+
+    def __init__(
+        self, max_requests: int, period_seconds: float, share: float = 1.0, adaptive: bool = True
+    ) -> None:
+        self.max_requests = max_requests
+        self.period_seconds = period_seconds
+        self.share = share
+        self.adaptive = adaptive
+        self._rate = max_requests / period_seconds
+        self._tokens = float(max_requests)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        # last reported window: requests left / made and when it resets (monotonic seconds)
+        self.remaining: Optional[float] = None
+        self.used: Optional[int] = None
+        self._reset_at: Optional[float] = None
+        self._next_slot = 0.0
+        self.requests = 0
+        self.throttled = 0
+        self.waited_seconds = 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}("
+            f"max_requests={self.max_requests}, "
+            f"period_seconds={self.period_seconds}, "
+            f"share={self.share}, "
+            f"adaptive={self.adaptive})"
+        )
+
+    @classmethod
+    def shared(
+        cls,
+        client_id: str,
+        max_requests: int,
+        period_seconds: float,
+        share: float = 1.0,
+        adaptive: bool = True,
+    ) -> "RateLimiter":
+        """
+        The process-wide limiter of one Reddit app: every extractor created with the same
+        credentials (posts and comments, one subreddit after another) draws from one budget.
+        """
+
+        key = (client_id, max_requests, period_seconds, share, adaptive)
+        with _shared_lock:
+            if key not in _shared:
+                _shared[key] = cls(
+                    max_requests=max_requests,
+                    period_seconds=period_seconds,
+                    share=share,
+                    adaptive=adaptive,
+                )
+            return _shared[key]
+
+    def _paced_wait(self, now: float) -> Tuple[Optional[float], bool]:
+        """
+        (seconds to wait, whether a slot was reserved) under header pacing; (None, False) when
+        no current window is known.
+        """
+
+        if self._reset_at is None or now >= self._reset_at:
+            self._reset_at = None
+            return None, False
+        seconds_left = self._reset_at - now
+        budget = self.remaining * self.share
+        if budget < 1:
+            # window spent: wait for the reset, then start over from the token bucket
+            return seconds_left, False
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + seconds_left / budget
+        self.remaining -= 1  # in flight; the response's headers correct it
+        return slot - now, True
+
+    def _bucket_wait(self, now: float) -> Tuple[float, bool]:
+        """(seconds until the token bucket has a token, whether one was taken)."""
+
+        self._tokens = min(self.max_requests, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0, True
+        return (1 - self._tokens) / self._rate, False
+
+    def acquire(self) -> None:
+        """Blocks until a request may be sent and consumes its slot."""
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait, reserved = self._paced_wait(now)
+                if wait is None:
+                    wait, reserved = self._bucket_wait(now)
+                self.requests += reserved
+                self.waited_seconds += wait
+            if wait > 0:
+                metrics.incr("reddit.rate_limit_wait_seconds", wait)
+                time.sleep(wait)
+            if reserved:
+                return
+
+    def update(self, headers: Mapping[str, str], status_code: Optional[int] = None) -> None:
+        """Takes in the rate limit headers of a Reddit response (ignored when absent)."""
+
+        if status_code == 429:
+            self.throttled += 1
+            metrics.incr("reddit.rate_limit_throttled")
+        if not self.adaptive or "x-ratelimit-remaining" not in headers:
+            return
+        try:
+            remaining = float(headers["x-ratelimit-remaining"])
+            used = int(float(headers.get("x-ratelimit-used", 0)))
+            reset_seconds = float(headers["x-ratelimit-reset"])
+        except (KeyError, ValueError):
+            return
+        with self._lock:
+            now = time.monotonic()
+            reset_at = now + reset_seconds
+            # within the same window (reset is reported in whole seconds) keep the lower count:
+            # ours also covers requests still in flight, and responses arrive out of order
+            same_window = self._reset_at is not None and abs(reset_at - self._reset_at) < 2.0
+            if same_window and self.remaining is not None:
+                remaining = min(remaining, self.remaining)
+            self.remaining, self.used, self._reset_at = remaining, used, reset_at
+
+    def state(self) -> Dict[str, Any]:
+        """Snapshot for logs and metrics: pacing mode, last window seen and totals."""
+
+        with self._lock:
+            now = time.monotonic()
+            paced = self._reset_at is not None and now < self._reset_at
+            return {
+                "mode": "headers" if paced else "bucket",
+                "remaining": self.remaining,
+                "used": self.used,
+                "reset_in_seconds": round(self._reset_at - now, 1) if paced else None,
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "waited_seconds": round(self.waited_seconds, 2),
+            }
+
+
+class RateLimitedRequestor(Requestor):
+    """prawcore requestor that waits for a slot of a shared RateLimiter before every HTTP call
+    and feeds the rate limit headers of every response back into it.
+
+    Plugged into PRAW through `Reddit(requestor_class=..., requestor_kwargs={"rate_limiter": ...})`.
+    prawcore's own per-session rate limiter still runs in front of this requestor and sleeps on
+    the same headers: only until a request is no longer ahead of an even spread of the window,
+    or until the reset once the window is spent. Our pacing never runs ahead and waits for that
+    same reset, so its sleep is expected to be a no-op under ours (`bench_rate_limiter --check`
+    asserts the throughput against the quota).
+    """
+
+    def __init__(self, *args: Any, rate_limiter: RateLimiter, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.rate_limiter = rate_limiter
+
+    THROTTLE_RETRIES = 3  # resends of a request Reddit answered with 429
+
+    def request(self, *args: Any, **kwargs: Any) -> Any:
+        for attempt in range(self.THROTTLE_RETRIES + 1):
+            self.rate_limiter.acquire()
+            with metrics.timer("reddit.request"):
+                response = super().request(*args, **kwargs)
+            self.rate_limiter.update(response.headers, response.status_code)
+            # a 429 reports the window as spent, so the next acquire waits for its reset
+            if response.status_code != 429:
+                break
+        return response
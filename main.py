@@ -1,11 +1,80 @@
+import argparse
+import time
+import uuid
+from api.configs import PipelineConfigs, PostAPIConfigs, SchemaConfigs
 from etl.ai_analysis import analyze_posts
 from etl.extract_load_posts import etl_posts
 from etl.extract_load_comments import etl_comments
+from etl.extract_load_sharded import etl_comments_sharded, etl_posts_sharded
+from etl.vector_index import maintain_vector_index
+from etl.context import context
+from pipeline.runner import PipelineError, PipelineRunner, Stage
+from utils.metrics import metrics
+
+# with several subreddits the Reddit stages fan out over worker processes (etl.extract_load_sharded)
+SHARDED = bool(PostAPIConfigs.subreddit_names)
+# analysis (OpenAI-bound) and the comment crawl (Reddit-bound) only need the posts loaded
+STAGES = [
+    Stage("etl_posts", etl_posts_sharded if SHARDED else etl_posts),
+    Stage("analyze_posts", analyze_posts, depends_on=["etl_posts"]),
+    Stage("etl_comments", etl_comments_sharded if SHARDED else etl_comments, depends_on=["etl_posts"]),
+    Stage("vector_index", maintain_vector_index, depends_on=["analyze_posts"]),
+]
+
+def save_metrics(run_id: str, run_started: float, results: dict, json_path: str = None) -> None:
+    """Writes one run_metrics row per stage (and the optional JSON export); never fails the run."""
+
+    try:
+        context.loader.write_data(
+            table_name="run_metrics",
+            data_rows=metrics.stage_rows(run_id, run_started, results),
+            column_names=SchemaConfigs.table_mapping["run_metrics"],
+            write_method="upsert",
+            upsert_on=["run_id", "stage"],
+        )
+        if json_path:
+            metrics.export_json(json_path, run_id, results)
+    except Exception as e:
+        print(f"{save_metrics.__name__} [ERROR] - saving metrics of run {run_id} failed: {e}")
 
 def main():
-    etl_posts()
-    analyze_posts()
-    etl_comments()
+    parser = argparse.ArgumentParser(description="Reddit ETL and AI analysis pipeline.")
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        metavar="STAGE",
+        help=f"run only these stages (default: all of {[stage.name for stage in STAGES]})",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="print the execution plan without running it"
+    )
+    parser.add_argument(
+        "--metrics-json",
+        default=PipelineConfigs.metrics_json_path,
+        help="also write the run's per-stage metrics to this JSON file",
+    )
+    args = parser.parse_args()
+
+    runner = PipelineRunner(STAGES)
+    if args.stages:
+        runner = runner.select(args.stages)
+    if args.dry_run:
+        print(runner.plan())
+        return
+
+    run_id, run_started = uuid.uuid4().hex, time.time()
+    results = {}
+    try:
+        try:
+            results = runner.run()
+        except PipelineError as e:
+            results = e.results
+            raise
+        finally:
+            if results and metrics.enabled:
+                save_metrics(run_id, run_started, results, args.metrics_json)
+    finally:
+        context.close()
 
 if __name__ == "__main__":
     main()
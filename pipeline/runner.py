@@ -0,0 +1,208 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from api.configs import PipelineConfigs
+from utils.metrics import metrics
+
+
+class Stage:
+    """A named pipeline step and the stages that must succeed before it may start."""
+
+    def __init__(
+        self, name: str, func: Callable[[], None], depends_on: Iterable[str] = ()
+    ) -> None:
+        self.name = name
+        self.func = func
+        self.depends_on = list(depends_on)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(name='{self.name}', depends_on={self.depends_on})"
+
+
+class StageResult:
+    """Outcome of one stage: "ok", "failed" or "skipped" (a dependency did not succeed)."""
+
+    def __init__(
+        self,
+        name: str,
+        status: str,
+        started: float = 0.0,
+        seconds: float = 0.0,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        self.name = name
+        self.status = status
+        self.started = started
+        self.seconds = seconds
+        self.error = error
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(name='{self.name}', status='{self.status}', "
+            f"seconds={self.seconds:.2f})"
+        )
+
+
+class PipelineError(Exception):
+    """Raised by `PipelineRunner.run` when a stage failed; carries every stage's result."""
+
+    def __init__(self, failed: List[str], results: Dict[str, StageResult]) -> None:
+        super().__init__(f"pipeline stages failed: {', '.join(failed)}")
+        self.failed = failed
+        self.results = results
+
+
+class PipelineRunner:
+    """
+    Runs stages as a DAG: every stage starts as soon as all of its dependencies succeeded, so
+    independent stages (e.g. Reddit-bound comments and OpenAI-bound analysis) overlap. A failed
+    stage skips its dependents but lets unrelated branches finish; the run then raises
+    `PipelineError` chained to the first failure.
+    """
+
+    def __init__(self, stages: List[Stage], max_workers: Optional[int] = None) -> None:
+        self.stages = {stage.name: stage for stage in stages}
+        self.max_workers = max_workers or PipelineConfigs.max_parallel_stages
+        if len(self.stages) != len(stages):
+            raise ValueError("stage names must be unique.")
+        self.order = self._topological_order()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(stages={self.order}, max_workers={self.max_workers})"
+
+    def _topological_order(self) -> List[str]:
+        """Stage names with every stage after its dependencies; rejects unknown deps and cycles."""
+
+        for stage in self.stages.values():
+            unknown = [dep for dep in stage.depends_on if dep not in self.stages]
+            if unknown:
+                raise ValueError(f"stage '{stage.name}' depends on unknown stages {unknown}.")
+
+        order, visiting, done = [], set(), set()
+
+        def visit(name: str) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"dependency cycle through stage '{name}'.")
+            visiting.add(name)
+            for dep in self.stages[name].depends_on:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def select(self, names: Iterable[str]) -> "PipelineRunner":
+        """
+        A runner over a subset of the stages. Dependencies outside the subset are assumed to be
+        satisfied already (e.g. re-running only analyze_posts against posts loaded earlier).
+        """
+
+        names = list(names)
+        unknown = [name for name in names if name not in self.stages]
+        if unknown:
+            raise ValueError(f"unknown stages {unknown}; expected some of {self.order}.")
+        return PipelineRunner(
+            [
+                Stage(
+                    name=name,
+                    func=self.stages[name].func,
+                    depends_on=[dep for dep in self.stages[name].depends_on if dep in names],
+                )
+                for name in self.order
+                if name in names
+            ],
+            max_workers=self.max_workers,
+        )
+
+    def plan(self) -> str:
+        """The stages in execution order with their dependencies, for dry runs."""
+
+        return "\n".join(
+            f"{name:<20} after: {', '.join(self.stages[name].depends_on) or '-'}"
+            for name in self.order
+        )
+
+    def _run_stage(self, stage: Stage, t0: float) -> StageResult:
+        started = time.perf_counter()
+        try:
+            with metrics.stage(stage.name):
+                stage.func()
+            status, error = "ok", None
+        except Exception as e:
+            print(f"{self.__class__.__name__}: stage '{stage.name}' failed: {e}")
+            status, error = "failed", e
+        return StageResult(
+            name=stage.name,
+            status=status,
+            started=started - t0,
+            seconds=time.perf_counter() - started,
+            error=error,
+        )
+
+    def run(self) -> Dict[str, StageResult]:
+        """Runs every stage, prints the timing report and returns the results by stage name."""
+
+        results: Dict[str, StageResult] = {}
+        running = {}
+        t0 = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage") as pool:
+            while len(results) < len(self.stages):
+                for name in self.order:
+                    if name in results or name in running.values():
+                        continue
+                    deps = [results.get(dep) for dep in self.stages[name].depends_on]
+                    if any(dep is not None and dep.status != "ok" for dep in deps):
+                        results[name] = StageResult(name=name, status="skipped")
+                    elif all(dep is not None for dep in deps):
+                        running[pool.submit(self._run_stage, self.stages[name], t0)] = name
+                if not running:
+                    continue  # only skips were recorded; re-scan for their dependents
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    result = future.result()
+                    results[result.name] = result
+                    del running[future]
+
+        wall_seconds = time.perf_counter() - t0
+        print(self.report(results, wall_seconds))
+
+        failed = [name for name in self.order if results[name].status == "failed"]
+        if failed:
+            raise PipelineError(failed, results) from results[failed[0]].error
+        return results
+
+    def critical_path(self, results: Dict[str, StageResult]) -> Tuple[List[str], float]:
+        """Chain of dependent stages with the largest summed run time, and that time."""
+
+        best: Dict[str, Tuple[float, List[str]]] = {}
+        for name in self.order:
+            seconds = results[name].seconds if name in results else 0.0
+            before = max(
+                (best[dep] for dep in self.stages[name].depends_on),
+                key=lambda item: item[0],
+                default=(0.0, []),
+            )
+            best[name] = (before[0] + seconds, before[1] + [name])
+        seconds, path = max(best.values(), key=lambda item: item[0], default=(0.0, []))
+        return path, seconds
+
+    def report(self, results: Dict[str, StageResult], wall_seconds: float) -> str:
+        """Per-stage status, start offset and wall-clock time, plus the critical path."""
+
+        lines = [f"{'stage':<20} {'status':<8} {'start s':>8} {'seconds':>8}"]
+        for name in self.order:
+            result = results[name]
+            lines.append(
+                f"{name:<20} {result.status:<8} {result.started:>8.2f} {result.seconds:>8.2f}"
+            )
+        path, path_seconds = self.critical_path(results)
+        total = sum(result.seconds for result in results.values())
+        lines.append(f"wall clock {wall_seconds:.2f}s (sum of stages {total:.2f}s)")
+        lines.append(f"critical path: {' -> '.join(path)} ({path_seconds:.2f}s)")
+        return "\n".join(lines)
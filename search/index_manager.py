@@ -0,0 +1,382 @@
+import json
+import math
+import time
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from api.configs import VectorIndexConfigs
+from dataloader.load_data import DataLoader
+
+# query-time setting of each index method
+QUERY_PARAMS = {"ivfflat": "ivfflat.probes", "hnsw": "hnsw.ef_search"}
+# planner settings forcing an exact (sequential) scan, the ground truth when tuning
+EXACT_SEARCH = {"enable_indexscan": "off"}
+# distance operator behind each operator class
+_DISTANCE_OPERATORS = {
+    "vector_cosine_ops": "<=>",
+    "vector_l2_ops": "<->",
+    "vector_ip_ops": "<#>",
+    "halfvec_cosine_ops": "<=>",
+    "halfvec_l2_ops": "<->",
+    "halfvec_ip_ops": "<#>",
+}
+
+
+class VectorIndexManager:
+    """
+    Lifecycle of the approximate-nearest-neighbour index on a pgvector column. The index is only
+    built once the column has `VectorIndexConfigs.min_rows` vectors, with settings sized to the
+    row count (ivfflat `lists`) or as HNSW past `hnsw_min_rows`, and rebuilt after
+    `rebuild_drift` of the rows were added or changed, since ivfflat centroids are trained on the
+    data present at build time. After every build the query-time probes / ef_search are tuned for
+    `target_recall` against exact search. State lives in `vector_index_state`.
+    """
+
+    def __init__(
+        self,
+        loader: DataLoader,
+        table_name: str = "posts_ai_analysis",
+        column_name: str = "embeddings",
+        id_column: str = "id",
+        opclass: str = "vector_cosine_ops",
+    ) -> None:
+        self.loader = loader
+        self.table_name = table_name
+        self.column_name = column_name
+        self.id_column = id_column
+        self.opclass = opclass
+        self.operator = _DISTANCE_OPERATORS[opclass]
+        self.index_name = f"{table_name}_{column_name}_ann_idx"
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(table='{self.table_name}', "
+            f"column='{self.column_name}', opclass='{self.opclass}')"
+        )
+
+    # -- state ------------------------------------------------------------------------------
+
+    def state(self) -> Optional[Dict[str, Any]]:
+        """The recorded index state of the column, or None before the first build."""
+
+        df = self.loader.query_table(
+            """
+            SELECT * FROM vector_index_state
+            WHERE table_name = %(table)s AND column_name = %(column)s;
+            """,
+            params={"table": self.table_name, "column": self.column_name},
+        )
+        return None if df.empty else df.to_dict("records")[0]
+
+    def _save_state(self, method: str, build_params: Dict[str, int], rows: int) -> None:
+        self.loader.execute(
+            """
+            INSERT INTO vector_index_state (
+                table_name, column_name, index_name, method, build_params,
+                baseline_rows, baseline_utc, built_utc
+            )
+            VALUES (%(table)s, %(column)s, %(index)s, %(method)s, %(params)s, %(rows)s, now(), now())
+            ON CONFLICT (table_name, column_name) DO UPDATE SET
+                index_name = EXCLUDED.index_name,
+                method = EXCLUDED.method,
+                build_params = EXCLUDED.build_params,
+                query_params = NULL,
+                recall = NULL,
+                baseline_rows = EXCLUDED.baseline_rows,
+                baseline_utc = EXCLUDED.baseline_utc,
+                built_utc = EXCLUDED.built_utc,
+                processing_timestamp = now();
+            """,
+            {
+                "table": self.table_name,
+                "column": self.column_name,
+                "index": self.index_name,
+                "method": method,
+                "params": json.dumps(build_params),
+                "rows": rows,
+            },
+        )
+
+    def _save_tuning(self, query_params: Dict[str, int], recall: float, rows: int) -> None:
+        self.loader.execute(
+            """
+            UPDATE vector_index_state SET
+                query_params = %(params)s,
+                recall = %(recall)s,
+                baseline_rows = %(rows)s,
+                baseline_utc = now(),
+                processing_timestamp = now()
+            WHERE table_name = %(table)s AND column_name = %(column)s;
+            """,
+            {
+                "table": self.table_name,
+                "column": self.column_name,
+                "params": json.dumps(query_params),
+                "recall": recall,
+                "rows": rows,
+            },
+        )
+
+    def query_settings(self) -> Dict[str, int]:
+        """Tuned query-time settings, e.g. {"ivfflat.probes": 8}; empty before the first build."""
+
+        state = self.state()
+        return dict(state["query_params"] or {}) if state else {}
+
+    @staticmethod
+    def settings_sql(settings: Dict[str, int]) -> str:
+        """SET LOCAL statements applying `settings` to the current transaction."""
+
+        return "".join(
+            f"SET LOCAL {name} = {value if isinstance(value, str) else int(value)}; "
+            for name, value in settings.items()
+        )
+
+    # -- inspection -------------------------------------------------------------------------
+
+    def existing_indexes(self) -> List[Tuple[str, str]]:
+        """(index name, method) of every ivfflat/hnsw index on the column, managed or not."""
+
+        df = self.loader.query_table(
+            """
+            SELECT i.relname AS index_name, am.amname AS method
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            JOIN pg_am am ON am.oid = i.relam
+            JOIN pg_attribute a ON a.attrelid = x.indrelid AND a.attnum = ANY(x.indkey)
+            WHERE x.indrelid = %(table)s::regclass
+              AND a.attname = %(column)s
+              AND am.amname IN ('ivfflat', 'hnsw');
+            """,
+            params={"table": self.table_name, "column": self.column_name},
+        )
+        return list(df.itertuples(index=False, name=None))
+
+    def row_stats(self, since: Optional[Any] = None) -> Dict[str, int]:
+        """Rows with a vector, and how many of them were written after `since` (all if None)."""
+
+        df = self.loader.query_table(
+            f"""
+            SELECT count(*) AS rows,
+                   count(*) FILTER (
+                       WHERE %(since)s::timestamptz IS NULL OR processing_timestamp > %(since)s
+                   ) AS changed
+            FROM {self.table_name}
+            WHERE {self.column_name} IS NOT NULL;
+            """,
+            params={"since": since},
+        )
+        return {"rows": int(df["rows"][0]), "changed": int(df["changed"][0])}
+
+    @staticmethod
+    def choose_method(rows: int) -> str:
+        if VectorIndexConfigs.method != "auto":
+            return VectorIndexConfigs.method
+        return "hnsw" if rows >= VectorIndexConfigs.hnsw_min_rows else "ivfflat"
+
+    @staticmethod
+    def build_params(method: str, rows: int) -> Dict[str, int]:
+        """pgvector's sizing guidance: lists = rows / 1000 up to 1M rows, sqrt(rows) beyond."""
+
+        if method == "ivfflat":
+            lists = rows // 1000 if rows <= 1_000_000 else int(math.sqrt(rows))
+            return {"lists": max(1, lists)}
+        return {"m": VectorIndexConfigs.hnsw_m, "ef_construction": VectorIndexConfigs.hnsw_ef_construction}
+
+    def plan(self) -> Tuple[str, str]:
+        """
+        What `maintain` would do now and why: "drop" (too few rows for an ANN index), "build"
+        (none managed yet), "rebuild" (method change or ivfflat drift), "retune" (HNSW drift)
+        or "none".
+        """
+
+        state = self.state()
+        stats = self.row_stats(since=state["baseline_utc"] if state else None)
+        existing = [name for name, _ in self.existing_indexes()]
+
+        if stats["rows"] < VectorIndexConfigs.min_rows:
+            if existing:
+                return "drop", f"{stats['rows']} rows, below min_rows; exact scans are cheaper"
+            return "none", f"{stats['rows']} rows, below min_rows"
+
+        method = self.choose_method(stats["rows"])
+        if state is None or state["index_name"] not in existing:
+            return "build", f"no managed index for {stats['rows']} rows"
+        if state["method"] != method:
+            return "rebuild", f"{stats['rows']} rows call for {method} instead of {state['method']}"
+
+        baseline = max(1, int(state["baseline_rows"] or 0))
+        drift = stats["changed"] / baseline
+        if drift >= VectorIndexConfigs.rebuild_drift:
+            reason = f"{stats['changed']} rows written since the last build/tune ({drift:.0%})"
+            return ("rebuild" if method == "ivfflat" else "retune"), reason
+        return "none", f"drift {drift:.0%} below {VectorIndexConfigs.rebuild_drift:.0%}"
+
+    # -- actions ----------------------------------------------------------------------------
+
+    def maintain(self) -> str:
+        """Brings the index in line with the data (see `plan`) and returns the action taken."""
+
+        action, reason = self.plan()
+        print(f"{self.__class__.__name__}: {action} {self.index_name} - {reason}")
+        if action == "drop":
+            self.drop()
+        elif action in ("build", "rebuild"):
+            self.build()
+        elif action == "retune":
+            self.tune()
+        return action
+
+    def drop(self) -> None:
+        """Drops every ANN index on the column and forgets the managed state."""
+
+        for name, _ in self.existing_indexes():
+            self.loader.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name};", autocommit=True)
+        self.loader.execute(
+            "DELETE FROM vector_index_state WHERE table_name = %(table)s AND column_name = %(column)s;",
+            {"table": self.table_name, "column": self.column_name},
+        )
+
+    def build(self, method: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Builds the index under a temporary name with CREATE INDEX CONCURRENTLY (searches keep
+        using the old one meanwhile), swaps it in, drops any other ANN index on the column
+        (including an unmanaged one created by older schema.sql versions) and tunes it.
+        """
+
+        rows = self.row_stats()["rows"]
+        method = method or self.choose_method(rows)
+        params = self.build_params(method, rows)
+        staging_name = f"{self.index_name}_new"
+        with_clause = ", ".join(f"{name} = {value}" for name, value in params.items())
+
+        try:
+            # an interrupted concurrent build leaves an invalid index behind
+            self.loader.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {staging_name};", autocommit=True)
+            t0 = time.perf_counter()
+            self.loader.execute(
+                f"""
+                CREATE INDEX CONCURRENTLY {staging_name} ON {self.table_name}
+                USING {method} ({self.column_name} {self.opclass}) WITH ({with_clause});
+                """,
+                autocommit=True,
+            )
+            build_seconds = time.perf_counter() - t0
+
+            for name, _ in self.existing_indexes():
+                if name != staging_name:
+                    self.loader.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name};", autocommit=True)
+            self.loader.execute(f"ALTER INDEX {staging_name} RENAME TO {self.index_name};")
+            self._save_state(method, params, rows)
+        except Exception as e:
+            print(
+                f"{self.__class__.__name__} - {self.build.__name__}: building {method} "
+                f"index {self.index_name} failed: {e}"
+            )
+            raise
+
+        print(
+            f"{self.__class__.__name__}: built {method} {params} on {rows} rows "
+            f"in {build_seconds:.1f}s"
+        )
+        tuning = self.tune(method=method)
+        return {"method": method, "params": params, "rows": rows, "build_seconds": build_seconds, **tuning}
+
+    # -- tuning -----------------------------------------------------------------------------
+
+    def nearest_ids(self, query: np.ndarray, k: int, settings: Dict[str, Any]) -> List[Any]:
+        df = self.loader.query_table(
+            self.settings_sql(settings)
+            + f"""
+            SELECT {self.id_column} AS id FROM {self.table_name}
+            WHERE {self.column_name} IS NOT NULL
+            ORDER BY {self.column_name} {self.operator} %(query)s::{self._vector_type()}
+            LIMIT %(k)s;
+            """,
+            params={"query": query, "k": k},
+        )
+        return list(df["id"])
+
+    def _vector_type(self) -> str:
+        return self.loader.column_types(self.table_name)[self.column_name].split("(")[0]
+
+    def candidate_values(self, method: str, build_params: Dict[str, int], k: int) -> List[int]:
+        """Query-time values tried by `tune`, cheapest (lowest recall) first."""
+
+        if method == "ivfflat":
+            lists = build_params["lists"]
+            values = [2**i for i in range(int(math.log2(lists)) + 1)]
+            return values + ([lists] if values[-1] != lists else [])
+        # pgvector's default ef_search (40) is the floor: below it recall drops faster than latency
+        return [value for value in (40, 80, 160, 320, 640, 1000) if value >= k] or [1000]
+
+    def measure(
+        self, queries: np.ndarray, k: int, settings: Dict[str, Any], exact: List[List[Any]]
+    ) -> Dict[str, float]:
+        """Mean recall@k against `exact` plus p50/p99 latency of `queries` under `settings`."""
+
+        recalls, latencies = [], []
+        for query, truth in zip(queries, exact):
+            t0 = time.perf_counter()
+            found = self.nearest_ids(query, k, settings)
+            latencies.append(time.perf_counter() - t0)
+            recalls.append(len(set(found) & set(truth)) / max(1, len(truth)))
+        return {
+            "recall": float(np.mean(recalls)),
+            "p50_ms": float(np.percentile(latencies, 50) * 1000),
+            "p99_ms": float(np.percentile(latencies, 99) * 1000),
+        }
+
+    def sample_queries(self, n: int) -> np.ndarray:
+        """`n` stored vectors, used as realistic queries."""
+
+        _, vectors = self.loader.query_vectors(
+            f"""
+            SELECT {self.column_name} FROM {self.table_name}
+            WHERE {self.column_name} IS NOT NULL
+            ORDER BY random() LIMIT {int(n)}
+            """,
+            vector_column=self.column_name,
+        )
+        return vectors
+
+    def tune(
+        self,
+        method: Optional[str] = None,
+        target_recall: Optional[float] = None,
+        n_queries: Optional[int] = None,
+        k: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Finds the cheapest probes / ef_search reaching `target_recall` (recall@k against an exact
+        scan over sample queries), records it as the query-time setting and returns it with the
+        whole recall/latency curve.
+        """
+
+        state = self.state()
+        if state is None:
+            raise ValueError(f"no managed index on {self.table_name}.{self.column_name} to tune.")
+        method = method or state["method"]
+        target_recall = target_recall or VectorIndexConfigs.target_recall
+        k = k or VectorIndexConfigs.tune_k
+        param = QUERY_PARAMS[method]
+
+        queries = self.sample_queries(n_queries or VectorIndexConfigs.tune_queries)
+        exact = [
+            self.nearest_ids(query, k, EXACT_SEARCH) for query in queries
+        ]
+
+        curve, chosen = [], None
+        for value in self.candidate_values(method, state["build_params"], k):
+            point = {param: value, **self.measure(queries, k, {param: value}, exact)}
+            curve.append(point)
+            if point["recall"] >= target_recall:
+                chosen = point
+                break
+        chosen = chosen or max(curve, key=lambda point: point["recall"])
+
+        self._save_tuning({param: chosen[param]}, chosen["recall"], self.row_stats()["rows"])
+        print(
+            f"{self.__class__.__name__}: {param} = {chosen[param]} "
+            f"(recall@{k} {chosen['recall']:.3f}, p50 {chosen['p50_ms']:.1f} ms)"
+        )
+        return {"query_params": {param: chosen[param]}, "recall": chosen["recall"], "curve": curve}
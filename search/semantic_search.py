@@ -0,0 +1,278 @@
+import json
+import numpy as np
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+from ai_moderator.chatbot import AIModerator
+from dataloader.load_data import DataLoader
+from search.index_manager import VectorIndexManager
+
+DateLike = Union[str, datetime, None]
+
+
+def _to_epoch(value: DateLike) -> int:
+    """Epoch seconds of a datetime or ISO string; naive values are UTC like the pipeline's."""
+
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+class LocalVectorIndex:
+    """
+    Post embeddings as one L2-normalized float32 matrix plus metadata columns (id, category,
+    flair, created_utc epoch seconds), stored as .npy files and memory-mapped on load, so
+    searching touches only the pages it scores and several processes can share the cache.
+    """
+
+    FILES = ("embeddings", "ids", "categories", "flairs", "created_utc")
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        ids: np.ndarray,
+        categories: np.ndarray,
+        flairs: np.ndarray,
+        created_utc: np.ndarray,
+    ) -> None:
+        self.embeddings = embeddings
+        self.ids = ids
+        self.categories = categories
+        self.flairs = flairs
+        self.created_utc = created_utc
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(vectors={len(self)}, dim={self.embeddings.shape[1]})"
+
+    @staticmethod
+    def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+        """L2-normalizes rows in place so cosine similarity is a plain dot product."""
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        return matrix
+
+    @classmethod
+    def build(cls, loader: DataLoader, index_dir: str) -> "LocalVectorIndex":
+        """Exports every embedded post from posts_ai_analysis into an index directory."""
+
+        q = """
+        SELECT id, category, flair,
+               extract(epoch FROM created_utc)::bigint AS created_utc,
+               embeddings
+        FROM posts_ai_analysis
+        WHERE embeddings IS NOT NULL
+        ORDER BY id;
+        """
+        df, embeddings = loader.query_vectors(q, vector_column="embeddings")
+
+        index = cls(
+            embeddings=cls.normalize_rows(embeddings),
+            ids=df["id"].to_numpy(dtype=str),
+            categories=df["category"].fillna("").to_numpy(dtype=str),
+            flairs=df["flair"].fillna("").to_numpy(dtype=str),
+            created_utc=df["created_utc"].fillna(0).to_numpy(dtype=np.int64),
+        )
+        index.save(index_dir)
+        return index
+
+    def save(self, index_dir: str) -> None:
+        path = Path(index_dir)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in self.FILES:
+            np.save(path / f"{name}.npy", getattr(self, name))
+        (path / "meta.json").write_text(json.dumps({"vectors": len(self)}))
+
+    @classmethod
+    def load(cls, index_dir: str) -> "LocalVectorIndex":
+        path = Path(index_dir)
+        return cls(**{name: np.load(path / f"{name}.npy", mmap_mode="r") for name in cls.FILES})
+
+    def _filter_mask(
+        self,
+        category: Optional[str],
+        flair: Optional[str],
+        start: DateLike,
+        end: DateLike,
+    ) -> Optional[np.ndarray]:
+        mask = None
+
+        def combine(condition: np.ndarray) -> None:
+            nonlocal mask
+            mask = condition if mask is None else mask & condition
+
+        if category is not None:
+            combine(self.categories == category)
+        if flair is not None:
+            combine(self.flairs == flair)
+        if start is not None:
+            combine(self.created_utc >= _to_epoch(start))
+        if end is not None:
+            combine(self.created_utc < _to_epoch(end))
+        return mask
+
+    def search(
+        self,
+        query_vector: Any,
+        k: int = 10,
+        category: Optional[str] = None,
+        flair: Optional[str] = None,
+        start: DateLike = None,
+        end: DateLike = None,
+        block_rows: int = 65_536,
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns the top-k posts by cosine similarity, optionally filtered by category, flair and
+        a [start, end) created_utc range. Scores are computed block by block so memory stays
+        bounded by `block_rows` regardless of the index size.
+        """
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        mask = self._filter_mask(category=category, flair=flair, start=start, end=end)
+        rows = None if mask is None else np.flatnonzero(mask)
+        n = len(self) if rows is None else len(rows)
+        k = min(k, n)
+        if k <= 0:
+            return []
+
+        # Filters are applied before scoring, so only the matching rows are read and multiplied.
+        scores = np.empty(n, dtype=np.float32)
+        for begin in range(0, n, block_rows):
+            block = (
+                self.embeddings[begin : begin + block_rows]
+                if rows is None
+                else self.embeddings[rows[begin : begin + block_rows]]
+            )
+            np.dot(block, query, out=scores[begin : begin + block_rows])
+
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        top = best if rows is None else rows[best]
+        best_scores = dict(zip(top.tolist(), scores[best].tolist()))
+        return [
+            {
+                "id": str(self.ids[i]),
+                "category": str(self.categories[i]) or None,
+                "flair": str(self.flairs[i]) or None,
+                "created_utc": datetime.utcfromtimestamp(int(self.created_utc[i])),
+                "score": best_scores[i],
+            }
+            for i in top.tolist()
+        ]
+
+
+class SemanticSearch:
+    """
+    Top-k similar posts for a free-text query. The query is embedded once, then searched with
+    pgvector inside Postgres when the extension is available ("pgvector"), or against a
+    memory-mapped LocalVectorIndex ("local"). "auto" picks pgvector when possible.
+    """
+
+    def __init__(
+        self,
+        moderator: AIModerator,
+        loader: Optional[DataLoader] = None,
+        index: Optional[LocalVectorIndex] = None,
+        backend: str = "auto",
+    ) -> None:
+        if backend not in ("auto", "pgvector", "local"):
+            raise NotImplementedError(f"{backend} backend is not implemented!")
+        self.moderator = moderator
+        self.loader = loader
+        self.index = index
+        self.backend = backend
+        self._pgvector = None
+        self._index_settings = None
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(backend='{self.backend}', index={self.index!r})"
+
+    def _use_pgvector(self) -> bool:
+        if self.backend == "local" or self.loader is None:
+            return False
+        if self.backend == "pgvector":
+            return True
+        if self._pgvector is None:
+            try:
+                df = self.loader.query_table(
+                    "SELECT count(*) AS n FROM pg_extension WHERE extname = 'vector';"
+                )
+                self._pgvector = bool(df["n"][0])
+            except Exception:
+                self._pgvector = False
+        return self._pgvector
+
+    def _query_settings(self) -> Dict[str, int]:
+        """probes / ef_search tuned by VectorIndexManager, read once per instance."""
+
+        if self._index_settings is None:
+            try:
+                self._index_settings = VectorIndexManager(self.loader).query_settings()
+            except Exception:
+                self._index_settings = {}
+        return self._index_settings
+
+    def _search_pgvector(
+        self,
+        query_vector: np.ndarray,
+        k: int,
+        category: Optional[str],
+        flair: Optional[str],
+        start: DateLike,
+        end: DateLike,
+    ) -> List[Dict[str, Any]]:
+        params = {"query": np.asarray(query_vector, dtype=np.float32), "k": k}
+        # vector or halfvec (compact storage); the query is cast to match so the index is used
+        vector_type = self.loader.column_types("posts_ai_analysis")["embeddings"].split("(")[0]
+        filters = ["embeddings IS NOT NULL"]
+        for column, op, value in (
+            ("category", "=", category),
+            ("flair", "=", flair),
+            ("created_utc", ">=", start),
+            ("created_utc", "<", end),
+        ):
+            if value is not None:
+                name = f"{column}_{len(params)}"
+                filters.append(f"{column} {op} %({name})s")
+                params[name] = value
+
+        q = VectorIndexManager.settings_sql(self._query_settings()) + f"""
+        SELECT id, category, flair, created_utc,
+               1 - (embeddings <=> %(query)s::{vector_type}) AS score
+        FROM posts_ai_analysis
+        WHERE {' AND '.join(filters)}
+        ORDER BY embeddings <=> %(query)s::{vector_type}
+        LIMIT %(k)s;
+        """
+        return self.loader.query_table(q, params=params).to_dict("records")
+
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        category: Optional[str] = None,
+        flair: Optional[str] = None,
+        start: DateLike = None,
+        end: DateLike = None,
+    ) -> List[Dict[str, Any]]:
+        """Returns up to k dicts (id, category, flair, created_utc, score), best match first."""
+
+        query_vector = self.moderator.generate_embeddings(text=query)
+        if query_vector is None:
+            return []
+
+        if self._use_pgvector():
+            return self._search_pgvector(query_vector, k, category, flair, start, end)
+        if self.index is None:
+            raise ValueError("a LocalVectorIndex is required when pgvector is not available.")
+        return self.index.search(
+            query_vector, k=k, category=category, flair=flair, start=start, end=end
+        )
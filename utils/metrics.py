@@ -0,0 +1,233 @@
+import bisect
+import contextvars
+import functools
+import inspect
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from api.configs import PipelineConfigs
+
+# Histogram bucket upper bounds in seconds: 1us .. ~4h, each bucket ~19% wider than the last
+_BUCKETS = [1e-6 * 2 ** (i / 4) for i in range(136)]
+
+_current_stage: contextvars.ContextVar = contextvars.ContextVar("metrics_stage", default=None)
+
+
+class LatencyHistogram:
+    """Fixed log-scale buckets: constant memory per metric, quantiles within one bucket (~19%)."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(_BUCKETS) + 1)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.buckets[bisect.bisect_left(_BUCKETS, seconds)] += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (capped at the observed max)."""
+
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(_BUCKETS[i], self.max) if i < len(_BUCKETS) else self.max
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "total_s": round(self.total, 6),
+            "p50_ms": round(self.quantile(0.50) * 1000, 3),
+            "p99_ms": round(self.quantile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class MetricsRegistry:
+    """
+    Timers, counters and latency histograms for the pipeline hot paths, grouped by the stage
+    that is running (set by `stage()`, e.g. from PipelineRunner; it follows asyncio tasks and
+    threads started through `contextvars.copy_context()`). When disabled every instrumented
+    call costs one attribute check.
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[Optional[str], str], LatencyHistogram] = {}
+        self._counters: Dict[Tuple[Optional[str], str], float] = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(enabled={self.enabled}, "
+            f"histograms={len(self._histograms)}, counters={len(self._counters)})"
+        )
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Attributes everything recorded inside the block (and its tasks) to stage `name`."""
+
+        token = _current_stage.set(name)
+        try:
+            yield
+        finally:
+            _current_stage.reset(token)
+
+    def observe(self, name: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        key = (_current_stage.get(), name)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def incr(self, name: str, value: float = 1) -> None:
+        if not self.enabled:
+            return
+        key = (_current_stage.get(), name)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Observes the wall time of the block (also when it raises)."""
+
+        if not self.enabled:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0)
+
+    def timed(self, name: str) -> Callable[[Callable], Callable]:
+        """
+        Decorator timing every call of a function or coroutine function. For generator functions
+        each produced item is one observation (the time spent computing it, not the consumer's).
+        """
+
+        def decorate(func: Callable) -> Callable:
+            if inspect.iscoroutinefunction(func):
+
+                @functools.wraps(func)
+                async def timed_coroutine(*args: Any, **kwargs: Any) -> Any:
+                    if not self.enabled:
+                        return await func(*args, **kwargs)
+                    t0 = time.perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        self.observe(name, time.perf_counter() - t0)
+
+                return timed_coroutine
+
+            if inspect.isgeneratorfunction(func):
+
+                @functools.wraps(func)
+                def timed_generator(*args: Any, **kwargs: Any) -> Any:
+                    if not self.enabled:
+                        yield from func(*args, **kwargs)
+                        return
+                    items = func(*args, **kwargs)
+                    while True:
+                        t0 = time.perf_counter()
+                        try:
+                            item = next(items)
+                        except StopIteration:
+                            return
+                        finally:
+                            self.observe(name, time.perf_counter() - t0)
+                        yield item
+
+                return timed_generator
+
+            @functools.wraps(func)
+            def timed_function(*args: Any, **kwargs: Any) -> Any:
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                t0 = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - t0)
+
+            return timed_function
+
+        return decorate
+
+    def summary(self, stage: Optional[str]) -> Dict[str, Any]:
+        """{metric: histogram summary or counter value} recorded under `stage`."""
+
+        with self._lock:
+            out: Dict[str, Any] = {
+                name: histogram.summary()
+                for (owner, name), histogram in sorted(self._histograms.items(), key=str)
+                if owner == stage
+            }
+            out.update(
+                {name: value for (owner, name), value in self._counters.items() if owner == stage}
+            )
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def stage_rows(
+        self, run_id: str, run_started: float, results: Dict[str, Any]
+    ) -> List[Tuple[Any, ...]]:
+        """
+        One `run_metrics` row-tuple per stage of a PipelineRunner run started at epoch
+        `run_started`: (run_id, stage, status, started_utc, seconds, rows_written, metrics JSON).
+        """
+
+        rows = []
+        for name, result in results.items():
+            stage_metrics = self.summary(name)
+            rows.append(
+                (
+                    run_id,
+                    name,
+                    result.status,
+                    time.strftime(
+                        "%Y-%m-%d_%H:%M:%S", time.gmtime(run_started + result.started)
+                    ),
+                    round(result.seconds, 3),
+                    int(stage_metrics.get("db.rows_written", 0)),
+                    json.dumps(stage_metrics),
+                )
+            )
+        return rows
+
+    def export_json(self, path: str, run_id: str, results: Dict[str, Any]) -> None:
+        """Writes the run's per-stage summaries (same content as `run_metrics`) to a JSON file."""
+
+        stages = {
+            name: {
+                "status": result.status,
+                "seconds": round(result.seconds, 3),
+                "metrics": self.summary(name),
+            }
+            for name, result in results.items()
+        }
+        with open(path, "w") as f:
+            json.dump({"run_id": run_id, "stages": stages}, f, indent=2)
+
+
+# Process-wide registry used by the instrumented hot paths
+metrics = MetricsRegistry(enabled=PipelineConfigs.metrics_enabled)
@@ -1,6 +1,22 @@
+from datetime import date, datetime, timezone
+from typing import Optional, Union
+
+
 def get_env_variable(var_name: str) -> str:
     import os
     value = os.getenv(var_name)
     if not value:
         raise ValueError(f"Environment variable '{var_name}' is not set or empty.")
     return value
+
+
+def utc_day(value: Union[str, date, datetime, None]) -> Optional[date]:
+    """UTC day of a date, datetime or ISO string; naive values are UTC like the pipeline's."""
+
+    if value is None or type(value) is date:
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()